@@ -83,6 +83,7 @@ from .pyfolder import retrieve_ProjHistory
 from .pyfolder import config_sets
 from .pyfolder import load_inputs
 from .pyfolder import write_rt3d
+from .pyfolder import mf_inputs
 # from .pyfolder import apexmod_utils
 
 # ----------------------------------------------------------------------#
@@ -674,21 +675,8 @@ class APEXMOD(object):
         self.dlg.progressBar_sm_link.setValue(20)
         QCoreApplication.processEvents()
         
-        # create grid_id
-        modflow_functions.create_grid_id(self)
-        self.dlg.progressBar_sm_link.setValue(40)
-        QCoreApplication.processEvents()
-
-        # create additioanl information
-        modflow_functions.create_row(self)
-        QCoreApplication.processEvents()
-        self.dlg.progressBar_sm_link.setValue(60)        
-
-        modflow_functions.create_col(self)
-        self.dlg.progressBar_sm_link.setValue(80)
-        QCoreApplication.processEvents()
-
-        modflow_functions.create_elev_mf(self)
+        # create grid_id, row, col and elev_mf
+        modflow_functions.create_grid_attributes(self)
         self.dlg.progressBar_sm_link.setValue(100)
         QCoreApplication.processEvents()
 
@@ -699,32 +687,27 @@ class APEXMOD(object):
         msgBox.exec_()
 
     def create_rivs(self):
+        # river lengths per cell come from walking the rivers through the
+        # grid; only option 2 needs the river_grid layer for Wid2 and Dep2
+        table = None
         if self.dlg.radioButton_mf_riv1.isChecked():
-            # linking_process.deleting_river_grid(self)
+            linking_process.deleting_river_grid(self)
             modflow_functions.mf_riv1(self)
             modflow_functions.create_riv_info(self)
-            linking_process.river_grid(self)
-            linking_process.river_grid_delete_NULL(self)
-            linking_process.rgrid_len(self)
-            linking_process.delete_river_grid_with_threshold(self)
         elif self.dlg.radioButton_mf_riv2.isChecked():
             # linking_process.deleting_river_grid(self)            
             modflow_functions.mf_riv2(self)
             linking_process.river_grid(self)
             linking_process.river_grid_delete_NULL(self)
-            linking_process.rgrid_len(self)
+            table = linking_process.rgrid_len(self)
             linking_process.delete_river_grid_with_threshold(self)
             modflow_functions.rivInfoTo_mf_riv2(self)
             modflow_functions.riv_cond_delete_NULL(self)
             # modflow_functions.getElevfromDem_riv2(self)
         elif self.dlg.radioButton_mf_riv3.isChecked():
-            # linking_process.deleting_river_grid(self)            
+            linking_process.deleting_river_grid(self)
             modflow_functions.mf_riv3(self)
-            linking_process.river_grid(self)
-            linking_process.river_grid_delete_NULL(self)
-            linking_process.rgrid_len(self)
-            linking_process.delete_river_grid_with_threshold(self)
-        linking_process.export_rgrid_len(self)
+        linking_process.export_rgrid_len(self, table)
         msgBox = QMessageBox()
         msgBox.setWindowIcon(QtGui.QIcon(':/APEXMOD/pics/am_icon.png'))
         msgBox.setWindowTitle("Identified!")
@@ -1078,7 +1061,9 @@ class APEXMOD(object):
             msgBox.exec_()  
 
     def export_wt(self):
-        if self.dlg.comboBox_hh_time.currentText() == "Daily":
+        if self.dlg.checkBox_wt_export_all.isChecked():
+            post_ii_wt.export_wt_all(self)
+        elif self.dlg.comboBox_hh_time.currentText() == "Daily":
             post_ii_wt.export_wt_daily(self)
         elif self.dlg.comboBox_hh_time.currentText() == "Monthly":
             post_ii_wt.export_wt_monthly(self)         
@@ -1356,23 +1341,13 @@ class APEXMOD(object):
 
     def createMF(self):
         self.dlg.progressBar_sm_link.setValue(0)
+        if mf_inputs.require_dis(str(self.dirs_and_paths()['MODFLOW'])) is None:
+            return
         modflow_functions.MF_grid(self)
         self.dlg.progressBar_sm_link.setValue(20)
         QCoreApplication.processEvents()
         
-        modflow_functions.create_grid_id(self)
-        self.dlg.progressBar_sm_link.setValue(60)
-        QCoreApplication.processEvents()
-
-        modflow_functions.create_row(self)
-        self.dlg.progressBar_sm_link.setValue(70)
-        QCoreApplication.processEvents()
-        
-        modflow_functions.create_col(self)
-        self.dlg.progressBar_sm_link.setValue(80)
-        QCoreApplication.processEvents()
-        
-        modflow_functions.create_elev_mf(self)
+        modflow_functions.create_grid_attributes(self)
         self.dlg.progressBar_sm_link.setValue(100)
         QCoreApplication.processEvents()
         
@@ -1394,20 +1369,17 @@ class APEXMOD(object):
         self.dlg.checkBox_filesPrepared.setChecked(0)
         self.dlg.progressBar_sm_link.setValue(0)
         self.dlg.textEdit_sm_link_log.append('+ '*15 +'  Start Linking Process  '+' +'*15)
+        # the link tables need the grid of the .dis file
+        if mf_inputs.require_dis(str(self.dirs_and_paths()['MODFLOW'])) is None:
+            return
 
         # Calculate SUB area
         linking_process.calculate_sub_area(self)
         self.dlg.progressBar_sm_link.setValue(20)         
         QCoreApplication.processEvents()
 
-        # Create sub_grid
-        linking_process.sub_grid(self)
-        self.dlg.progressBar_sm_link.setValue(40)
-        QCoreApplication.processEvents()
-
-        
-        linking_process.create_sub_grid_filter(self)  # for invalid geometry 
-        linking_process.delete_sub_grid_with_zero(self)  # for invalid geometry
+        # Overlay SUBs with GRIDs (small overlaps are left out)
+        sub_grid = linking_process.sub_grid(self)
         self.dlg.progressBar_sm_link.setValue(80)
         QCoreApplication.processEvents()
 
@@ -1423,8 +1395,8 @@ class APEXMOD(object):
         time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
         self.dlg.textEdit_sm_link_log.append(time+' -> ' + 'Exporting tables from layers ... processing') 
         self.dlg.progressBar_sm_link.setValue(96)     
-        linking_process.export_sub_grid(self)
-        linking_process.export_grid_sub(self)
+        linking_process.export_sub_grid(self, sub_grid)
+        linking_process.export_grid_sub(self, sub_grid)
         linking_process.copylinkagefiles(self)
         self.dlg.progressBar_sm_link.setValue(100)
         time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
@@ -1539,16 +1511,13 @@ class APEXMOD(object):
         input1 = QgsProject.instance().mapLayersByName("mf_act_grid (MODFLOW)")[0]
 
         # Find .dis file and read number of rows, cols, x spacing, and y spacing (not allowed to change)
-        for filename in glob.glob(str(APEXMOD_path_dict['apexmf_model'])+"/*.dis"):
-            with open(filename, "r") as f:
-                data = []
-                for line in f.readlines():
-                    if not line.startswith("#"):
-                        data.append(line.replace('\n', '').split())
-            nrow = int(data[0][1])
-            ncol = int(data[0][2])
-            delr = float(data[2][1]) # is the cell width along rows (y spacing)
-            delc = float(data[3][1]) # is the cell width along columns (x spacing).
+        dis = mf_inputs.require_dis(str(APEXMOD_path_dict['apexmf_model']))
+        if dis is None:
+            return
+        nrow = dis.nrow
+        ncol = dis.ncol
+        delr = float(dis.delr[0]) # is the cell width along rows (y spacing)
+        delc = float(dis.delc[0]) # is the cell width along columns (x spacing).
         # get extent
         ext = extlayer.extent()
         xmin = ext.xMinimum()
@@ -1593,6 +1562,8 @@ class APEXMOD(object):
             self.dlg.horizontalSlider_ol_area.setEnabled(True)
             self.dlg.label_dhru_size.setEnabled(True)
             dhru_max_size = modflow_functions.check_grid_size(self)
+            if dhru_max_size is None:
+                return
             self.dlg.horizontalSlider_ol_area.setMaximum(900)
             self.dlg.horizontalSlider_ol_area.setMaximum(dhru_max_size)
             self.dlg.horizontalSlider_ol_area.setSingleStep(900)
@@ -36,6 +36,7 @@ from datetime import datetime
 from APEXMOD.APEXMOD import *
 from APEXMOD.APEXMOD_dialog import APEXMODDialog
 from APEXMOD.pyfolder import modflow_functions
+from APEXMOD.pyfolder import structured_grid
 from APEXMOD.pyfolder import writeMF
 from APEXMOD.pyfolder import db_functions
 from APEXMOD.pyfolder import linking_process
@@ -348,6 +349,7 @@ class createMFmodelDialog(QDialog, FORM_CLASS):
         self.progressBar_mf_status.setValue(0)
         QCoreApplication.processEvents()
 
+        import math
         APEXMOD_path_dict = self.dirs_and_paths()
         input1 = QgsProject.instance().mapLayersByName("mf_boundary (MODFLOW)")[0]
         ext = input1.extent()
@@ -365,70 +367,22 @@ class createMFmodelDialog(QDialog, FORM_CLASS):
         if self.groupBox_mf_add.isChecked():
             xmax = xmax + (delc * n_col)
             ymin = ymin - (delr * n_row)
-            nx = round(abs(abs(xmax) - abs(xmin)) / delc)
-            ny = round(abs(abs(ymax) - abs(ymin)) / delr)            
-        else:
-            nx = round(abs(abs(xmax) - abs(xmin)) / delc)
-            ny = round(abs(abs(ymax) - abs(ymin)) / delr)
-        ngrid = abs(int(nx*ny))
-        MF_extent = "{a},{b},{c},{d}".format(a=xmin, b=xmax, c=ymin, d=ymax)
+        nx = math.ceil(abs(abs(xmax) - abs(xmin)) / delc)
+        ny = math.ceil(abs(abs(ymax) - abs(ymin)) / delr)
 
-        # create dummy grid
-        name_ext_ = "mf_grid_.gpkg"
+        # Build the grid cells from the north-west corner with grid_id, row, col
+        name_ext_v = 'mf_grid.gpkg'
         output_dir = APEXMOD_path_dict['org_shps']
-        output_file_ = os.path.normpath(os.path.join(output_dir, name_ext_))
-
+        output_file_v = os.path.normpath(os.path.join(output_dir, name_ext_v))
         crs = input1.crs()
-        # running the acutal routine:
-        params_ = {
-            'TYPE': 2,
-            'EXTENT': MF_extent,
-            'HSPACING': delc,
-            'VSPACING': delr,
-            'CRS': crs,
-            'OUTPUT': output_file_
-        }
-        processing.run("native:creategrid", params_)
+        structured_grid.write_grid(
+            output_file_v, crs, xmin, ymax, ny, nx, delr, delc, self.progressBar_mf_status)
 
         time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
         self.textEdit_mf_log.append(time+' -> ' + "Creating MODFLOW grids ... passed")
         self.label_mf_status.setText('Step Status: ')
-        self.progressBar_mf_status.setValue(100)
         QCoreApplication.processEvents()
 
-        time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-        self.textEdit_mf_log.append(time+' -> ' + "Fixing starting index ... processing")
-        self.label_mf_status.setText("Fixing starting index... ")
-        self.progressBar_mf_status.setValue(0)
-        QCoreApplication.processEvents()
-
-        # rasterize
-        name_ext_r = 'mf_grid_.tif'
-        output_file_r = os.path.normpath(os.path.join(output_dir, name_ext_r))
-        params_r = {
-            'INPUT': output_file_,
-            'UNITS': 1,
-            'WIDTH': delc,
-            'HEIGHT': delr,
-            'EXTENT': MF_extent,
-            'NODATA': -9999,
-            'DATA_TYPE': 5,
-            'OUTPUT': output_file_r
-        }
-        processing.run("gdal:rasterize", params_r)
-
-        # vecterize
-        name_ext_v = 'mf_grid.gpkg'
-        output_file_v = os.path.normpath(os.path.join(output_dir, name_ext_v))
-
-        #
-        params_v = {
-            'INPUT_RASTER': output_file_r,
-            'RASTER_BAND': 1,
-            'FIELD': 'VALUE',
-            'OUTPUT': output_file_v
-        }
-        processing.run("native:pixelstopolygons", params_v)
         # Define the outputfile to be loaded into the canvas
         mf_grid_shapefile = os.path.join(output_dir, name_ext_v)
         layer = QgsVectorLayer(mf_grid_shapefile, '{0} ({1})'.format("mf_grid","MODFLOW"), 'ogr')
@@ -439,80 +393,19 @@ class createMFmodelDialog(QDialog, FORM_CLASS):
         QgsProject.instance().addMapLayer(layer, False)
         mf_group.insertChildNode(0, QgsLayerTreeLayer(layer))
 
-        time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-        self.textEdit_mf_log.append(time+' -> ' + "Fixing starting index ... passed")
-        self.label_mf_status.setText('Step Status: ')
-        self.progressBar_mf_status.setValue(100)
-        QCoreApplication.processEvents()
-
-
-    def create_grid_id_ii(self):
-        time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-        self.textEdit_mf_log.append(time+' -> ' + "Creating 'grid_id' ... processing")
-        self.label_mf_status.setText("Creating 'grid_id' ... ")
-        self.progressBar_mf_status.setValue(0)
-        QCoreApplication.processEvents()
-
-        self.layer = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0]
-        provider = self.layer.dataProvider()
 
-        if provider.fields().indexFromName("grid_id") == -1:
-            field = QgsField("grid_id", QVariant.Int)
-            provider.addAttributes([field])
-            self.layer.updateFields()
-
-            # I don't know
-            grid_id = provider.fields().indexFromName("grid_id")
-            feats = self.layer.getFeatures()
-            tot_feats = self.layer.featureCount()
-            count = 0
-            self.layer.startEditing()
-            for i, f in enumerate(feats):
-                self.layer.changeAttributeValue(f.id(), grid_id, i+1)
-                count += 1
-                provalue = round(count/tot_feats*100)
-                self.progressBar_mf_status.setValue(provalue)
-                QCoreApplication.processEvents()
-            self.layer.commitChanges()
-            QCoreApplication.processEvents()
-        else:
-            time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-            self.textEdit_mf_log.append(time+' -> ' + "'grid_id' already exists ...")
-        time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-        self.textEdit_mf_log.append(time+' -> ' + "Creating 'grid_id' ... passed")
-        self.label_mf_status.setText('Step Status: ')
-        QCoreApplication.processEvents()
-    
     # for elev, not using *.dis file. instead using DEM
+    # grid_id, row and col are written with the grid by structured_grid.write_grid
     def create_row_col_elev_mf_ii (self):
         time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-        self.textEdit_mf_log.append(time+' -> ' + "Creating 'row', 'col, 'elev' ... processing")
-        self.label_mf_status.setText("Creating 'row', 'col, 'elev' ... ")
+        self.textEdit_mf_log.append(time+' -> ' + "Creating 'elev_mf' ... processing")
+        self.label_mf_status.setText("Creating 'elev_mf' ... ")
         self.progressBar_mf_status.setValue(0)
         QCoreApplication.processEvents()
 
-        import math
-        APEXMOD_path_dict = self.dirs_and_paths()
         self.layer = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0]
         provider = self.layer.dataProvider()
 
-        # from qgis.core import QgsField, QgsExpression, QgsFeature
-        if provider.fields().indexFromName( "row" ) == -1:
-            field = QgsField("row", QVariant.Int)
-            provider.addAttributes([field])
-            self.layer.updateFields()
-        
-        # Create Column field
-        if provider.fields().indexFromName( "col" ) == -1:
-            field = QgsField("col", QVariant.Int)
-            provider.addAttributes([field])
-            self.layer.updateFields()
-
-        # Get the index numbers of the fields
-        # elev_mean = provider.fields().indexFromName( "elev_mean" )
-        row = provider.fields().indexFromName("row")
-        col = provider.fields().indexFromName("col")
-
         # Change name
         for field in self.layer.fields():
             if field.name() == 'elev_mean':
@@ -520,49 +413,11 @@ class createMFmodelDialog(QDialog, FORM_CLASS):
                 idx = provider.fields().indexFromName(field.name())
                 self.layer.renameAttribute(idx, "elev_mf")
                 self.layer.commitChanges()
-
-        # Get number of rows and of columns
-        input1 = QgsProject.instance().mapLayersByName("mf_boundary (MODFLOW)")[0]
-
-        ext = input1.extent()
-        xmin = ext.xMinimum()
-        xmax = ext.xMaximum()
-        ymin = ext.yMinimum()
-        ymax = ext.yMaximum()
-
-        delc = float(self.doubleSpinBox_delc.value())
-        delr = float(self.doubleSpinBox_delr.value())
-
-        nx = math.ceil(abs(abs(xmax) - abs(xmin)) / delc)
-        ny = math.ceil(abs(abs(ymax) - abs(ymin)) / delr) 
-    
-        # Get row and column lists
-        iy = [] # row
-        ix = [] # col
-        for i in range(1, ny + 1):
-            for j in range(1, nx + 1):
-                ix.append(j)
-                iy.append(i)
-
-        # Get features (Find out a way to change attribute values using another field)
-        feats = self.layer.getFeatures()
-        tot_feats = self.layer.featureCount()
-        count = 0
-        self.layer.startEditing()
-
-        # add row number
-        for f, r, c in zip(feats, iy, ix):
-            self.layer.changeAttributeValue(f.id(), row, r)
-            self.layer.changeAttributeValue(f.id(), col, c)
-            count += 1
-            provalue = round(count/tot_feats*100)
-            self.progressBar_mf_status.setValue(provalue)
-            QCoreApplication.processEvents()
-        self.layer.commitChanges()
+        self.progressBar_mf_status.setValue(100)
         QCoreApplication.processEvents()
 
         time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-        self.textEdit_mf_log.append(time+' -> ' + "Creating 'row', 'col, 'elev' ... passed")
+        self.textEdit_mf_log.append(time+' -> ' + "Creating 'elev_mf' ... passed")
         self.label_mf_status.setText('Step Status: ')
         QCoreApplication.processEvents()
 
@@ -653,11 +508,6 @@ class createMFmodelDialog(QDialog, FORM_CLASS):
         self.progressBar_mf.setValue(30)
         QCoreApplication.processEvents() # it works as F5 !! Be careful to use this for long geoprocessing
         
-        # Create grid_id
-        self.create_grid_id_ii()
-        self.progressBar_mf.setValue(40)
-        QCoreApplication.processEvents()
-
         # Extract elevation
         self.getElevfromDem()
         self.progressBar_mf.setValue(50)
@@ -807,12 +657,12 @@ class createMFmodelDialog(QDialog, FORM_CLASS):
         modflow_functions.mf_riv2(self)
         linking_process.river_grid(self)
         linking_process.river_grid_delete_NULL(self)
-        linking_process.rgrid_len(self)
+        table = linking_process.rgrid_len(self)
         linking_process.delete_river_grid_with_threshold(self)
         modflow_functions.rivInfoTo_mf_riv2_ii(self)
         modflow_functions.riv_cond_delete_NULL(self)
         writeMF.create_layer_inRiv(self)
-        linking_process.export_rgrid_len(self)
+        linking_process.export_rgrid_len(self, table)
         QCoreApplication.processEvents()
 
         msgBox = QMessageBox()
@@ -338,6 +338,79 @@ def join_struct_arrays(arrays):
     return newrecarray
 
 
+def _index_stamp(filename):
+    st = os.stat(filename)
+    return np.array([st.st_mtime_ns, st.st_size], dtype=np.int64)
+
+
+def load_index(filename, header_dtype):
+    """
+    Load the index of a binary output file from its .idx sidecar.
+
+    Parameters
+    ----------
+    filename : str or PathLike
+        Path of the binary output file
+    header_dtype : numpy dtype
+        dtype the recordarray of the sidecar must have
+
+    Returns
+    -------
+    index : dict or None
+        Arrays saved by save_index, or None if there is no sidecar or it
+        was written for another version of the file.  If the sidecar was
+        written with another header dtype, only its "recordarray" dtype
+        is returned (as index["dtype"]) so the caller can tell.
+
+    """
+    path = f"{filename}.idx"
+    if not os.path.isfile(path):
+        return None
+    try:
+        with np.load(path) as f:
+            if not np.array_equal(f["stamp"], _index_stamp(filename)):
+                return None
+            index = {key: f[key] for key in f.files}
+    except (OSError, ValueError, KeyError):
+        return None
+    if index["recordarray"].dtype != header_dtype:
+        return {"dtype": index["recordarray"].dtype}
+    return index
+
+
+def save_index(filename, **arrays):
+    """
+    Save the index arrays of a binary output file to its .idx sidecar,
+    stamped with the modification time and size of the file.  Nothing is
+    written if the folder is read-only.
+
+    """
+    path = f"{filename}.idx"
+    try:
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(f, stamp=_index_stamp(filename), **arrays)
+        os.replace(f"{path}.tmp", path)
+    except OSError:
+        pass
+
+
+def _first_changes(values):
+    """
+    Positions of the values that differ from the previous one.
+
+    """
+    return np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+
+
+def _unique_in_order(values):
+    """
+    Unique values (or rows) in order of first appearance.
+
+    """
+    _, first = np.unique(values, return_index=True, axis=0)
+    return values[np.sort(first)]
+
+
 def get_headfile_precision(filename: Union[str, os.PathLike]):
     """
     Determine precision of a MODFLOW head file.
@@ -428,9 +501,19 @@ class BinaryLayerFile(LayerFile):
     """
 
     def __init__(
-        self, filename: Union[str, os.PathLike], precision, verbose, kwargs
+        self,
+        filename: Union[str, os.PathLike],
+        precision,
+        verbose,
+        kwargs,
+        memmap=False,
+        cache_index=False,
     ):
+        self.mm = None
+        self.cache_index = cache_index
         super().__init__(filename, precision, verbose, kwargs)
+        if memmap:
+            self.mm = np.memmap(self.filename, dtype=np.uint8, mode="r")
 
     def __enter__(self):
         return self
@@ -438,12 +521,32 @@ class BinaryLayerFile(LayerFile):
     def __exit__(self, *exc):
         self.close()
 
+    def close(self):
+        """
+        Close the file handle and release the memory map.
+
+        """
+        self.mm = None
+        super().close()
+
     def _build_index(self):
         """
         Build the recordarray and iposarray, which maps the header information
         to the position in the binary file.
 
+        The index is read from the .idx sidecar when cache_index is set and
+        the sidecar is current.  Otherwise, when every record has the same
+        size, all headers are read in one strided pass; files with records
+        of different sizes are read header by header.
+
         """
+        if self.cache_index:
+            index = load_index(self.filename, self.header_dtype)
+            if index is not None and "recordarray" in index:
+                self._set_index(
+                    index["recordarray"], index["iposarray"], index["times"]
+                )
+                return
         header = self._get_header()
         self.nrow = header["nrow"]
         self.ncol = header["ncol"]
@@ -459,6 +562,9 @@ class BinaryLayerFile(LayerFile):
         self.file.seek(0, 2)
         self.totalbytes = self.file.tell()
         self.file.seek(0, 0)
+        if self._build_index_strided(header):
+            self._save_index()
+            return
         ipos = 0
         while ipos < self.totalbytes:
             header = self._get_header()
@@ -485,6 +591,66 @@ class BinaryLayerFile(LayerFile):
         self.recordarray = np.array(self.recordarray, dtype=self.header_dtype)
         self.iposarray = np.array(self.iposarray)
         self.nlay = np.max(self.recordarray["ilay"])
+        self._save_index()
+
+    def _build_index_strided(self, header):
+        """
+        Read all headers at once when the file is a sequence of records of
+        the size of the first one, all of the selected text.  Returns False
+        if it is not.
+
+        """
+        hsize = self.header_dtype.itemsize
+        recsize = hsize + int(self.get_databytes(header))
+        if self.totalbytes % recsize:
+            return False
+        dtype = np.dtype(
+            {
+                "names": ["header"],
+                "formats": [self.header_dtype],
+                "offsets": [0],
+                "itemsize": recsize,
+            }
+        )
+        headers = np.memmap(self.filename, dtype=dtype, mode="r")["header"]
+        same = (headers["nrow"] == header["nrow"]) & (
+            headers["ncol"] == header["ncol"]
+        )
+        text = np.char.upper(headers["text"])
+        same &= np.char.find(text, self.text.upper()) >= 0
+        if not same.all():
+            return False
+        ipos = np.arange(len(headers), dtype=np.int64) * recsize + hsize
+        self._set_index(np.array(headers), ipos)
+        return True
+
+    def _set_index(self, recordarray, iposarray, times=None):
+        """
+        Set the index from complete header and position arrays.  times and
+        kstpkper change wherever totim changes from one record to the next.
+
+        """
+        self.recordarray = recordarray
+        self.iposarray = iposarray
+        self.nrow = recordarray["nrow"][0]
+        self.ncol = recordarray["ncol"][0]
+        self.nlay = np.max(recordarray["ilay"])
+        new = _first_changes(recordarray["totim"])
+        if times is None:
+            times = recordarray["totim"][new]
+        self.times = list(times)
+        self.kstpkper = list(
+            zip(recordarray["kstp"][new], recordarray["kper"][new])
+        )
+
+    def _save_index(self):
+        if self.cache_index:
+            save_index(
+                self.filename,
+                recordarray=self.recordarray,
+                iposarray=self.iposarray,
+                times=np.array(self.times),
+            )
 
     def get_databytes(self, header):
         """
@@ -553,6 +719,9 @@ class BinaryLayerFile(LayerFile):
         # Initialize result array and put times in first column
         result = self._init_result(nstation)
 
+        if self.mm is not None:
+            return self._get_ts_memmap(kijlist, result)
+
         istat = 1
         for k, i, j in kijlist:
             ioffset = (i * self.ncol + j) * self.realtype(1).nbytes
@@ -574,6 +743,116 @@ class BinaryLayerFile(LayerFile):
             istat += 1
         return result
 
+    def _record_view(self, irecs):
+        """
+        Array of the records irecs, (nrec, nrow, ncol), as a view of the
+        memory map when the records have the same shape and are evenly
+        spaced in the file (as consecutive layers or consecutive times of
+        a MODFLOW or MT3D file are); otherwise a copy.
+
+        """
+        irecs = np.asarray(irecs)
+        nrow = self.recordarray["nrow"][irecs]
+        ncol = self.recordarray["ncol"][irecs]
+        ipos = self.iposarray[irecs].astype(np.int64)
+        itemsize = self.realtype(1).nbytes
+        shp = (int(nrow[0]), int(ncol[0]))
+        if (nrow == shp[0]).all() and (ncol == shp[1]).all():
+            steps = np.diff(ipos)
+            stride = int(steps[0]) if len(steps) else 0
+            if (steps == stride).all():
+                return np.ndarray(
+                    (len(irecs),) + shp,
+                    dtype=self.realtype,
+                    buffer=self.mm,
+                    offset=int(ipos[0]),
+                    strides=(stride, shp[1] * itemsize, itemsize),
+                )
+        return np.array(
+            [
+                np.ndarray(
+                    (r, c), dtype=self.realtype, buffer=self.mm, offset=int(p)
+                )
+                for r, c, p in zip(nrow, ncol, ipos)
+            ]
+        )
+
+    def _get_data_array(self, totim=0):
+        """
+        Get the three dimensional data array for the specified totim value.
+        In memmap mode the array is a read-only view of the file when the
+        time has one record per layer, in layer order.
+
+        """
+        if self.mm is None:
+            return super()._get_data_array(totim)
+        keyindices = np.where(self.recordarray["totim"] == totim)[0]
+        if len(keyindices) == 0:
+            msg = f"totim value ({totim}) not found in file..."
+            raise Exception(msg)
+        ilay = self.recordarray["ilay"][keyindices]
+        if np.array_equal(ilay, np.arange(1, self.nlay + 1)):
+            return self._record_view(keyindices)
+        data = self._record_view(keyindices)
+        full = np.full((self.nlay,) + data.shape[1:], np.nan, self.realtype)
+        full[ilay - 1] = data
+        return full
+
+    def get_layer_series(self, mflay=0):
+        """
+        Get one layer at every time in the file.
+
+        Parameters
+        ----------
+        mflay : int
+            MODFLOW zero-based layer number. (Default is 0.)
+
+        Returns
+        ----------
+        times : numpy array
+            totim of each record
+        data : numpy array
+            Array has size (ntimes, nrow, ncol).  In memmap mode it is a
+            read-only view of the file when the records are evenly spaced.
+
+        """
+        irecs = np.where(self.recordarray["ilay"] == mflay + 1)[0]
+        if len(irecs) == 0:
+            raise Exception(f"layer {mflay} not found in file...")
+        times = self.recordarray["totim"][irecs]
+        if self.mm is not None:
+            return times, self._record_view(irecs)
+        data = np.empty(
+            (len(irecs), self.nrow, self.ncol), dtype=self.realtype
+        )
+        for n, irec in enumerate(irecs):
+            self.file.seek(int(self.iposarray[irec]), 0)
+            data[n] = self._read_data((self.nrow, self.ncol))
+        return times, data
+
+    def _get_ts_memmap(self, kijlist, result):
+        """
+        get_ts in memmap mode: for each layer, the (ntimes, nrow * ncol)
+        view of the layer is gathered at all of its cells at once.
+
+        """
+        times = np.asarray(self.times)
+        order = np.argsort(times)
+        kij = np.asarray(kijlist, dtype=np.int64).reshape(-1, 3)
+        for k in np.unique(kij[:, 0]):
+            irecs = np.where(self.recordarray["ilay"] == k + 1)[0]
+            if len(irecs) == 0:
+                continue
+            # row of each record in the result
+            totim = self.recordarray["totim"][irecs]
+            itim = order[np.searchsorted(times, totim, sorter=order)]
+            istat = np.where(kij[:, 0] == k)[0]
+            cells = kij[istat, 1] * self.ncol + kij[istat, 2]
+            data = self._record_view(irecs)
+            data = data.reshape(len(irecs), -1)
+            result[itim[:, None], istat[None, :] + 1] = data[:, cells]
+        return result
+
 
 class HeadFile(BinaryLayerFile):
     """
@@ -589,6 +868,12 @@ class HeadFile(BinaryLayerFile):
         'auto', 'single' or 'double'.  Default is 'auto'.
     verbose : bool
         Write information to the screen.  Default is False.
+    memmap : bool
+        Memory-map the file, so get_data, get_layer_series and get_ts
+        are served from views of the mapped file.  Default is False.
+    cache_index : bool
+        Keep the index of the records in a .idx file next to the file and
+        reuse it while the file is unchanged.  Default is False.
 
     Attributes
     ----------
@@ -632,6 +917,8 @@ class HeadFile(BinaryLayerFile):
         text="head",
         precision="auto",
         verbose=False,
+        memmap=False,
+        cache_index=False,
         **kwargs,
     ):
         self.text = text.encode()
@@ -644,7 +931,9 @@ class HeadFile(BinaryLayerFile):
         self.header_dtype = BinaryHeader.set_dtype(
             bintype="Head", precision=precision
         )
-        super().__init__(filename, precision, verbose, kwargs)
+        super().__init__(
+            filename, precision, verbose, kwargs, memmap, cache_index
+        )
 
 
 class UcnFile(BinaryLayerFile):
@@ -661,6 +950,12 @@ class UcnFile(BinaryLayerFile):
         'auto', 'single' or 'double'.  Default is 'auto'.
     verbose : bool
         Write information to the screen.  Default is False.
+    memmap : bool
+        Memory-map the file, so get_data, get_layer_series and get_ts
+        are served from views of the mapped file.  Default is False.
+    cache_index : bool
+        Keep the index of the records in a .idx file next to the file and
+        reuse it while the file is unchanged.  Default is False.
 
     Attributes
     ----------
@@ -699,6 +994,8 @@ class UcnFile(BinaryLayerFile):
         text="concentration",
         precision="auto",
         verbose=False,
+        memmap=False,
+        cache_index=False,
         **kwargs,
     ):
         self.text = text.encode()
@@ -711,7 +1008,9 @@ class UcnFile(BinaryLayerFile):
         self.header_dtype = BinaryHeader.set_dtype(
             bintype="Ucn", precision=precision
         )
-        super().__init__(filename, precision, verbose, kwargs)
+        super().__init__(
+            filename, precision, verbose, kwargs, memmap, cache_index
+        )
         return
 
 
@@ -731,6 +1030,12 @@ class CellBudgetFile:
         'single' or 'double'.  Default is 'single'.
     verbose : bool
         Write information to the screen.  Default is False.
+    memmap : bool
+        Memory-map the file, so get_node_ts reads the records from the
+        mapped file instead of seeking.  Default is False.
+    cache_index : bool
+        Keep the index of the records in a .idx file next to the file and
+        reuse it while the file is unchanged.  Default is False.
 
     Attributes
     ----------
@@ -751,6 +1056,7 @@ class CellBudgetFile:
     >>> cbb = bf.CellBudgetFile('mymodel.cbb')
     >>> cbb.list_records()
     >>> rec = cbb.get_data(kstpkper=(0,0), text='RIVER LEAKAGE')
+    >>> ts = cbb.get_node_ts(range(100), text='RIVER LEAKAGE')
 
     """
 
@@ -759,12 +1065,16 @@ class CellBudgetFile:
         filename: Union[str, os.PathLike],
         precision="auto",
         verbose=False,
+        memmap=False,
+        cache_index=False,
         **kwargs,
     ):
         self.filename = Path(filename).expanduser().absolute()
         self.precision = precision
         self.verbose = verbose
         self.file = open(self.filename, "rb")
+        self.mm = None
+        self.cache_index = cache_index
         # Get filesize to ensure this is not an empty file
         self.file.seek(0, 2)
         totalbytes = self.file.tell()
@@ -847,6 +1157,8 @@ class CellBudgetFile:
             raise Exception(
                 f"Budget file could not be read using {precision} precision"
             )
+        if memmap:
+            self.mm = np.memmap(self.filename, dtype=np.uint8, mode="r")
 
     def __enter__(self):
         return self
@@ -950,7 +1262,21 @@ class CellBudgetFile:
         """
         Build the ordered dictionary, which maps the header information
         to the position in the binary file.
+
+        The index is read from the .idx sidecar when cache_index is set and
+        the sidecar is current.  Otherwise the records of the first time
+        step are read header by header and, when the rest of the file
+        repeats them with the same sizes, all remaining headers are read in
+        one strided pass.
         """
+        if self.cache_index:
+            index = load_index(self.filename, self.header_dtype)
+            if index is not None:
+                if "dtype" in index:
+                    raise BudgetIndexError("Improper precision")
+                self._load_index(index)
+                return
+
         asciiset = " "
         for i in range(33, 127):
             asciiset += chr(i)
@@ -974,9 +1300,18 @@ class CellBudgetFile:
         self.recorddict = {}
         # read the remaining records
         ipos = 0
+        strided = False
         while ipos < self.totalbytes:
             self.iposheader.append(ipos)
             header = self._get_header()
+            # first record of the second time step
+            if not strided and len(self.recordarray) > 0:
+                if (header["kstp"], header["kper"]) not in self.kstpkper:
+                    strided = True
+                    ipos = self.file.tell()
+                    if self._build_index_strided():
+                        break
+                    self.file.seek(ipos, 0)
             self.nrecords += 1
             totim = header["totim"]
             if totim == 0:
@@ -1065,6 +1400,167 @@ class CellBudgetFile:
         self.iposheader = np.array(self.iposheader, dtype=np.int64)
         self.iposarray = np.array(self.iposarray, dtype=np.int64)
         self.nper = self.recordarray["kper"].max()
+        if self.cache_index:
+            save_index(
+                self.filename,
+                recordarray=self.recordarray,
+                iposheader=self.iposheader,
+                iposarray=self.iposarray,
+                times=np.array(self.times),
+                kstpkper=np.array(self.kstpkper).reshape(-1, 2),
+                textlist=np.array(self.textlist),
+                imethlist=np.array(self.imethlist),
+                paknamlist=np.array(self.paknamlist),
+                shape=np.array([self.nrow, self.ncol, self.nlay]),
+            )
+
+    def _load_index(self, index):
+        """
+        Set the index from the arrays of an .idx sidecar.
+
+        """
+        self.recordarray = index["recordarray"]
+        self.iposheader = index["iposheader"]
+        self.iposarray = index["iposarray"]
+        self.times = list(index["times"])
+        self.kstpkper = [tuple(kk) for kk in index["kstpkper"]]
+        self.textlist = list(index["textlist"])
+        self.imethlist = list(index["imethlist"])
+        self.paknamlist = list(index["paknamlist"])
+        self.nrow, self.ncol, self.nlay = index["shape"]
+        self.nrecords = len(self.recordarray)
+        self.totalbytes = os.path.getsize(self.filename)
+        self.recorddict = dict(
+            zip(map(tuple, self.recordarray), self.iposarray.tolist())
+        )
+        self.nper = self.recordarray["kper"].max()
+
+    def _build_index_strided(self):
+        """
+        Index the whole file from the records of the first time step when
+        every later time step repeats them with the same headers and sizes.
+        Returns False if it does not.
+
+        """
+        nfirst = len(self.recordarray)
+        block = int(self.iposheader[nfirst])
+        if self.totalbytes % block:
+            return False
+        h1size = self.header1_dtype.itemsize
+        h2size = self.header2_dtype0.itemsize
+        # header and list length fields of every record of a time step
+        names, formats, offsets = [], [], []
+        for j, header in enumerate(self.recordarray):
+            offset = int(self.iposheader[j])
+            names.append(f"h1_{j}")
+            formats.append(self.header1_dtype)
+            offsets.append(offset)
+            if header["nlay"] < 0:
+                names.append(f"h2_{j}")
+                formats.append(self.header2_dtype0)
+                offsets.append(offset + h1size)
+            if header["imeth"] == 6:
+                names.append(f"nam_{j}")
+                formats.append("S64")
+                offsets.append(offset + h1size + h2size)
+            if header["imeth"] in (2, 5, 6):
+                ipos = self._list_dtype(j, header["imeth"])[0]
+                names.append(f"nlist_{j}")
+                formats.append(np.int32)
+                offsets.append(ipos - np.dtype(np.int32).itemsize)
+        dtype = np.dtype(
+            {
+                "names": names,
+                "formats": formats,
+                "offsets": offsets,
+                "itemsize": block,
+            }
+        )
+        steps = np.memmap(self.filename, dtype=dtype, mode="r")
+        first = steps[0]
+        for name in names:
+            field = steps[name]
+            if name.startswith("h1_"):
+                same = [field[f] == first[name][f] for f in ("text", "ncol")]
+                same += [field[f] == first[name][f] for f in ("nrow", "nlay")]
+            elif name.startswith("h2_"):
+                same = [field["imeth"] == first[name]["imeth"]]
+            else:
+                same = [field == first[name]]
+            if not np.logical_and.reduce(same).all():
+                return False
+
+        nstep = len(steps)
+        records = np.empty((nstep, nfirst), dtype=self.header_dtype)
+        records[:] = np.array(self.recordarray, dtype=self.header_dtype)
+        for j in range(nfirst):
+            for name in (f"h1_{j}", f"h2_{j}"):
+                if name in dtype.names:
+                    for f in steps[name].dtype.names:
+                        records[f][:, j] = steps[name][f]
+        # records without header2 have no time of their own; the copies of
+        # the first time step hold its totim, so compute them from kstpkper
+        no_header2 = np.tile(records["nlay"][0] >= 0, nstep)
+        records = records.ravel()
+        totims = {}
+        for i in np.flatnonzero(no_header2 | (records["totim"] == 0)):
+            kk = (records["kstp"][i] - 1, records["kper"][i] - 1)
+            if kk not in totims:
+                totims[kk] = self._totim_from_kstpkper(kk)
+            records["totim"][i] = totims[kk]
+        start = np.arange(nstep, dtype=np.int64)[:, None] * block
+        self.iposheader = (start + self.iposheader[:nfirst]).ravel()
+        self.iposarray = (start + np.array(self.iposarray)).ravel()
+        self.recordarray = records
+        self.nrecords = len(records)
+        totim = records["totim"]
+        self.times = list(_unique_in_order(totim[totim >= 0]))
+        kstpkper = np.column_stack([records["kstp"], records["kper"]])
+        self.kstpkper = [tuple(kk) for kk in _unique_in_order(kstpkper)]
+        self.recorddict = dict(
+            zip(map(tuple, records), self.iposarray.tolist())
+        )
+        if self.verbose:
+            for irec in range(nfirst, self.nrecords):
+                self._print_record(irec)
+        return True
+
+    def _print_record(self, irec):
+        """
+        Print a record header the way the header loop does in verbose mode.
+
+        """
+        header = self.recordarray[irec]
+        for itxt in [
+            "kstp",
+            "kper",
+            "text",
+            "ncol",
+            "nrow",
+            "nlay",
+            "imeth",
+            "delt",
+            "pertim",
+            "totim",
+            "modelnam",
+            "paknam",
+            "modelnam2",
+            "paknam2",
+        ]:
+            s = header[itxt]
+            if isinstance(s, bytes):
+                s = s.decode()
+            print(f"{itxt}: {s}")
+        print("file position: ", self.iposarray[irec])
+        imeth = int(header["imeth"])
+        if imeth not in (5, 6, 7):
+            print("")
+        if imeth in (5, 6):
+            ipos, dtype, nlist = self._list_dtype(irec, imeth)
+            naux = len(dtype.names) - (3 if imeth == 6 else 2)
+            print("naux: ", naux)
+            print("nlist: ", nlist)
+            print("")
 
     def _skip_record(self, header):
         """
@@ -1567,49 +2063,128 @@ class CellBudgetFile:
         for idx, t in enumerate(timesint):
             result[idx, 0] = t
 
-        for itim, k in enumerate(kk):
-            try:
-                v = self.get_data(kstpkper=k, text=text, full3D=True)
-                # skip missing data - required for storage
-                if len(v) > 0:
-                    v = v[0]
-                    istat = 1
-                    for k, i, j in kijlist:
-                        result[itim, istat] = v[k, i, j].copy()
-                        istat += 1
-            except ValueError:
-                v = self.get_data(kstpkper=k, text=text)
-                # skip missing data - required for storage
-                if len(v) > 0:
-                    if self.modelgrid is None:
-                        s = (
-                            "A modelgrid instance must be provided during "
-                            "instantiation to get IMETH=6 timeseries data"
-                        )
-                        raise AssertionError(s)
-
-                    if self.modelgrid.grid_type == "structured":
-                        ndx = [
-                            lrc[0]
-                            * (self.modelgrid.nrow * self.modelgrid.ncol)
-                            + lrc[1] * self.modelgrid.ncol
-                            + (lrc[2] + 1)
-                            for lrc in kijlist
-                        ]
-                    else:
-                        ndx = [
-                            lrc[0] * self.modelgrid.ncpl + (lrc[-1] + 1)
-                            for lrc in kijlist
-                        ]
-
-                    for vv in v:
-                        field = vv.dtype.names[2]
-                        dix = np.where(np.isin(vv["node"], ndx))[0]
-                        if len(dix) > 0:
-                            result[itim, 1:] = vv[field][dix]
+        kij = np.asarray(kijlist, dtype=np.int64).reshape(-1, 3)
+        nodes = (kij[:, 0] * self.nrow + kij[:, 1]) * self.ncol + kij[:, 2]
+        self._fill_node_ts(result, nodes, self.get_indices(text=text))
+        return result
+
+    def get_node_ts(self, nodes, text, paknam=None):
+        """
+        Get a time series of many cells from the binary budget file in a
+        single pass over the selected records.
+
+        Parameters
+        ----------
+        nodes : sequence of ints
+            zero-based node numbers ((layer * nrow + row) * ncol + column)
+        text : str
+            The text identifier for the record.  Examples include
+            'RIVER LEAKAGE', 'STORAGE', 'FLOW RIGHT FACE', etc.
+        paknam : str
+            Only use the records of this package.  (Default is None.)
 
+        Returns
+        ----------
+        out : numpy array
+            Array has size (ntimes, nnodes + 1).  The first column in the
+            data array will contain time (totim).  List records of several
+            packages with the same text are summed, and cells that are not
+            in any list are nan.
+
+        """
+        nodes = np.asarray(nodes, dtype=np.int64).ravel()
+        result = self._init_result(len(nodes))
+        select = self.recordarray["text"] == self._find_text(text)
+        if paknam is not None:
+            select &= self.recordarray["paknam"] == self._find_paknam(paknam)
+        self._fill_node_ts(result, nodes, np.where(select)[0])
         return result
 
+    def _read_array(self, ipos, dtype, count):
+        """
+        Read count values of dtype at byte position ipos, as a view of the
+        memory map in memmap mode.
+
+        """
+        if self.mm is not None:
+            return np.ndarray(
+                (count,), dtype=dtype, buffer=self.mm, offset=int(ipos)
+            )
+        self.file.seek(int(ipos), 0)
+        return np.fromfile(self.file, dtype, count)
+
+    def _list_dtype(self, irec, imeth):
+        """
+        Byte position, dtype and length of the list of a list-style
+        (imeth 2, 5 or 6) record.
+
+        """
+        ipos = int(self.iposarray[irec])
+        int32 = np.dtype(np.int32)
+        fields = [("node", np.int32)]
+        if imeth == 6:
+            fields.append(("node2", np.int32))
+        fields.append(("q", self.realtype))
+        if imeth in (5, 6):
+            naux = int(self._read_array(ipos, int32, 1)[0]) - 1
+            # auxiliary names are only needed for the record size
+            fields += [(f"aux{i}", self.realtype) for i in range(naux)]
+            ipos += int32.itemsize + 16 * naux
+        nlist = int(self._read_array(ipos, int32, 1)[0])
+        return ipos + int32.itemsize, np.dtype(fields), nlist
+
+    def _fill_node_ts(self, result, nodes, irecs):
+        """
+        Put the values of records irecs at zero-based nodes into the rows
+        of result matching their (kstp, kper).
+
+        """
+        ncpl = self.nrow * self.ncol
+        layer, icpl = np.divmod(nodes, ncpl)
+        # column of every one-based node of the lists, -1 if not requested
+        nnodes = max(self.nnodes, int(nodes.max(initial=0)) + 1)
+        column = np.full(nnodes + 1, -1, dtype=np.int64)
+        column[nodes + 1] = np.arange(len(nodes))
+        itims = {kk: itim for itim, kk in enumerate(self.kstpkper)}
+        for irec in irecs:
+            header = self.recordarray[irec]
+            itim = itims[(header["kstp"], header["kper"])]
+            imeth = header["imeth"]
+            nrow, ncol = header["nrow"], header["ncol"]
+            ipos = self.iposarray[irec]
+            if imeth in (0, 1):
+                size = abs(header["nlay"]) * nrow * ncol
+                values = self._read_array(ipos, self.realtype, size)[nodes]
+            elif imeth in (3, 4):
+                size = nrow * ncol
+                if imeth == 3:
+                    ilayer = self._read_array(ipos, np.int32, size)
+                    ipos += size * np.dtype(np.int32).itemsize
+                    onlayer = ilayer[icpl] - 1 == layer
+                else:
+                    onlayer = layer == 0
+                data = self._read_array(ipos, self.realtype, size)
+                values = np.where(onlayer, data[icpl], np.nan)
+            elif imeth in (2, 5, 6):
+                ipos, dtype, nlist = self._list_dtype(irec, imeth)
+                data = self._read_array(ipos, dtype, nlist)
+                icol = column[np.clip(data["node"], 0, len(column) - 1)]
+                found = icol >= 0
+                icol = icol[found]
+                # NaN for the nodes that are not in the list at all
+                values = np.full(len(nodes), np.nan)
+                sums = np.bincount(
+                    icol, weights=data["q"][found], minlength=len(nodes)
+                )
+                listed = np.bincount(icol, minlength=len(nodes)) > 0
+                values[listed] = sums[listed]
+            else:
+                raise ValueError(f"invalid imeth value - {imeth}")
+            # records of several packages with the same text add up
+            row = result[itim, 1:]
+            hit = ~np.isnan(values)
+            row[hit] = np.nan_to_num(row[hit]) + values[hit]
+
     def _build_kijlist(self, idx):
         if isinstance(idx, list):
             kijlist = idx
@@ -1967,6 +2542,7 @@ class CellBudgetFile:
         """
         Close the file handle
         """
+        self.mm = None
         self.file.close()
         return
 
@@ -63,6 +63,10 @@ class ListBudget:
         self.entries = []
         self.null_entries = []
 
+        # budgets already parsed, kept so that update() only reads the part
+        # of the file written since the last call
+        self._reset_resume()
+
         self.time_line_idx = 20
         if timeunit.upper() == "SECONDS":
             self.timeunit = "S"
@@ -101,6 +105,36 @@ class ListBudget:
     def set_budget_key(self):
         raise Exception("Must be overridden...")
 
+    def update(self, maxentries=None):
+        """
+        Read the budgets written to the list file since it was last read.
+
+        Only the part of the file after the last budget read before is
+        parsed, so the budgets of a model that is still running can be
+        followed at little cost. The file is parsed again from the start
+        if it was rewritten (e.g. by a new run) since the last read.
+
+        Parameters
+        ----------
+        maxentries : int, optional
+            maximum number of budgets to read from the start of the file.
+            (default is None)
+
+        Examples
+        --------
+        >>> mf_list = MfListBudget("my_model.list")
+        >>> # ... the model writes more time steps ...
+        >>> mf_list.update()
+        >>> incremental, cumulative = mf_list.get_budget()
+
+        """
+        self.f = open(self.file_name, "r", encoding="ascii", errors="replace")
+        try:
+            self._load(maxentries)
+        finally:
+            self.f.close()
+        self._isvalid = len(self.idx_map) > 0
+
     def isvalid(self):
         """
         Get a boolean indicating if budget data are available in the file.
@@ -715,14 +749,56 @@ class ListBudget:
         self.null_entries = [null_entries, null_entries]
         return incdict, cumdict
 
+    def _reset_resume(self):
+        self._resume = 0
+        self._resume_stamp = b""
+        self._done_idx = []
+        self._done_inc = {}
+        self._done_cum = {}
+        self._done_totim = []
+        self._done_tslen = []
+
+    def _stamp(self, offset, nbytes=64):
+        # the bytes just before offset, used to tell whether the file was
+        # only appended to since offset was recorded
+        with open(self.file_name, "rb") as f:
+            f.seek(max(offset - nbytes, 0))
+            return f.read(min(offset, nbytes))
+
+    def _can_resume(self):
+        if self._resume == 0:
+            return True
+        if os.path.getsize(self.file_name) < self._resume:
+            return False
+        return self._stamp(self._resume) == self._resume_stamp
+
     def _load(self, maxentries=None):
-        self._build_index(maxentries)
-        incdict, cumdict = self._set_entries()
-        if incdict is None and cumdict is None:
-            return
-        totim = []
-        tslens = []
-        for ts, sp, seekpoint in self.idx_map:
+        # The budgets found before self._resume were parsed by an earlier
+        # call. The last budget found is always parsed again on the next
+        # call, as the model may not have finished writing it.
+        if not self._can_resume():
+            self._reset_resume()
+            self.idx_map = []
+            self.entries = []
+            self.null_entries = []
+        ndone = len(self._done_idx)
+        if maxentries is not None:
+            maxentries -= ndone
+        if maxentries is not None and maxentries < 1:
+            new_idx = []
+        else:
+            self.f.seek(self._resume)
+            new_idx = self._get_index(maxentries)
+        self.idx_map = self._done_idx + new_idx
+        if len(self.entries) == 0:
+            incdict, cumdict = self._set_entries()
+            if incdict is None and cumdict is None:
+                return
+            self._done_inc, self._done_cum = incdict, cumdict
+        incdict, cumdict = self._done_inc, self._done_cum
+        totim = self._done_totim
+        tslens = self._done_tslen
+        for ts, sp, seekpoint in new_idx:
             tinc, tcum = self._get_sp(ts, sp, seekpoint)
             for entry in self.entries:
                 incdict[entry].append(tinc[entry])
@@ -769,6 +845,17 @@ class ListBudget:
         self.cum["time_step"] = idx_array[:, 0] - 1
         self.cum["stress_period"] = idx_array[:, 1] - 1
 
+        # keep all but the last budget for the next call
+        if len(new_idx) > 0:
+            ndone = nentries - 1
+            self._resume = self.idx_map[-1][2]
+            self._resume_stamp = self._stamp(self._resume)
+            self._done_idx = self.idx_map[:ndone]
+            for lst in [totim, tslens] + [
+                d[entry] for d in (incdict, cumdict) for entry in self.entries
+            ]:
+                del lst[ndone:]
+
         return
 
     def _get_sp(self, ts, sp, seekpoint):
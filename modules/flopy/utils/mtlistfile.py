@@ -3,6 +3,7 @@ This is a class for reading the mass budget from a (multi-component)
 mt3d(usgs) run. Also includes support for SFT budget.
 
 """
+import os
 import warnings
 
 import numpy as np
@@ -20,6 +21,13 @@ class MtListBudget:
         the list file name
 
 
+    Notes
+    -----
+    Each call to parse() only reads the part of the file written since the
+    previous call, so the budgets of a running model can be followed by
+    calling parse() again. The file is read from the start if it was
+    rewritten since the previous call.
+
     Examples
     --------
     >>> mt_list = MtListBudget("my_mt3d.list")
@@ -35,9 +43,6 @@ class MtListBudget:
 
         self.file_name = file_name
         self.tssp_lines = 0
-        # in case transport step number goes above 99999
-        # which might be outputted as *****
-        self.tkstp_overflow = 100000
 
         # Assign the budgetkey, which should have been overridden
         self.gw_budget_key = ">>>for component no."
@@ -48,6 +53,8 @@ class MtListBudget:
         line = "TRANSPORT TIME STEP"
         self.tkstp_key = line.lower()
 
+        self._reset_resume()
+
         return
 
     def parse(
@@ -81,10 +88,11 @@ class MtListBudget:
             error_message="MtListBudget.parse() requires pandas.",
         )
 
-        self.gw_data = {}
-        self.sw_data = {}
-        self.lcount = 0
+        if not self._can_resume():
+            self._reset_resume()
+        self._restore()
         with open(self.file_name) as f:
+            f.seek(self._resume_state[0])
             while True:
                 line = self._readline(f)
                 if line is None:
@@ -101,6 +109,7 @@ class MtListBudget:
                             break
                     else:
                         self._parse_gw(f, line)
+                    self._mark(f)
                 elif self.sw_budget_key in line:
                     if forgive:
                         try:
@@ -113,8 +122,10 @@ class MtListBudget:
                             break
                     else:
                         self._parse_sw(f, line)
+                    self._mark(f)
                 elif self.tkstp_key in line:
                     self.tkstp_overflow = int(line[51:58])
+        self._resume_stamp = self._stamp(self._resume_state[0])
 
         if len(self.gw_data) == 0:
             raise Exception("no groundwater budget info found...")
@@ -124,9 +135,8 @@ class MtListBudget:
         min_len = 1e10
         for i, lst in self.gw_data.items():
             min_len = min(min_len, len(lst))
-        for i, lst in self.gw_data.items():
-            self.gw_data[i] = lst[:min_len]
-        df_gw = pd.DataFrame(self.gw_data)
+        gw_data = {i: lst[:min_len] for i, lst in self.gw_data.items()}
+        df_gw = pd.DataFrame(gw_data)
         df_gw.loc[:, "totim"] = df_gw.pop("totim_1")
 
         # if cumulative:
@@ -154,9 +164,8 @@ class MtListBudget:
             for i, lst in self.sw_data.items():
                 min_len = min(min_len, len(lst))
             min_len = min(min_len, df_gw.shape[0])
-            for i, lst in self.sw_data.items():
-                self.sw_data[i] = lst[:min_len]
-            df_sw = pd.DataFrame(self.sw_data)
+            sw_data = {i: lst[:min_len] for i, lst in self.sw_data.items()}
+            df_sw = pd.DataFrame(sw_data)
             df_sw.loc[:, "totim"] = df_gw.totim.iloc[:min_len].values
 
             # if cumulative:
@@ -181,6 +190,56 @@ class MtListBudget:
                 df_gw.pop(col)
         return df_gw, df_sw
 
+    def _reset_resume(self):
+        self.gw_data = {}
+        self.sw_data = {}
+        # in case transport step number goes above 99999
+        # which might be outputted as *****
+        self.tkstp_overflow = 100000
+        # file position, line count, tkstp_overflow and length of the
+        # gw_data and sw_data lists after the last budget fully read
+        self._resume_state = (0, 0, self.tkstp_overflow, {}, {})
+        self._resume_stamp = b""
+
+    def _stamp(self, offset, nbytes=64):
+        # the bytes just before offset, used to tell whether the file was
+        # only appended to since offset was recorded
+        with open(self.file_name, "rb") as f:
+            f.seek(max(offset - nbytes, 0))
+            return f.read(min(offset, nbytes))
+
+    def _can_resume(self):
+        offset = self._resume_state[0]
+        if offset == 0:
+            return True
+        if os.path.getsize(self.file_name) < offset:
+            return False
+        return self._stamp(offset) == self._resume_stamp
+
+    def _mark(self, f):
+        # a budget that ends on an unterminated line may still be written
+        if not self._eol:
+            return
+        self._resume_state = (
+            f.tell(),
+            self.lcount,
+            self.tkstp_overflow,
+            {k: len(v) for k, v in self.gw_data.items()},
+            {k: len(v) for k, v in self.sw_data.items()},
+        )
+
+    def _restore(self):
+        # drop whatever was read after the last budget fully read
+        _, self.lcount, self.tkstp_overflow, gw_lens, sw_lens = (
+            self._resume_state
+        )
+        for data, lens in ((self.gw_data, gw_lens), (self.sw_data, sw_lens)):
+            for key in list(data):
+                if key in lens:
+                    del data[key][lens[key] :]
+                else:
+                    del data[key]
+
     def _diff(self, df):
         pd = import_optional_dependency(
             "pandas",
@@ -239,7 +298,9 @@ class MtListBudget:
         return new_df
 
     def _readline(self, f):
-        line = f.readline().lower()
+        line = f.readline()
+        self._eol = line.endswith("\n")
+        line = line.lower()
         self.lcount += 1
         if line == "":
             return None
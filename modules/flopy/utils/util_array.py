@@ -9,8 +9,9 @@ util_array module.  Contains the util_2d, util_3d and transient_2d classes.
 
 import copy
 import os
+import re
 import shutil
-from warnings import warn
+from warnings import catch_warnings, simplefilter, warn
 
 import numpy as np
 
@@ -2482,8 +2483,8 @@ class Util2d(DataInterface):
                 f"Util2d.load_block(): expected 2 dimensions, found shape {shape}"
             )
         nrow, ncol = shape
-        data = np.ma.zeros(shape, dtype=dtype)
-        data.mask = True
+        data = np.zeros(shape, dtype=dtype)
+        covered = np.zeros(shape, dtype=bool)
         openfile = not hasattr(file_in, "read")
         if openfile:
             file_in = open(file_in, "r")
@@ -2499,11 +2500,12 @@ class Util2d(DataInterface):
             i1, i2 = int(raw[0]) - 1, int(raw[1])
             j1, j2 = int(raw[2]) - 1, int(raw[3])
             data[i1:i2, j1:j2] = raw[4]
+            covered[i1:i2, j1:j2] = True
         if openfile:
             file_in.close()
-        if data.mask.any():
+        if not covered.all():
             warn("Util2d.load_block(): blocks do not cover full array")
-        return data.data
+        return data
 
     @staticmethod
     def load_txt(shape, file_in, dtype, fmtin):
@@ -2524,6 +2526,10 @@ class Util2d(DataInterface):
         This method is similar to MODFLOW's U1DREL, U1DINT, U2DREL and U2DINT
         subroutines, but only for formatted files.
 
+        Whole blocks of lines are parsed at once by numpy when the file
+        handle can be rewound; lines the block parsers cannot read are
+        then read again value by value.
+
         Returns
         -------
         1-D or 2-D array
@@ -2541,6 +2547,14 @@ class Util2d(DataInterface):
         if openfile:
             file_in = open(file_in, "r")
         npl, fmt, width, decimal = ArrayFormat.decode_fortran_descriptor(fmtin)
+        if npl == "free":
+            data = Util2d._load_txt_free(num_items, file_in, dtype)
+        else:
+            data = Util2d._load_txt_fixed(shape, file_in, dtype, npl, width)
+        if data is not None:
+            if openfile:
+                file_in.close()
+            return data.reshape(shape)
         items = []
         while len(items) < num_items:
             line = file_in.readline()
@@ -2579,6 +2593,102 @@ class Util2d(DataInterface):
             )
         return data.reshape(shape)
 
+    @staticmethod
+    def _load_txt_free(num_items, file_in, dtype, block_lines=10000):
+        """Read a free format array in blocks of lines.
+
+        The number of lines of the next block (at most block_lines) is
+        estimated from the number of values of the first line, so no line
+        past the array is read unless later lines hold more values than the
+        first one.  Returns
+        None, with the file rewound, if the handle cannot be rewound or a
+        block cannot be parsed in one go.
+        """
+        try:
+            start = file_in.tell()
+        except (AttributeError, OSError, ValueError):
+            return None
+        data = np.empty(num_items, dtype=dtype)
+        n, per_line = 0, 0
+        while n < num_items:
+            nlines = 1
+            if per_line:
+                nlines = min(max(1, (num_items - n) // per_line), block_lines)
+            text = "".join([file_in.readline() for _ in range(nlines)])
+            try:
+                values = Util2d._parse_free(text, dtype)
+            except (ValueError, DeprecationWarning):
+                values = None
+            if not text or values is None or n + values.size > num_items:
+                file_in.seek(start)
+                return None
+            data[n : n + values.size] = values
+            n += values.size
+            per_line = per_line or values.size
+        return data
+
+    @staticmethod
+    def _parse_free(text, dtype):
+        """Parse free format values, with n*value repeat counts."""
+        text = text.replace(",", " ")
+        if "*" not in text:
+            with catch_warnings():
+                # trailing text is a warning in older numpy versions
+                simplefilter("error", DeprecationWarning)
+                return np.fromstring(text, dtype=dtype, sep=" ")
+        items = np.array(text.split())
+        repeat = np.char.find(items, "*") >= 0
+        count = np.ones(items.size, dtype=np.int64)
+        parts = np.char.partition(items[repeat], "*")
+        count[repeat] = parts[:, 0].astype(np.int64)
+        items[repeat] = parts[:, 2]
+        return np.repeat(items.astype(dtype), count)
+
+    @staticmethod
+    def _load_txt_fixed(
+        shape, file_in, dtype, npl, width, block_lines=10000
+    ):
+        """Read a fixed width array, each row starting on a new line.
+
+        The lines of up to block_lines lines worth of rows are read at once
+        and cut into fields of the format width as one numpy string array.
+        Returns None, with the file rewound, if the fields do not add up to
+        the array.
+        """
+        try:
+            start = file_in.tell()
+        except (AttributeError, OSError, ValueError):
+            return None
+        num_items = int(np.prod(shape))
+        nrow = shape[0] if len(shape) == 2 else 1
+        row_lines = -(-shape[-1] // npl)
+        block_rows = max(1, block_lines // row_lines)
+        linelen = npl * width
+        data = np.empty(num_items, dtype=dtype)
+        n = 0
+        for i in range(0, nrow, block_rows):
+            nlines = min(block_rows, nrow - i) * row_lines
+            lines = [file_in.readline() for _ in range(nlines)]
+            text = "".join(
+                [
+                    line.rstrip("\r\n").ljust(linelen)[:linelen]
+                    for line in lines
+                ]
+            )
+            try:
+                items = np.frombuffer(text.encode("ascii"), dtype=f"S{width}")
+                items = items[np.char.strip(items) != b""]
+                if n + items.size > num_items:
+                    break
+                data[n : n + items.size] = items.astype(dtype)
+            except (UnicodeEncodeError, ValueError):
+                break
+            n += items.size
+        if n == num_items:
+            return data
+        file_in.seek(start)
+        return None
+
     @staticmethod
     def write_txt(
         shape, file_out, data, fortran_format="(FREE)", python_format=None
@@ -2591,16 +2701,19 @@ class Util2d(DataInterface):
                 delimiter="",
             )
             return
-        if not hasattr(file_out, "write"):
+        openfile = not hasattr(file_out, "write")
+        if openfile:
             file_out = open(file_out, "w")
-        file_out.write(
-            Util2d.array2string(
+        file_out.writelines(
+            Util2d.array2chunks(
                 shape,
                 data,
                 fortran_format=fortran_format,
                 python_format=python_format,
             )
         )
+        if openfile:
+            file_out.close()
 
     @staticmethod
     def array2string(shape, data, fortran_format="(FREE)", python_format=None):
@@ -2612,6 +2725,31 @@ class Util2d(DataInterface):
         this routine now supports fixed format arrays where the numbers
         may touch.
         """
+        return "".join(
+            Util2d.array2chunks(
+                shape,
+                data,
+                fortran_format=fortran_format,
+                python_format=python_format,
+            )
+        )
+
+    @staticmethod
+    def array2chunks(
+        shape,
+        data,
+        fortran_format="(FREE)",
+        python_format=None,
+        chunk_size=100000,
+    ):
+        """
+        Generate the text of array2string in pieces of chunk_size values.
+
+        Each piece is formatted by a single printf-style operation with the
+        line breaks built into the format string, so no value goes through
+        Python string formatting on its own.  Formats without a printf
+        equivalent are formatted value by value.
+        """
         if len(shape) == 2:
             nrow, ncol = shape
         else:
@@ -2645,16 +2783,47 @@ class Util2d(DataInterface):
                 )
         # write the array to a string
         len_data = data.size
-        str_fmt_data = [
-            output_fmt.format(d) + "\n"
-            if (((i + 1) % column_length == 0.0) and (i != 0 or ncol == 1))
-            or ((i + 1 == ncol) and (ncol != 1))
-            or (i + 1 == len_data)
-            else output_fmt.format(d)
-            for i, d in enumerate(data.flatten())
-        ]
-        s = "".join(str_fmt_data)
-        return s
+        printf_fmt = Util2d._printf_format(output_fmt, data.dtype)
+        if printf_fmt is None:
+            str_fmt_data = [
+                output_fmt.format(d) + "\n"
+                if (((i + 1) % column_length == 0.0) and (i != 0 or ncol == 1))
+                or ((i + 1 == ncol) and (ncol != 1))
+                or (i + 1 == len_data)
+                else output_fmt.format(d)
+                for i, d in enumerate(data.flatten())
+            ]
+            yield "".join(str_fmt_data)
+            return
+        values = data.ravel()
+        for start in range(0, len_data, chunk_size):
+            i = np.arange(start, min(start + chunk_size, len_data))
+            newline = (
+                (((i + 1) % column_length == 0) & ((i != 0) | (ncol == 1)))
+                | ((i + 1 == ncol) & (ncol != 1))
+                | (i + 1 == len_data)
+            )
+            fmt = "".join(
+                np.where(newline, printf_fmt + "\n", printf_fmt).tolist()
+            )
+            yield fmt % tuple(values[start : start + chunk_size].tolist())
+
+    @staticmethod
+    def _printf_format(python_format, dtype):
+        """
+        printf-style equivalent of a "{0:<width>.<decimal><type>}" python
+        format, or None if it has none (fill, alignment or grouping options)
+        or the format type does not suit dtype.
+        """
+        match = re.fullmatch(
+            r"\{0?:([+ ]?0?\d*(?:\.\d+)?)([deEfFgG])\}", python_format
+        )
+        if match is None:
+            return None
+        # formatting floats as integers raises in the python format
+        if match.group(2) == "d" and np.dtype(dtype).kind != "i":
+            return None
+        return "%" + match.group(1) + match.group(2)
 
     @staticmethod
     def load_bin(shape, file_in, dtype, bintype=None):
@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+"""
+Headless batch post-processing of APEX-MODFLOW runs.
+
+Runs without QGIS on top of the same readers the plugin uses (amf_reader,
+result_cache, mf_inputs), so the outputs of many calibration runs can be
+post-processed in parallel on compute nodes:
+
+    python -m APEXMOD.pyfolder.amf_batch RUN [RUN ...] --job job.json --workers 8
+
+RUN is an 'APEX-MODFLOW' model folder (the one holding APEXCONT.DAT) or a
+project folder that contains one. The job spec is a JSON file:
+
+    {
+      "output": "exported_files",
+      "jobs": [
+        {"var": "head", "timestep": "month", "layers": [1], "grid_ids": [101, 202],
+         "periods": {"start": "2001-01-01", "end": "2005-12-31"}},
+        {"var": "recharge", "timestep": "year", "grid_table": ["csv", "gpkg"]},
+        {"var": "gwsw", "timestep": "day", "grid_ids": [355]},
+        {"var": "watertable", "timestep": "month", "grid_ids": "all",
+         "depth_to_water": false, "obd_columns": {"101": "well_1"}},
+        {"var": "channel", "subareas": [1, 7], "variables": ["FLO_OUTm^3/s"],
+         "timestep": "day", "output_step": "Monthly",
+         "obd_file": "cha_flow.obd", "obd_columns": {"7": "gage_7"}}
+      ]
+    }
+
+Each run writes its files (time series text files, a statistics summary and
+grid attribute tables as CSV or GeoPackage) to RUN/<output>.
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pandas as pd
+
+from .amf_reader import GWSW_FILES, gwsw_series, open_block_file, period_dates, period_index
+from .apexmod_utils import ObjFns
+from .mf_inputs import find_dis
+from .result_cache import get_cache_dir, load_blocks, read_rch_series
+from .wt_export import aggregate, export_all
+
+VERSION = "version 1.5."
+
+OUTPUT_FILES = {
+    'head': {
+        'month': "amf_MF_head_monthly.out",
+        'year': "amf_MF_head_yearly.out"},
+    'recharge': {
+        'day': "amf_MF_recharge.out",
+        'month': "amf_MF_recharge_monthly.out",
+        'year': "amf_MF_recharge_yearly.out"},
+    'gwsw': GWSW_FILES,
+}
+# time step of the channel output steps that are averaged from daily values
+OUTPUT_STEPS = {'Monthly': 'month', 'Annual': 'year'}
+
+
+class RunFolder:
+    """Stand-in for the plugin object outside QGIS: provides the
+    dirs_and_paths and define_sim_period the readers rely on."""
+
+    def __init__(self, path, output="exported_files"):
+        path = os.path.normpath(os.path.abspath(path))
+        if not os.path.isfile(os.path.join(path, "APEXCONT.DAT")):
+            path = os.path.join(path, "APEX-MODFLOW")
+        self.apexmf_model = path
+        self.output = os.path.join(path, output)
+
+    def dirs_and_paths(self):
+        return {
+            'apexmf_model': self.apexmf_model,
+            'MODFLOW': os.path.join(self.apexmf_model, "MODFLOW"),
+            'SALINITY': os.path.join(self.apexmf_model, "SALINITY"),
+            'exported_files': self.output,
+        }
+
+    def define_sim_period(self):
+        with open(os.path.join(self.apexmf_model, 'APEXCONT.DAT'), "r") as f:
+            data = [x.strip().split() for x in f if x.strip()]
+        numyr = int(data[0][0])
+        styr = int(data[0][1])
+        stmon = int(data[0][2])
+        stday = int(data[0][3])
+        edyr = styr + numyr - 1
+        stdate = datetime.datetime(styr, stmon, 1) + datetime.timedelta(stday - 1)
+        eddate = datetime.datetime(edyr, 12, 31)
+        return stdate, eddate
+
+
+def _stats(sims, obds):
+    stats = ObjFns.evaluate(sims, obds)
+    return {
+        'NSE': stats['nse'],
+        'KGE': stats['kge'],
+        'R2': stats['rsq'],
+        'PBIAS': stats['pbias'],
+        'RMSE': stats['rmse'],
+        'logNSE': stats['lognse'],
+    }
+
+
+def _write_series(path, df, stats=None):
+    """Text file in the layout of the dialog exports."""
+    time = datetime.datetime.now().strftime('- %m/%d/%y %H:%M:%S -')
+    with open(path, 'w') as f:
+        f.write("# {} is created by APEXMOD plugin {}{}\n".format(
+            os.path.basename(path), VERSION, time))
+        df.to_csv(
+            f, index_label="Date", sep='\t', float_format='%10.4f',
+            lineterminator='\n', encoding='utf-8', na_rep='-999')
+        if stats is not None:
+            f.write('\n')
+            f.write("# Statistics\n")
+            f.write("Nash–Sutcliffe: {:.4f}\n".format(stats['NSE']))
+            f.write("R-squared: {:.4f}\n".format(stats['R2']))
+            f.write("PBIAS: {:.4f}\n".format(stats['PBIAS']))
+            f.write("RMSE: {:.4f}\n".format(stats['RMSE']))
+            f.write("KGE: {:.4f}\n".format(stats['KGE']))
+            f.write("log-NSE: {:.4f}\n".format(stats['logNSE']))
+
+
+def write_gpkg_table(path, name, df):
+    """Write a DataFrame as a non-spatial (attributes) GeoPackage table that
+    QGIS can join to mf_grid on grid_id."""
+    con = sqlite3.connect(path)
+    try:
+        con.execute("PRAGMA application_id = 1196444487")
+        con.execute("PRAGMA user_version = 10200")
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS gpkg_spatial_ref_sys ("
+            "srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY, "
+            "organization TEXT NOT NULL, organization_coordsys_id INTEGER NOT NULL, "
+            "definition TEXT NOT NULL, description TEXT)")
+        con.executemany(
+            "INSERT OR IGNORE INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)", [
+                ("Undefined cartesian SRS", -1, "NONE", -1, "undefined", None),
+                ("Undefined geographic SRS", 0, "NONE", 0, "undefined", None)])
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS gpkg_contents ("
+            "table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, "
+            "identifier TEXT UNIQUE, description TEXT DEFAULT '', "
+            "last_change DATETIME NOT NULL DEFAULT "
+            "(strftime('%Y-%m-%dT%H:%M:%fZ','now')), "
+            "min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE, srs_id INTEGER)")
+        con.execute("DROP TABLE IF EXISTS \"{}\"".format(name))
+        con.execute("DELETE FROM gpkg_contents WHERE table_name = ?", (name,))
+        df.to_sql(name, con, index=True, index_label=df.index.name or "fid")
+        con.execute(
+            "INSERT INTO gpkg_contents (table_name, data_type, identifier) "
+            "VALUES (?, 'attributes', ?)", (name, name))
+        con.commit()
+    finally:
+        con.close()
+
+
+def _filter_periods(df, job):
+    periods = job.get('periods')
+    if periods:
+        df = df[periods.get('start'):periods.get('end')]
+    return df
+
+
+def _grid_output(run, job):
+    """head, recharge and gwsw: time series of grid cells and/or the
+    whole-grid attribute table, for each requested layer."""
+    stdate, eddate = run.define_sim_period()
+    var = job['var']
+    timestep = job.get('timestep', 'month')
+    wd = run.dirs_and_paths()['MODFLOW']
+    amf = open_block_file(os.path.join(wd, OUTPUT_FILES[var][timestep]))
+    dates = period_index(amf, stdate, timestep)
+    written = []
+    for layer in job.get('layers', [1]):
+        tag = "{}_{}".format(var, timestep) if var != 'head' else "head_L{}_{}".format(layer, timestep)
+        grid_ids = job.get('grid_ids')
+        if grid_ids:
+            grid_ids = [int(i) for i in grid_ids]
+            if var == 'gwsw':
+                dis = find_dis(wd)
+                if dis is None:
+                    raise FileNotFoundError("no .dis file in {}".format(wd))
+                df = gwsw_series(wd, grid_ids, stdate, dis.ncol, timestep)
+            else:
+                ts = amf.get_series([i - 1 for i in grid_ids], layer)
+                df = pd.DataFrame(ts, index=dates, columns=grid_ids)
+            df = _filter_periods(df, job)
+            path = os.path.join(run.output, "apexmf_{}.txt".format(tag))
+            _write_series(path, df)
+            written.append(path)
+        formats = job.get('grid_table') or []
+        if formats and var != 'gwsw':
+            table = np.asarray(load_blocks(amf.path, get_cache_dir(run), layer)).T
+            nvals, nper = table.shape
+            # dialog column names: %b-%Y for monthly, %Y for yearly, %m-%d-%Y for daily
+            fmt = {'day': "%m-%d-%Y", 'month': "%b-%Y", 'year': "%Y"}[timestep]
+            df = pd.DataFrame(table, columns=dates.strftime(fmt))
+            df.index = pd.RangeIndex(1, nvals + 1, name="grid_id")
+            keep = _filter_periods(pd.Series(range(nper), index=dates), job).values
+            df = df.iloc[:, keep]
+            if 'csv' in formats:
+                path = os.path.join(run.output, "mf_{}.csv".format(tag))
+                df.to_csv(path, float_format='%.5f')
+                written.append(path)
+            if 'gpkg' in formats:
+                path = os.path.join(run.output, "apexmf_results.gpkg")
+                write_gpkg_table(path, "mf_{}".format(tag), df)
+                written.append(path)
+    return written, []
+
+
+def _resample(series, output_step):
+    """Mean of a daily series over each month or year (see wt_export.aggregate)."""
+    dates, values = aggregate(
+        pd.DatetimeIndex(series.index), series.to_numpy(dtype=float)[:, None],
+        OUTPUT_STEPS[output_step])
+    return pd.Series(values[:, 0], index=dates, name=series.name)
+
+
+def _watertable(run, job):
+    """Simulated water table (or depth to water) at observation cells, with
+    statistics against modflow.obd (see wt_export.export_all)."""
+    stdate, eddate = run.define_sim_period()
+    wd = run.dirs_and_paths()['MODFLOW']
+    grid_ids = job.get('grid_ids', "all")
+    periods = job.get('periods')
+    written, summary = export_all(
+        wd, run.output, stdate, get_cache_dir(run),
+        timestep=job.get('timestep', 'day'),
+        depth_to_water=job.get('depth_to_water', False),
+        obd_columns=job.get('obd_columns'),
+        grid_ids=None if grid_ids == "all" else grid_ids,
+        periods=(periods.get('start'), periods.get('end')) if periods else None)
+    stats_rows = [
+        dict(var="watertable", id=row.grid_id, NSE=row.nse, KGE=row.kge, R2=row.rsq,
+             PBIAS=row.pbias, RMSE=row.rmse, logNSE=row.lognse)
+        for row in summary.itertuples()]
+    return written, stats_rows
+
+
+def _channel(run, job):
+    """APEX channel (.RCH) variables of subareas, with statistics against a
+    cha*.obd file when observed columns are given."""
+    wd = run.dirs_and_paths()['apexmf_model']
+    stdate, eddate = run.define_sim_period()
+    cha_files = glob.glob(os.path.join(wd, "*.RCH"))
+    if not cha_files:
+        raise FileNotFoundError("no .RCH file in {}".format(wd))
+    cha_file = cha_files[0]
+    timestep = job.get('timestep', 'day')
+    output_step = job.get('output_step', 'Daily')
+    obd_columns = {str(k): v for k, v in job.get('obd_columns', {}).items()}
+    obds_all = None
+    if obd_columns:
+        obds_all = pd.read_csv(
+                            os.path.join(wd, job['obd_file']),
+                            sep='\t',
+                            comment='#',
+                            index_col=0,
+                            na_values=[-999, ""],
+                            parse_dates=True)
+    written, stats_rows = [], []
+    for sub_no in job.get('subareas', []):
+        for cha_var in job.get('variables', []):
+            sims = read_rch_series(cha_file, int(sub_no), [cha_var], get_cache_dir(run))[cha_var]
+            sims.index = period_dates(stdate, len(sims), timestep)
+            obds = None
+            if str(sub_no) in obd_columns:
+                obds = obds_all.loc[:, obd_columns[str(sub_no)]]
+            if output_step in OUTPUT_STEPS:
+                sims = _resample(sims, output_step)
+                if obds is not None:
+                    obds = _resample(obds, output_step)
+            sims = _filter_periods(sims, job)
+            name = "cha_{}_sub({})_{}".format(cha_var[:-2], sub_no, output_step)
+            if obds is None:
+                path = os.path.join(run.output, name + ".txt")
+                _write_series(path, sims.to_frame())
+            else:
+                df = pd.concat([sims, obds], axis=1)
+                df_d = df.dropna(how='any', axis=0)
+                stats = None
+                if len(df_d) > 1:
+                    stats = _stats(df_d.iloc[:, 0].to_numpy(), df_d.iloc[:, 1].to_numpy())
+                    stats_rows.append(dict(var=cha_var, id=sub_no, **stats))
+                path = os.path.join(run.output, name + "_obd.txt")
+                _write_series(path, df, stats)
+            written.append(path)
+    return written, stats_rows
+
+
+JOB_TYPES = {
+    'head': _grid_output,
+    'recharge': _grid_output,
+    'gwsw': _grid_output,
+    'watertable': _watertable,
+    'channel': _channel,
+}
+
+
+def process_run(path, spec):
+    """Run every job of the spec on one run folder.
+
+    Returns (run folder, list of written files, list of error messages).
+    """
+    run = RunFolder(path, spec.get('output', "exported_files"))
+    os.makedirs(run.output, exist_ok=True)
+    written, stats_rows, errors = [], [], []
+    for job in spec.get('jobs', []):
+        try:
+            files, rows = JOB_TYPES[job['var']](run, job)
+        except Exception as e:
+            errors.append("{}: {}".format(job.get('var'), e))
+            continue
+        written.extend(files)
+        stats_rows.extend(rows)
+    if stats_rows:
+        path = os.path.join(run.output, "stats_summary.csv")
+        pd.DataFrame(stats_rows).to_csv(path, index=False, float_format='%.4f')
+        written.append(path)
+    return run.apexmf_model, written, errors
+
+
+def _process_run_star(args):
+    return process_run(*args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="amf_batch", description="Post-process APEX-MODFLOW runs without QGIS.")
+    parser.add_argument("runs", nargs="+", help="run folders (glob patterns allowed)")
+    parser.add_argument("--job", required=True, help="job spec (JSON)")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="number of runs processed in parallel")
+    args = parser.parse_args(argv)
+
+    with open(args.job, "r") as f:
+        spec = json.load(f)
+    runs = []
+    for pattern in args.runs:
+        runs.extend(sorted(glob.glob(pattern)) or [pattern])
+
+    tasks = [(run, spec) for run in runs]
+    if args.workers > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(min(args.workers, len(tasks))) as pool:
+            results = pool.imap_unordered(_process_run_star, tasks)
+            results = list(results)
+    else:
+        results = [process_run(*t) for t in tasks]
+
+    nerr = 0
+    for run, written, errors in results:
+        print("{}: {} file(s) written".format(run, len(written)))
+        for e in errors:
+            print("  error - {}".format(e), file=sys.stderr)
+        nerr += len(errors)
+    return 1 if nerr else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
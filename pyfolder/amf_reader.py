@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+Readers for the block-formatted APEX-MODFLOW output files
+(amf_MF_head_*.out, amf_MF_recharge*.out, amf_MF_gwsw*.out, ...).
+
+These files are a sequence of period headers ("Day: 1", "month: 1 year: 2000",
+"year: 2000"), optional "layer: n" headers and blocks of numbers. The file is
+scanned once to build an offset index keyed by (period, layer); a block is
+then parsed by seeking straight to it.
+
+The period headers alone (label, byte offset and line count of every
+period) are also kept in a small sidecar file next to the output, so the
+date pickers can be filled without scanning the output again.
+"""
+
+import datetime
+import mmap
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+PERIOD_KEYS = ("Day:", "month:", "year:")
+LAYER_KEY = "layer:"
+SIDECAR_EXT = ".periods"
+
+# Any line starting with a letter (or "--") is a header or a comment line;
+# everything between two of them is numeric data.
+_TEXT_LINE = re.compile(rb"^[ \t]*(?:[A-Za-z]|--)[^\r\n]*", re.M)
+
+GWSW_FILES = {
+    'day': "amf_MF_gwsw.out",
+    'month': "amf_MF_gwsw_monthly.out",
+    'year': "amf_MF_gwsw_yearly.out"}
+
+_opened = {}
+
+
+class AmfBlockFile:
+    """Offset index over an APEX-MODFLOW block-formatted output file.
+
+    Parameters
+    ----------
+    path : str
+        output file path
+
+    Attributes
+    ----------
+    headers : list of list of str
+        tokens of each period header, in file order
+        (e.g. ['month:', '1', 'year:', '2000'])
+    layers : list of int
+        layer numbers found in the file ([1] if it has no layer headers)
+    blocks : dict
+        (period index, layer) -> list of (start, end) byte offsets
+    """
+
+    def __init__(self, path):
+        self.path = path
+        st = os.stat(path)
+        self.stamp = (st.st_mtime, st.st_size)
+        self.headers = []
+        self.offsets = []
+        self.nlines = []
+        self.layers = []
+        self.blocks = {}
+        self._scan()
+
+    def _scan(self):
+        if self.stamp[1] == 0:
+            return
+        with open(self.path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            iper, layer = -1, 1
+            prev_end = 0
+            for m in _TEXT_LINE.finditer(mm):
+                self._add_segment(mm, iper, layer, prev_end, m.start())
+                prev_end = m.end()
+                tokens = m.group().decode(errors="replace").split()
+                if tokens[0] in PERIOD_KEYS:
+                    self._close_period(mm, m.start())
+                    self.headers.append(tokens)
+                    self.offsets.append(m.start())
+                    iper, layer = len(self.headers) - 1, 1
+                elif tokens[0] == LAYER_KEY:
+                    layer = int(tokens[1])
+            self._add_segment(mm, iper, layer, prev_end, len(mm))
+            self._close_period(mm, len(mm))
+        self.layers = sorted(set(k[1] for k in self.blocks)) or [1]
+
+    def _close_period(self, mm, end):
+        # number of lines from the last period header up to end
+        if self.offsets:
+            self.nlines.append(mm[self.offsets[-1]:end].count(b"\n"))
+
+    def _add_segment(self, mm, iper, layer, start, end):
+        # data before the first period header is not a result block
+        if iper < 0 or end <= start or not mm[start:end].strip():
+            return
+        self.blocks.setdefault((iper, layer), []).append((start, end))
+
+    @property
+    def nper(self):
+        return len(self.headers)
+
+    def period_values(self):
+        """Return the number following the period key of every header
+        (day, month or year) as strings, in file order."""
+        return [h[1] for h in self.headers]
+
+    def get_block(self, iper, layer=1, ncols=None, f=None):
+        """Parse one (period, layer) block into a float array.
+
+        Parameters
+        ----------
+        iper : int
+            zero-based period index (position of the header in the file)
+        layer : int
+            layer number (1 for files without layer headers)
+        ncols : int, optional
+            reshape the block to (-1, ncols), e.g. 4 for the daily gwsw file
+        f : file object, optional
+            an already opened binary handle to reuse across many calls
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        segments = self.blocks.get((iper, layer))
+        if segments is None:
+            raise KeyError(
+                "No block for period {} layer {} in {}".format(
+                    iper, layer, os.path.basename(self.path)))
+        if f is None:
+            with open(self.path, "rb") as fh:
+                raw = self._read_segments(fh, segments)
+        else:
+            raw = self._read_segments(f, segments)
+        arr = np.array(raw.split(), dtype=float)
+        if ncols is not None:
+            arr = arr.reshape(-1, ncols)
+        return arr
+
+    def get_series(self, positions, layer=1, ncols=None, col=0):
+        """Time series of selected values of every period in one pass.
+
+        Blocks are read one at a time through the offset index, so only one
+        block is held in memory however large the file is.
+
+        Parameters
+        ----------
+        positions : sequence of int
+            zero-based positions in the block (grid_id - 1 for the head and
+            recharge files, river cell order for the gwsw files)
+        layer : int
+            layer number
+        ncols : int, optional
+            number of values per line when the block is a table
+        col : int
+            column to take when ncols is given
+
+        Returns
+        -------
+        numpy.ndarray
+            (nper x len(positions)) array, NaN where a period has no block
+        """
+        positions = np.asarray(positions, dtype=int)
+        out = np.full((self.nper, len(positions)), np.nan)
+        with open(self.path, "rb") as f:
+            for i in range(self.nper):
+                if (i, layer) not in self.blocks:
+                    continue
+                blk = self.get_block(i, layer, ncols=ncols, f=f)
+                if ncols is not None:
+                    blk = blk[:, col]
+                out[i] = blk[positions]
+        return out
+
+    @staticmethod
+    def _read_segments(f, segments):
+        parts = []
+        for start, end in segments:
+            f.seek(start)
+            parts.append(f.read(end - start))
+        return b" ".join(parts)
+
+
+def period_dates(stdate, nper, timestep):
+    """Dates of nper consecutive periods starting at stdate: every day, or
+    the last day of every month or year (the labels of resample('M') and
+    resample('A')).
+
+    Month and year ends are taken from periods, whose aliases are the same
+    in every pandas version ('M' and 'A' are no longer date_range
+    frequencies in pandas 3).
+    """
+    if timestep == 'day':
+        return pd.date_range(stdate, periods=nper, freq='D')
+    freq = 'M' if timestep == 'month' else 'Y'
+    ends = pd.period_range(stdate, periods=nper, freq=freq).to_timestamp(how='end')
+    return pd.DatetimeIndex(ends.normalize())
+
+
+def period_index(amf, stdate, timestep):
+    """DatetimeIndex of the periods of an output file.
+
+    timestep is 'day' (periods labelled by simulation day), 'month' or
+    'year' (consecutive periods starting at stdate).
+    """
+    if timestep == 'day':
+        return pd.DatetimeIndex(
+            [stdate + datetime.timedelta(days=int(i)-1) for i in amf.period_values()])
+    return period_dates(stdate, amf.nper, timestep)
+
+
+def river_cell_ids(path, ncol):
+    """Grid ids of the river cells of the daily gwsw output, in file order.
+
+    The daily file lists layer, row, col, rate for every river cell; the
+    monthly and yearly files list the same cells in the same order.
+    """
+    riv_cells = open_block_file(path).get_block(0, ncols=4)
+    return ((riv_cells[:, 1] - 1) * ncol + riv_cells[:, 2]).astype(int)
+
+
+def gwsw_series(wd, grid_ids, stdate, ncol, timestep='day'):
+    """Groundwater/surface water exchange time series of several grid cells
+    in one pass over the output.
+
+    River cells are located through the layer, row, col columns of the daily
+    file; the monthly and yearly files list the same cells in the same order.
+
+    Parameters
+    ----------
+    wd : str
+        MODFLOW folder
+    grid_ids : sequence of int
+        MODFLOW grid ids (1-based, row-major)
+    stdate : datetime.datetime
+        first day of the simulation
+    ncol : int
+        number of columns of the grid
+    timestep : str
+        'day', 'month' or 'year'
+
+    Returns
+    -------
+    DataFrame
+        (ntimes x len(grid_ids)) exchange rates, indexed by date. Cells that
+        are not river cells are NaN.
+    """
+    riv_ids = river_cell_ids(os.path.join(wd, GWSW_FILES['day']), ncol)
+    riv_pos = {gid: i for i, gid in enumerate(riv_ids)}
+
+    grid_ids = [int(i) for i in grid_ids]
+    found = [i for i, gid in enumerate(grid_ids) if gid in riv_pos]
+    amf = open_block_file(os.path.join(wd, GWSW_FILES[timestep]))
+    ts = np.full((amf.nper, len(grid_ids)), np.nan)
+    if found:
+        pos = [riv_pos[grid_ids[i]] for i in found]
+        if timestep == 'day':
+            ts[:, found] = amf.get_series(pos, ncols=4, col=3)
+        else:
+            ts[:, found] = amf.get_series(pos)
+    return pd.DataFrame(ts, index=period_index(amf, stdate, timestep), columns=grid_ids)
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return "{} {}".format(st.st_mtime_ns, st.st_size)
+
+
+def read_periods(path):
+    """Period headers of an output file: (tokens, byte offset, line count)
+    of every period, in file order.
+
+    They are read from the sidecar file (path + SIDECAR_EXT) when it was
+    written for the current version of the output; otherwise the output is
+    indexed once and the sidecar is (re)written.
+    """
+    stamp = _stamp(path)
+    sidecar = path + SIDECAR_EXT
+    if os.path.isfile(sidecar):
+        with open(sidecar, "r") as f:
+            if f.readline().strip() == "# " + stamp:
+                periods = []
+                for line in f:
+                    label, offset, nlines = line.rstrip("\n").split("\t")
+                    periods.append((label.split(), int(offset), int(nlines)))
+                return periods
+    amf = open_block_file(path)
+    periods = list(zip(amf.headers, amf.offsets, amf.nlines))
+    try:
+        tmp = sidecar + ".tmp"
+        with open(tmp, "w") as f:
+            f.write("# " + stamp + "\n")
+            for tokens, offset, nlines in periods:
+                f.write("{}\t{}\t{}\n".format(" ".join(tokens), offset, nlines))
+        os.replace(tmp, sidecar)
+    except OSError:
+        # a read-only model folder only costs the rescan next time
+        pass
+    return periods
+
+
+def period_values(path):
+    """The number following the period key of every header (day, month or
+    year) as strings, from the sidecar index (see read_periods)."""
+    return [tokens[1] for tokens, _, _ in read_periods(path)]
+
+
+def open_block_file(path):
+    """Return an AmfBlockFile for path, reusing the index built earlier in
+    the session as long as the file has not been modified since."""
+    st = os.stat(path)
+    amf = _opened.get(path)
+    if amf is None or amf.stamp != (st.st_mtime, st.st_size):
+        amf = AmfBlockFile(path)
+        _opened[path] = amf
+    return amf
@@ -3,11 +3,91 @@ import datetime
 import os
 
 class ObjFns:
+    """Goodness-of-fit statistics of simulated against observed values.
+
+    Every function takes either two series (one station) or two
+    (ntimes x nstations) matrices and returns a float or one value per
+    station. A time step is skipped for a station when its simulated or
+    observed value is NaN, so stations with different observation records
+    can be evaluated in one call.
+    """
+    METRICS = ('nse', 'kge', 'rmse', 'pbias', 'rsq', 'lognse')
+
     def __init__(self) -> None:
         pass
-        
-    # def obj_fns(obj_fn, sims, obds):
-    #     return obj_fn(sims, obds)
+
+    @staticmethod
+    def evaluate(sims, obds, metrics=METRICS):
+        """Compute several statistics at once with masked numpy reductions.
+
+        Parameters
+        ----------
+        sims, obds : array_like
+            simulated and observed values, (ntimes,) or (ntimes x nstations)
+        metrics : sequence of str
+            names from ObjFns.METRICS
+
+        Returns
+        -------
+        dict
+            metric name -> float (1D input) or numpy.ndarray (one value per
+            station). A station without valid pairs gets NaN.
+        """
+        sims = np.asarray(sims, dtype=np.float64)
+        obds = np.asarray(obds, dtype=np.float64)
+        single = sims.ndim == 1
+        if single:
+            sims = sims[:, None]
+            obds = obds[:, None]
+        mask = np.isfinite(sims) & np.isfinite(obds)
+        out = {}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            terms = ObjFns._moments(sims, obds, mask)
+            sse, sst, sss, cov, n, sum_s, sum_o = terms
+            for name in metrics:
+                if name == 'nse':
+                    value = 1 - sse / sst
+                elif name == 'rmse':
+                    value = np.sqrt(sse / n)
+                elif name == 'pbias':
+                    value = 100 * (sum_o - sum_s) / sum_o
+                elif name == 'rsq':
+                    value = cov ** 2 / (sst * sss)
+                elif name == 'kge':
+                    r = cov / np.sqrt(sst * sss)
+                    alpha = np.sqrt(sss / sst)
+                    beta = sum_s / sum_o
+                    value = 1 - np.sqrt((r - 1) ** 2 + (alpha - 1) ** 2 + (beta - 1) ** 2)
+                elif name == 'lognse':
+                    # only pairs where both values are positive
+                    pos = mask & (sims > 0) & (obds > 0)
+                    lsims = np.log(np.where(pos, sims, 1))
+                    lobds = np.log(np.where(pos, obds, 1))
+                    lsse, lsst = ObjFns._moments(lsims, lobds, pos)[:2]
+                    value = 1 - lsse / lsst
+                else:
+                    raise ValueError("Unknown metric: {}".format(name))
+                value = np.where(n > 0, value, np.nan)
+                out[name] = float(value[0]) if single else value
+        return out
+
+    @staticmethod
+    def _moments(sims, obds, mask):
+        # sums over the valid pairs of each column; masked entries are zeroed
+        # so they drop out of every reduction
+        n = mask.sum(axis=0)
+        s = np.where(mask, sims, 0.0)
+        o = np.where(mask, obds, 0.0)
+        sum_s = s.sum(axis=0)
+        sum_o = o.sum(axis=0)
+        ds = np.where(mask, s - sum_s / n, 0.0)
+        do = np.where(mask, o - sum_o / n, 0.0)
+        sse = ((s - o) ** 2).sum(axis=0)
+        sst = (do ** 2).sum(axis=0)
+        sss = (ds ** 2).sum(axis=0)
+        cov = (do * ds).sum(axis=0)
+        return sse, sst, sss, cov, n, sum_s, sum_o
+
     @staticmethod
     def nse(sims, obds):
         """Nash-Sutcliffe Efficiency (NSE) as per `Nash and Sutcliffe, 1970
@@ -23,11 +103,7 @@ class ObjFns:
             *sims* series, and *μ* is the arithmetic mean.
 
         """
-        nse_ = 1 - (
-                np.sum((obds - sims) ** 2, axis=0, dtype=np.float64)
-                / np.sum((obds - np.mean(obds)) ** 2, dtype=np.float64)
-        )
-        return nse_
+        return ObjFns.evaluate(sims, obds, ('nse',))['nse']
 
     @staticmethod
     def rmse(sims, obds):
@@ -42,10 +118,7 @@ class ObjFns:
             *sims* series.
 
         """
-        rmse_ = np.sqrt(np.mean((obds - sims) ** 2,
-                                axis=0, dtype=np.float64))
-
-        return rmse_
+        return ObjFns.evaluate(sims, obds, ('rmse',))['rmse']
 
     @staticmethod
     def pbias(sims, obds):
@@ -60,24 +133,34 @@ class ObjFns:
             the *sims* series.
 
         """
-        pbias_ = (100 * np.sum(obds - sims, axis=0, dtype=np.float64)
-                / np.sum(obds))
-
-        return pbias_
+        return ObjFns.evaluate(sims, obds, ('pbias',))['pbias']
 
     @staticmethod
     def rsq(sims, obds):
-        ## R-squared
-        rsq_ = (
-            (
-                (sum((obds - obds.mean())*(sims-sims.mean())))**2
-            ) 
-            /
-            (
-                (sum((obds - obds.mean())**2)* (sum((sims-sims.mean())**2))
-            ))
-        )
-        return rsq_
+        """Coefficient of determination (R²), the squared Pearson correlation."""
+        return ObjFns.evaluate(sims, obds, ('rsq',))['rsq']
+
+    @staticmethod
+    def kge(sims, obds):
+        """Kling-Gupta Efficiency (KGE) as per `Gupta et al., 2009
+        <https://doi.org/10.1016/j.jhydrol.2009.08.003>`_.
+
+        :Calculation Details:
+            .. math::
+            E_{\\text{KGE}} = 1 - \\sqrt{[r - 1]^2 + [\\alpha - 1]^2 + [\\beta - 1]^2}
+
+            where *r* is the correlation coefficient, *α* the ratio of the
+            standard deviations and *β* the ratio of the means of the *sims*
+            and *obds* series.
+
+        """
+        return ObjFns.evaluate(sims, obds, ('kge',))['kge']
+
+    @staticmethod
+    def lognse(sims, obds):
+        """NSE of the natural logarithm of the values; pairs with a
+        non-positive value are skipped."""
+        return ObjFns.evaluate(sims, obds, ('lognse',))['lognse']
 
 
 class DefineTime:
@@ -17,6 +17,7 @@ import posixpath
 import ntpath
 import shutil
 from PyQt5.QtWidgets import QMessageBox
+from .mf_packages import read_package_cells, match_cells
 
 msgBox = QMessageBox()
 msgBox.setWindowIcon(QtGui.QIcon(':/APEXMOD/pics/am_icon.png'))
@@ -108,33 +109,10 @@ def link_irrig_mf(self):
     input1 = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0]
     provider = self.layer.dataProvider()
     welnum = self.dlg.spinBox_irrig_mf.value()
-    # Find *.wel file and read number of grid cells
+    # Find *.wel file and match its first welnum cells to the grid on row and col
     for filename in glob.glob(str(APEXMOD_path_dict['MODFLOW'])+"/*.wel"):
-        with open(filename, "r") as f:
-            data = []
-            for line in f.readlines():
-                if not line.startswith("#"):
-                    data.append(line.replace('\n', '').split())
-    wel_row = []
-    wel_col = []
-
-    # Skip two lines in Riv package and get row and col
-    for i in range(2, welnum+2):
-        wel_row.append(int(data[i][1]))
-        wel_col.append(int(data[i][2]))
-
-    # Find grid cells according to the well package
-    feats = self.layer.getFeatures()
-    wel_matched = []
-
-    for f in feats:
-        rowNo = f.attribute("row")
-        colNo = f.attribute("col")
-        # rowNo = f.attribute["row"]
-        # colNo = f.attribute["col"]
-        for i in range(len(wel_row)):
-            if ((rowNo == wel_row[i]) and (colNo == wel_col[i])):
-                wel_matched.append(f.id())
+        wel_cells = read_package_cells(filename, 'wel', welnum)
+    wel_matched, _ = match_cells(self.layer, wel_cells)
     self.layer.selectByIds(wel_matched)
 
     name = "irrig_mf"
@@ -295,34 +273,10 @@ def link_drain(self):
     input1 = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0]
     provider = self.layer.dataProvider()
 
-    # Find *.drn file and read number of grid cells
+    # Find *.drn file and match its cells to the grid on row and col
     for filename in glob.glob(str(APEXMOD_path_dict['MODFLOW'])+"/*.drn"):
-        with open(filename, "r") as f:
-            data = []
-            for line in f.readlines():
-                if not line.startswith("#"):
-                    data.append(line.replace('\n', '').split())
-    nDrain = int(data[0][0])
-    drn_lyr = []
-    drn_row = []
-    drn_col = []
-
-    # Skip two lines in Riv package and get row and col
-    for i in range(2, nDrain+2):
-        drn_lyr.append(int(data[i][0]))
-        drn_row.append(int(data[i][1]))
-        drn_col.append(int(data[i][2]))
-
-    # Find grid cells according to the drnl package
-    feats = self.layer.getFeatures()
-    drn_matched = []
-
-    for f in feats:
-        rowNo = f.attribute("row")
-        colNo = f.attribute("col")
-        for i in range(len(drn_row)):
-            if ((rowNo == drn_row[i]) and (colNo == drn_col[i])):
-                drn_matched.append(f.id())
+        drn_cells = read_package_cells(filename, 'drn')
+    drn_matched, _ = match_cells(self.layer, drn_cells)
     self.layer.selectByIds(drn_matched)
 
     name_ext = "drain2sub.shp"
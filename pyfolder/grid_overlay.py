@@ -0,0 +1,525 @@
+# -*- coding: utf-8 -*-
+"""
+Overlay of polygons (APEX subareas) with the regular MODFLOW grid.
+
+The overlap area of a polygon with every cell of a regular grid is computed
+analytically, without clipping the polygon cell by cell: the ring edges are
+split where they cross grid lines and, by Green's theorem, each piece adds
+its share of the area to the cell it lies in and to every cell below it in
+the same column (the latter through one cumulative sum per column). Only the
+cells of the polygon's bounding-box row/col window are visited and the areas
+are exact for straight-edged polygons, holes and multi-part polygons.
+Subareas are independent of each other, so overlay_parallel spreads chunks
+of them over worker processes when there is enough work to pay for starting
+them. River polylines are walked through the grid
+the same way (river_lengths), summing the length of the pieces per cell.
+The module does not depend on QGIS.
+"""
+
+import concurrent.futures
+import math
+import multiprocessing
+import os
+import struct
+import sys
+
+import numpy as np
+
+_WKB_LINESTRING = 2
+_WKB_POLYGON = 3
+_WKB_MULTILINESTRING = 5
+_WKB_MULTIPOLYGON = 6
+
+# columns of the tables returned by overlay and river_lengths
+OVERLAY_COLUMNS = ('grid_id', 'subbasin', 'ol_area', 'sub_area')
+RIVER_COLUMNS = ('grid_id', 'subbasin', 'rgrid_len')
+
+# estimated serial work of overlay(), in window cells (about 0.1 us each);
+# every feature and every vertex costs some cells' worth on top of its window
+FEATURE_WORK = 2500
+VERTEX_WORK = 3
+# below this work (about 3 s of serial overlay) starting the worker
+# interpreters costs more than it saves
+MIN_PARALLEL_WORK = 30000000
+
+# lattice of a worker process, sent once by _init_worker
+_worker_lattice = None
+
+
+class Lattice:
+    """Regular grid with row-major cells numbered from the north-west corner.
+
+    Parameters
+    ----------
+    x_origin, y_origin : float
+        coordinates of the north-west corner
+    nrow, ncol : int
+        number of rows and columns
+    delr : float
+        cell width along rows (y spacing)
+    delc : float
+        cell width along columns (x spacing)
+    grid_ids : numpy.ndarray, optional
+        (nrow x ncol) grid_id of every cell, 0 where the grid has no cell.
+        Defaults to the row-major numbering row * ncol + col + 1.
+    """
+
+    def __init__(self, x_origin, y_origin, nrow, ncol, delr, delc, grid_ids=None):
+        self.x_origin = float(x_origin)
+        self.y_origin = float(y_origin)
+        self.nrow = int(nrow)
+        self.ncol = int(ncol)
+        self.delr = float(delr)
+        self.delc = float(delc)
+        if grid_ids is None:
+            grid_ids = np.arange(1, self.nrow * self.ncol + 1).reshape(self.nrow, self.ncol)
+        self.grid_ids = np.asarray(grid_ids)
+
+    @classmethod
+    def from_cells(cls, grid_id, row, col, extent):
+        """Lattice of a grid layer from the grid_id, row and col (1-based) of
+        its cells and the (xmin, ymin, xmax, ymax) extent of the layer.
+
+        Cells missing from the layer (e.g. deleted inactive cells) get a
+        grid_id of 0.
+        """
+        grid_id = np.asarray(grid_id, dtype=np.int64)
+        row = np.asarray(row, dtype=np.int64)
+        col = np.asarray(col, dtype=np.int64)
+        xmin, ymin, xmax, ymax = extent
+        rmin, rmax = int(row.min()), int(row.max())
+        cmin, cmax = int(col.min()), int(col.max())
+        delc = (xmax - xmin) / (cmax - cmin + 1)
+        delr = (ymax - ymin) / (rmax - rmin + 1)
+        grid_ids = np.zeros((rmax, cmax), dtype=np.int64)
+        grid_ids[row - 1, col - 1] = grid_id
+        return cls(
+            xmin - (cmin - 1) * delc, ymax + (rmin - 1) * delr,
+            rmax, cmax, delr, delc, grid_ids)
+
+    @property
+    def cell_area(self):
+        return self.delr * self.delc
+
+    def cell_areas(self, polygons):
+        """Overlap area of a polygon with every grid cell it covers.
+
+        Parameters
+        ----------
+        polygons : list of list of numpy.ndarray
+            parts of the polygon, each a list of rings (n x 2 x/y arrays),
+            exterior ring first (see wkb_polygons)
+
+        Returns
+        -------
+        grid_id : numpy.ndarray
+            grid_id of the covered cells, in row-major order
+        area : numpy.ndarray
+            overlap area of each of them, in map units
+        """
+        rings = []
+        for part in polygons:
+            for k, ring in enumerate(part):
+                if len(ring) < 3:
+                    continue
+                u = (ring[:, 0] - self.x_origin) / self.delc
+                v = (self.y_origin - ring[:, 1]) / self.delr
+                # exteriors add area and holes remove it, whatever the
+                # orientation of the ring
+                sign = 1.0 if k == 0 else -1.0
+                rings.append((u, v, sign))
+        empty = np.zeros(0, dtype=np.int64), np.zeros(0)
+        if not rings:
+            return empty
+        umin = min(r[0].min() for r in rings)
+        umax = max(r[0].max() for r in rings)
+        vmin = min(r[1].min() for r in rings)
+        vmax = max(r[1].max() for r in rings)
+        # window of the polygon's bounding box (may extend beyond the grid)
+        i0, i1 = int(np.floor(vmin)), int(np.floor(vmax))
+        j0, j1 = int(np.floor(umin)), int(np.floor(umax))
+        nwin_r, nwin_c = i1 - i0 + 1, j1 - j0 + 1
+
+        area = np.zeros((nwin_r + 1) * nwin_c)
+        below = np.zeros((nwin_r + 1) * nwin_c)
+        for u, v, sign in rings:
+            i, j, a, b = _ring_pieces(u - j0, v - i0)
+            ok = (i >= 0) & (i < nwin_r) & (j >= 0) & (j < nwin_c)
+            i, j, a, b = i[ok], j[ok], a[ok], b[ok]
+            ring_area = np.bincount(i * nwin_c + j, a, len(area))
+            ring_below = np.bincount((i + 1) * nwin_c + j, b, len(below))
+            # shoelace area of the ring sets its orientation
+            s = sign * np.sign(_signed_area(u, v))
+            area += s * ring_area
+            below += s * ring_below
+        cells = (area + np.cumsum(below.reshape(nwin_r + 1, nwin_c), axis=0).ravel())
+        cells = cells.reshape(nwin_r + 1, nwin_c)[:nwin_r]
+
+        # keep the covered cells of the grid
+        rows, cols = np.nonzero(cells > 1e-9)
+        vals = cells[rows, cols]
+        rows += i0
+        cols += j0
+        inside = (rows >= 0) & (rows < self.nrow) & (cols >= 0) & (cols < self.ncol)
+        rows, cols, vals = rows[inside], cols[inside], vals[inside]
+        ids = self.grid_ids[rows, cols]
+        keep = ids > 0
+        return ids[keep].astype(np.int64), vals[keep] * self.cell_area
+
+    def cell_lengths(self, lines):
+        """Length of a polyline inside every grid cell it passes through.
+
+        Each segment is walked through the grid by splitting it where it
+        crosses grid lines; the pieces are summed per cell.
+
+        Parameters
+        ----------
+        lines : list of numpy.ndarray
+            parts of the polyline, (n x 2) x/y arrays (see wkb_lines)
+
+        Returns
+        -------
+        grid_id : numpy.ndarray
+            grid_id of the cells passed through, in row-major order
+        length : numpy.ndarray
+            length of the polyline inside each of them, in map units
+        """
+        cells, lengths = [], []
+        for line in lines:
+            if len(line) < 2:
+                continue
+            u = (line[:, 0] - self.x_origin) / self.delc
+            v = (self.y_origin - line[:, 1]) / self.delr
+            i, j, du, dv, _ = _path_pieces(u, v)
+            inside = (i >= 0) & (i < self.nrow) & (j >= 0) & (j < self.ncol)
+            cells.append(i[inside] * self.ncol + j[inside])
+            lengths.append(np.hypot(du[inside] * self.delc, dv[inside] * self.delr))
+        if not cells:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        cells, inverse = np.unique(np.concatenate(cells), return_inverse=True)
+        lengths = np.bincount(inverse, np.concatenate(lengths), len(cells))
+        ids = self.grid_ids.ravel()[cells]
+        keep = (ids > 0) & (lengths > 0)
+        return ids[keep].astype(np.int64), lengths[keep]
+
+
+def _signed_area(u, v):
+    # in (u, v) the v axis points down, hence the minus sign
+    return -0.5 * np.sum(u * np.roll(v, -1) - np.roll(u, -1) * v)
+
+
+def _ring_pieces(u, v):
+    """Split the edges of a ring where they cross integer u or v and return,
+    for every piece, its cell (i, j) in unit-cell coordinates, the area it
+    adds to that cell and the area it adds to each cell below it."""
+    if u[0] != u[-1] or v[0] != v[-1]:
+        u = np.append(u, u[0])
+        v = np.append(v, v[0])
+    i, j, du, dv, vm = _path_pieces(u, v)
+    # area = -integral of (height above the cell bottom) dx, with the
+    # height clamped to [0, 1]: the piece's own cell gets its mean height,
+    # every cell below it a full unit height
+    return i, j, -(i + 1 - vm) * du, -du
+
+
+def _path_pieces(u, v):
+    """Split the segments of a path where they cross integer u or v and
+    return, for every piece, its cell (i, j) in unit-cell coordinates, its
+    extent du, dv and the v of its midpoint."""
+    ua, ub, va, vb = u[:-1], u[1:], v[:-1], v[1:]
+    du, dv = ub - ua, vb - va
+    nedge = len(ua)
+
+    # parameters t in (0, 1) where each edge crosses a grid line
+    ts = [np.zeros(nedge), np.ones(nedge)]
+    owners = [np.arange(nedge), np.arange(nedge)]
+    for a, b, d in ((ua, ub, du), (va, vb, dv)):
+        lo = np.floor(np.minimum(a, b)) + 1
+        hi = np.ceil(np.maximum(a, b)) - 1
+        n = np.maximum(hi - lo + 1, 0).astype(np.int64)
+        if n.sum() == 0:
+            continue
+        edge = np.repeat(np.arange(nedge), n)
+        first = np.repeat(np.cumsum(n) - n, n)
+        k = lo[edge] + (np.arange(n.sum()) - first)
+        ts.append((k - a[edge]) / d[edge])
+        owners.append(edge)
+    t = np.concatenate(ts)
+    edge = np.concatenate(owners)
+    order = np.lexsort((t, edge))
+    t, edge = t[order], edge[order]
+
+    # consecutive parameters of the same edge bound a piece
+    same = edge[1:] == edge[:-1]
+    e = edge[:-1][same]
+    t0, t1 = t[:-1][same], t[1:][same]
+    tm = 0.5 * (t0 + t1)
+    um = ua[e] + du[e] * tm
+    vm = va[e] + dv[e] * tm
+    i = np.floor(vm).astype(np.int64)
+    j = np.floor(um).astype(np.int64)
+    return i, j, du[e] * (t1 - t0), dv[e] * (t1 - t0), vm
+
+
+def wkb_polygons(wkb):
+    """Rings of a Polygon or MultiPolygon WKB geometry.
+
+    Z and M values (ISO or EWKB flags) are dropped.
+
+    Returns
+    -------
+    list of list of numpy.ndarray
+        parts, each a list of (n x 2) x/y rings with the exterior ring first
+    """
+    parts, _ = _read_geometry(bytes(wkb), 0)
+    return parts
+
+
+def wkb_lines(wkb):
+    """Parts of a LineString or MultiLineString WKB geometry as (n x 2)
+    x/y arrays (Z and M values are dropped)."""
+    parts, _ = _read_geometry(bytes(wkb), 0)
+    return parts
+
+
+def _read_header(buf, pos):
+    order = '<' if buf[pos] == 1 else '>'
+    gtype = struct.unpack_from(order + 'I', buf, pos + 1)[0]
+    pos += 5
+    ndim = 2
+    if gtype & 0x80000000:
+        ndim += 1
+    if gtype & 0x40000000:
+        ndim += 1
+    if gtype & 0x20000000:
+        pos += 4  # srid
+    gtype &= 0x0fffffff
+    ndim += {0: 0, 1: 1, 2: 1, 3: 2}[gtype // 1000]
+    return order, gtype % 1000, ndim, pos
+
+
+def _read_points(buf, pos, order, ndim):
+    npts = struct.unpack_from(order + 'I', buf, pos)[0]
+    pos += 4
+    xyz = np.frombuffer(buf, dtype=order + 'f8', count=npts * ndim, offset=pos)
+    return xyz.reshape(npts, ndim)[:, :2].astype(float), pos + 8 * npts * ndim
+
+
+def _read_polygon(buf, pos, order, ndim):
+    nrings = struct.unpack_from(order + 'I', buf, pos)[0]
+    pos += 4
+    rings = []
+    for _ in range(nrings):
+        ring, pos = _read_points(buf, pos, order, ndim)
+        rings.append(ring)
+    return rings, pos
+
+
+def _read_geometry(buf, pos):
+    order, gtype, ndim, pos = _read_header(buf, pos)
+    if gtype == _WKB_LINESTRING:
+        line, pos = _read_points(buf, pos, order, ndim)
+        return [line], pos
+    if gtype == _WKB_POLYGON:
+        rings, pos = _read_polygon(buf, pos, order, ndim)
+        return [rings], pos
+    if gtype in (_WKB_MULTILINESTRING, _WKB_MULTIPOLYGON):
+        nparts = struct.unpack_from(order + 'I', buf, pos)[0]
+        pos += 4
+        parts = []
+        for _ in range(nparts):
+            sub, pos = _read_geometry(buf, pos)
+            parts.extend(sub)
+        return parts, pos
+    raise ValueError("Unsupported WKB geometry type {}".format(gtype))
+
+
+def overlay(lattice, features, threshold=0):
+    """Overlap table of polygon features with the grid.
+
+    Parameters
+    ----------
+    lattice : Lattice
+        the grid
+    features : iterable
+        (subbasin, sub_area, wkb) of every polygon feature
+    threshold : int
+        overlaps whose rounded area is smaller than threshold are dropped
+
+    Returns
+    -------
+    dict of numpy.ndarray
+        grid_id, subbasin, ol_area (rounded to integers) and sub_area of
+        every remaining overlap, in feature order then row-major cell order
+    """
+    tables = []
+    for sub_id, sub_area, wkb in features:
+        ids, areas = lattice.cell_areas(wkb_polygons(wkb))
+        areas = np.round(areas).astype(np.int64)
+        keep = areas >= threshold
+        n = int(keep.sum())
+        tables.append({
+            'grid_id': ids[keep],
+            'subbasin': np.full(n, sub_id),
+            'ol_area': areas[keep],
+            'sub_area': np.full(n, sub_area),
+            })
+    return merge_tables(tables)
+
+
+def river_lengths(lattice, features, threshold=0.5):
+    """River length table of polyline features in the grid.
+
+    Parameters
+    ----------
+    lattice : Lattice
+        the (river cells of the) grid
+    features : iterable
+        (subbasin, wkb) of every river polyline
+    threshold : float
+        lengths, rounded to integers, smaller than threshold are dropped
+
+    Returns
+    -------
+    dict of numpy.ndarray
+        grid_id, subbasin and rgrid_len (rounded to integers) of every
+        remaining (river, cell) pair, in feature order then row-major cell
+        order
+    """
+    tables = []
+    for sub_id, wkb in features:
+        ids, lengths = lattice.cell_lengths(wkb_lines(wkb))
+        # rounded half up like an integer field of a layer
+        lengths = np.floor(lengths + 0.5).astype(np.int64)
+        keep = lengths >= threshold
+        tables.append({
+            'grid_id': ids[keep],
+            'subbasin': np.full(int(keep.sum()), sub_id),
+            'rgrid_len': lengths[keep],
+            })
+    return merge_tables(tables, RIVER_COLUMNS)
+
+
+def overlay_parallel(lattice, features, threshold=0, processes=None, progress=None):
+    """overlay() run on chunks of the features in worker processes.
+
+    The chunks are merged in feature order, so the table is the same as the
+    one of overlay(). It falls back to overlay() when the estimated work
+    (see overlay_work) is below MIN_PARALLEL_WORK, when no Python interpreter is found for the workers (e.g. an
+    embedded interpreter without a python executable next to it) or when the
+    worker pool fails.
+
+    Parameters
+    ----------
+    lattice : Lattice
+        the grid, sent once to every worker
+    features : list
+        (subbasin, sub_area, wkb) of every polygon feature, wkb as bytes
+    threshold : int
+        overlaps whose rounded area is smaller than threshold are dropped
+    processes : int, optional
+        number of worker processes (default: number of CPUs)
+    progress : callable, optional
+        called with the percentage of features done, also while waiting
+        for the workers, so a GUI can keep processing its events
+
+    Returns
+    -------
+    dict of numpy.ndarray
+        see overlay
+    """
+    features = list(features)
+    processes = processes or os.cpu_count() or 1
+    if (processes < 2 or
+            overlay_work(lattice, features, MIN_PARALLEL_WORK) < MIN_PARALLEL_WORK):
+        return _overlay_serial(lattice, features, threshold, progress)
+    executable = _python_executable()
+    if executable is None:
+        return _overlay_serial(lattice, features, threshold, progress)
+
+    # several chunks per worker to balance large and small subareas
+    size = math.ceil(len(features) / (processes * 4))
+    chunks = [features[i:i + size] for i in range(0, len(features), size)]
+    ctx = multiprocessing.get_context('spawn')
+    ctx.set_executable(executable)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=processes, mp_context=ctx,
+                initializer=_init_worker, initargs=(lattice,)) as pool:
+            futures = [pool.submit(_overlay_chunk, chunk, threshold) for chunk in chunks]
+            pending = set(futures)
+            while pending:
+                done, pending = concurrent.futures.wait(pending, timeout=0.2)
+                if progress is not None:
+                    ndone = sum(len(c) for c, f in zip(chunks, futures) if f.done())
+                    progress(round(ndone / len(features) * 100))
+            tables = [f.result() for f in futures]
+    except (OSError, concurrent.futures.BrokenExecutor):
+        return _overlay_serial(lattice, features, threshold, progress)
+    return merge_tables(tables)
+
+
+def overlay_work(lattice, features, limit=None):
+    """Estimated serial work of overlay() for polygon features, in window
+    cells: the row/col window of every feature plus VERTEX_WORK per vertex
+    and FEATURE_WORK per feature. Counting stops once limit is reached."""
+    work = 0
+    for _, _, wkb in features:
+        rings = [ring for part in wkb_polygons(wkb) for ring in part]
+        if rings:
+            points = np.concatenate(rings)
+            nwin_c = np.ptp(points[:, 0]) / lattice.delc + 2
+            nwin_r = np.ptp(points[:, 1]) / lattice.delr + 2
+            work += VERTEX_WORK * len(points) + int(nwin_r * nwin_c)
+        work += FEATURE_WORK
+        if limit is not None and work >= limit:
+            break
+    return work
+
+
+def _overlay_serial(lattice, features, threshold, progress):
+    tables = []
+    for count, feature in enumerate(features, 1):
+        tables.append(overlay(lattice, [feature], threshold))
+        if progress is not None:
+            progress(round(count / len(features) * 100))
+    return merge_tables(tables)
+
+
+def _init_worker(lattice):
+    global _worker_lattice
+    _worker_lattice = lattice
+
+
+def _overlay_chunk(features, threshold):
+    return overlay(_worker_lattice, features, threshold)
+
+
+def _python_executable():
+    # inside QGIS sys.executable is the application itself, which can not
+    # run the worker processes; look for the interpreter it embeds
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+    if os.name == 'nt':
+        names = [('pythonw.exe',), ('python.exe',), ('python3.exe',)]
+    else:
+        names = [('bin', 'python3'), ('bin', 'python')]
+    for name in names:
+        path = os.path.join(sys.exec_prefix, *name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def merge_tables(tables, columns=OVERLAY_COLUMNS):
+    """Concatenate tables (see overlay and river_lengths), in the given
+    order."""
+    if not tables:
+        return {key: np.zeros(0, dtype=np.int64) for key in columns}
+    return {key: np.concatenate([t[key] for t in tables]) for key in columns}
+
+
+def sort_table(table, keys):
+    """Rows of an overlap table sorted by the given columns (stable)."""
+    order = np.lexsort([table[k] for k in reversed(keys)])
+    return {key: col[order] for key, col in table.items()}
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk writer for the result layers in the 'apexmf_results' group.
+
+All new date columns are added with one addAttributes call and the values are
+pushed through the data provider in large batches instead of one
+changeAttributeValue per feature inside an edit session.
+"""
+
+import numpy as np
+from qgis.core import QgsField, QgsFeatureRequest
+from qgis.PyQt.QtCore import QVariant, QCoreApplication
+
+
+def write_columns(layer, columns, progressBar=None, batch_size=20000, fields=None):
+    """Write several columns (doubles unless given in fields) to a layer at once.
+
+    Parameters
+    ----------
+    layer : QgsVectorLayer
+        target layer
+    columns : dict
+        field name -> sequence of values, ordered like layer.getFeatures()
+    progressBar : QProgressBar, optional
+        updated once per batch
+    batch_size : int
+        number of features sent to the provider per changeAttributeValues call
+    fields : dict, optional
+        field name -> QgsField of the columns that are not doubles (e.g.
+        integer ids); their values keep their own type
+    """
+    if not columns:
+        return
+    fields = fields or {}
+    provider = layer.dataProvider()
+    new_fields = [
+        fields.get(name, QgsField(name, QVariant.Double, 'double', 20, 5))
+        for name in columns if provider.fields().indexFromName(name) == -1]
+    if new_fields:
+        provider.addAttributes(new_fields)
+        layer.updateFields()
+    idxs = [provider.fields().indexFromName(name) for name in columns]
+
+    # feature ids in the same order the old per-feature loops walked them
+    request = QgsFeatureRequest()
+    request.setFlags(QgsFeatureRequest.NoGeometry)
+    request.setNoAttributes()
+    fids = [f.id() for f in layer.getFeatures(request)]
+
+    vals = [
+        np.asarray(v, dtype=None if name in fields else float).ravel()
+        for name, v in columns.items()]
+    nfeats = min([len(fids)] + [len(v) for v in vals])
+
+    if progressBar is not None:
+        progressBar.setValue(0)
+    for st in range(0, nfeats, batch_size):
+        ed = min(st + batch_size, nfeats)
+        rows = zip(*[v[st:ed].tolist() for v in vals])
+        changes = {
+            fid: dict(zip(idxs, row)) for fid, row in zip(fids[st:ed], rows)}
+        provider.changeAttributeValues(changes)
+        if progressBar is not None:
+            progressBar.setValue(round(ed / nfeats * 100))
+            QCoreApplication.processEvents()
+    layer.triggerRepaint()
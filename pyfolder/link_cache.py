@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental linking of APEX subareas and rivers with the MODFLOW grid.
+
+The overlap rows (grid_id and area or length) of every subarea or river
+geometry are kept in the '.amf_cache' folder, keyed by a digest of the
+geometry. When the linking is run again only the geometries that are new or
+changed are overlaid with the grid; the rows of the others are reused and
+the attributes (subbasin, sub_area) are taken from the current features, so
+renumbering subareas costs no overlay at all. The cache is dropped whenever
+the grid (origin, shape, spacing, cells) or the threshold changes.
+
+The assembled tables are identical to the ones of grid_overlay.overlay and
+grid_overlay.river_lengths. The module does not depend on QGIS.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from . import grid_overlay
+
+# bump when the overlay results change for the same inputs
+VERSION = 1
+
+
+def digest(*values):
+    """Hex digest of bytes, numpy arrays and other values (by their repr)."""
+    h = hashlib.blake2b(digest_size=16)
+    for value in values:
+        if isinstance(value, np.ndarray):
+            value = np.ascontiguousarray(value)
+            h.update(str(value.dtype).encode())
+            h.update(value.tobytes())
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            h.update(bytes(value))
+        else:
+            h.update(repr(value).encode())
+        h.update(b'|')
+    return h.hexdigest()
+
+
+def lattice_signature(lattice, *params):
+    return digest(
+        VERSION, lattice.x_origin, lattice.y_origin, lattice.nrow, lattice.ncol,
+        lattice.delr, lattice.delc, lattice.grid_ids, *params)
+
+
+class LinkCache:
+    """Rows of every geometry digest, stored in one .npz file.
+
+    Parameters
+    ----------
+    path : str
+        cache file
+    signature : str
+        lattice_signature of the current grid and parameters; a cache written
+        for another signature is ignored
+    """
+
+    def __init__(self, path, signature):
+        self.path = path
+        self.signature = signature
+        self.rows = {}
+        if not os.path.isfile(path):
+            return
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                if str(npz['signature']) != signature:
+                    return
+                keys = npz['keys'].tolist()
+                offsets = npz['offsets']
+                grid_id, value = npz['grid_id'], npz['value']
+        except (OSError, KeyError, ValueError):
+            return
+        for k, key in enumerate(keys):
+            st, ed = offsets[k], offsets[k + 1]
+            self.rows[key] = (grid_id[st:ed], value[st:ed])
+
+    def save(self, keys):
+        """Keep the rows of the given geometry digests only."""
+        keys = list(dict.fromkeys(keys))
+        counts = [len(self.rows[key][0]) for key in keys]
+        arrays = {
+            'signature': np.array(self.signature),
+            'keys': np.array(keys, dtype=str),
+            'offsets': np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            'grid_id': _concat([self.rows[key][0] for key in keys]),
+            'value': _concat([self.rows[key][1] for key in keys]),
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, self.path)
+        except OSError:
+            # a read-only model folder only costs a full overlay next time
+            pass
+
+
+def _concat(arrays):
+    if not arrays:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate(arrays).astype(np.int64)
+
+
+def _split_rows(table, value_key, n):
+    # the subbasin column holds the position of the geometry in the batch
+    offsets = np.searchsorted(table['subbasin'], np.arange(n + 1))
+    return [
+        (table['grid_id'][st:ed], table[value_key][st:ed])
+        for st, ed in zip(offsets[:-1], offsets[1:])]
+
+
+def _assemble(cache, keys, attributes, columns, value_key):
+    """Table of the cached rows of keys, with the attributes of each feature
+    repeated over its rows; columns are in the order of grid_overlay."""
+    if not keys:
+        return grid_overlay.merge_tables([], columns)
+    parts = [cache.rows[key] for key in keys]
+    counts = np.array([len(p[0]) for p in parts], dtype=np.int64)
+    table = {
+        'grid_id': _concat([p[0] for p in parts]),
+        value_key: _concat([p[1] for p in parts]),
+    }
+    for name, values in attributes.items():
+        table[name] = np.repeat(np.array(values), counts)
+    return {key: table[key] for key in columns}
+
+
+def _update(cache, wkbs, compute):
+    """Overlay the geometries missing from the cache; returns their count."""
+    keys = [digest(wkb) for wkb in wkbs]
+    todo = [k for k in dict.fromkeys(keys) if k not in cache.rows]
+    if todo:
+        first = {}
+        for key, wkb in zip(keys, wkbs):
+            first.setdefault(key, wkb)
+        for key, rows in zip(todo, compute([first[key] for key in todo])):
+            cache.rows[key] = rows
+    return keys, len(todo)
+
+
+def overlay(lattice, features, threshold, cache_file, processes=None, progress=None):
+    """grid_overlay.overlay_parallel, reusing the rows of unchanged subareas.
+
+    Parameters
+    ----------
+    lattice : Lattice
+        the grid
+    features : list
+        (subbasin, sub_area, wkb) of every subarea, wkb as bytes
+    threshold : int
+        overlaps whose rounded area is smaller than threshold are dropped
+    cache_file : str
+        cache file of the subarea rows
+    processes, progress :
+        see grid_overlay.overlay_parallel
+
+    Returns
+    -------
+    table : dict of numpy.ndarray
+        see grid_overlay.overlay
+    noverlaid : int
+        number of geometries that had to be overlaid
+    """
+    cache = LinkCache(cache_file, lattice_signature(lattice, 'overlay', threshold))
+
+    def compute(wkbs):
+        batch = [(k, 0, wkb) for k, wkb in enumerate(wkbs)]
+        table = grid_overlay.overlay_parallel(
+            lattice, batch, threshold, processes=processes, progress=progress)
+        return _split_rows(table, 'ol_area', len(wkbs))
+
+    keys, noverlaid = _update(cache, [f[2] for f in features], compute)
+    attributes = {
+        'subbasin': [f[0] for f in features],
+        'sub_area': [f[1] for f in features]}
+    table = _assemble(
+        cache, keys, attributes, grid_overlay.OVERLAY_COLUMNS, 'ol_area')
+    cache.save(keys)
+    return table, noverlaid
+
+
+def river_lengths(lattice, features, threshold, cache_file):
+    """grid_overlay.river_lengths, reusing the rows of unchanged rivers.
+
+    Parameters
+    ----------
+    lattice : Lattice
+        the (river cells of the) grid
+    features : list
+        (subbasin, wkb) of every river polyline, wkb as bytes
+    threshold : float
+        lengths, rounded to integers, smaller than threshold are dropped
+    cache_file : str
+        cache file of the river rows
+
+    Returns
+    -------
+    table, noverlaid :
+        see overlay
+    """
+    cache = LinkCache(cache_file, lattice_signature(lattice, 'river', threshold))
+
+    def compute(wkbs):
+        batch = [(k, wkb) for k, wkb in enumerate(wkbs)]
+        table = grid_overlay.river_lengths(lattice, batch, threshold)
+        return _split_rows(table, 'rgrid_len', len(wkbs))
+
+    keys, noverlaid = _update(cache, [f[1] for f in features], compute)
+    attributes = {'subbasin': [f[0] for f in features]}
+    table = _assemble(
+        cache, keys, attributes, grid_overlay.RIVER_COLUMNS, 'rgrid_len')
+    cache.save(keys)
+    return table, noverlaid
@@ -9,13 +9,20 @@ from processing.tools import dataobjects
 from qgis.core import (
                     QgsVectorLayer, QgsField, QgsProject, QgsFeatureIterator, QgsVectorFileWriter,
                     QgsFeatureRequest, QgsLayerTreeLayer, QgsExpression, QgsFeature,
-                    QgsProcessingFeedback)
+                    QgsProcessingFeedback, QgsCoordinateTransform, NULL)
 import glob
 import subprocess
 import shutil
 from datetime import datetime
 import csv
+import io
+import numpy as np
 from PyQt5.QtWidgets import QMessageBox
+from .mf_inputs import require_dis
+from . import grid_overlay
+from . import link_cache
+from .result_cache import get_cache_dir
+from .layer_writer import write_columns
 
 
 
@@ -127,23 +134,33 @@ def delete_river_grid_with_threshold(self):
     self.layer.commitChanges()
 
 
-def rgrid_len(self):
+def rgrid_len(self, table=None):
+    """Fill rgrid_len of the river_grid layer from the river length table
+    (see river_grid_lengths), so the layer and link_river_grid share the same
+    lengths. The length of a (grid_id, subbasin) pair goes to its first
+    feature; the others get 0 and are removed by
+    delete_river_grid_with_threshold. Returns the table.
+    """
+    if table is None:
+        table = river_grid_lengths(self)
+    lengths = dict(zip(
+        zip(table['grid_id'].tolist(), table['subbasin'].tolist()),
+        table['rgrid_len'].tolist()))
 
     self.layer = QgsProject.instance().mapLayersByName("river_grid (APEX-MODFLOW)")[0]
-    provider = self.layer.dataProvider()
-    field = QgsField("rgrid_len", QVariant.Int)
-    provider.addAttributes([field])
-    self.layer.updateFields()
-    
-    feats = self.layer.getFeatures()
-    self.layer.startEditing()
-
-    for feat in feats:
-        length = feat.geometry().length()
-        #score = scores[i]
-        feat['rgrid_len'] = length
-        self.layer.updateFeature(feat)
-    self.layer.commitChanges()
+    request = QgsFeatureRequest()
+    request.setFlags(QgsFeatureRequest.NoGeometry)
+    request.setSubsetOfAttributes(["grid_id", "Subbasin"], self.layer.fields())
+    values = []
+    for feat in self.layer.getFeatures(request):
+        if feat["grid_id"] == NULL or feat["Subbasin"] == NULL:
+            values.append(0)
+            continue
+        values.append(lengths.pop((int(feat["grid_id"]), int(feat["Subbasin"])), 0))
+    write_columns(
+        self.layer, {'rgrid_len': values},
+        fields={'rgrid_len': QgsField("rgrid_len", QVariant.Int)})
+    return table
 
 
 def calculate_sub_area(self):
@@ -183,117 +200,78 @@ def calculate_sub_area(self):
     QCoreApplication.processEvents()
 
 
+def grid_lattice(layer):
+    """Lattice of the 'mf_grid (MODFLOW)' layer, read from the grid_id, row
+    and col attributes of its cells and the layer extent."""
+    request = QgsFeatureRequest()
+    request.setFlags(QgsFeatureRequest.NoGeometry)
+    request.setSubsetOfAttributes(["grid_id", "row", "col"], layer.fields())
+    cells = np.array(
+        [(f["grid_id"], f["row"], f["col"]) for f in layer.getFeatures(request)],
+        dtype=np.int64)
+    ext = layer.extent()
+    return grid_overlay.Lattice.from_cells(
+        cells[:, 0], cells[:, 1], cells[:, 2],
+        (ext.xMinimum(), ext.yMinimum(), ext.xMaximum(), ext.yMaximum()))
+
+
 def sub_grid(self):
+    """Overlay the SUBs with the GRIDs and return the overlap table
+    (grid_id, subbasin, ol_area, sub_area; see grid_overlay.overlay).
+
+    Each SUB is clipped only against the cells of its row/col window and
+    overlaps smaller than the area threshold are left out, so no sub_grid
+    layer is written. The SUBs are overlaid in parallel on all CPU cores;
+    only the SUBs whose geometry changed since the last linking are
+    overlaid again (see link_cache).
+    """
     time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
     self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Intersecting SUBs by GRIDs ... processing")
     self.dlg.label_StepStatus.setText("Intersecting SUBs by GRIDs ... ")
     self.dlg.progressBar_step.setValue(0)
     QCoreApplication.processEvents()
 
-    APEXMOD_path_dict = self.dirs_and_paths()
-    input1 = QgsProject.instance().mapLayersByName("sub (APEX)")[0]
-    input2 = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0]
-    name = "sub_grid"
-    name_ext = "sub_grid.shp"
-    output_dir = APEXMOD_path_dict['apexmf_shps']
-    output_file = os.path.normpath(os.path.join(output_dir, name_ext))
-
-    params = {
-        'INPUT': input1,
-        'OVERLAY': input2,
-        'OUTPUT': output_file
-    }
-    processing.run("native:intersection", params)
-    # defining the outputfile to be loaded into the canvas        
-    sub_grid_shapefile = os.path.join(output_dir, name_ext)
-    layer = QgsVectorLayer(sub_grid_shapefile, '{0} ({1})'.format("sub_grid","APEX-MODFLOW"), 'ogr')
-
-    # Put in the group
-    root = QgsProject.instance().layerTreeRoot()
-    sm_group = root.findGroup("APEX-MODFLOW")   
-    QgsProject.instance().addMapLayer(layer, False)
-    sm_group.insertChildNode(1, QgsLayerTreeLayer(layer))
-
-    time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-    self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Intersecting SUBs by GRIDs ... passed")
-    self.dlg.label_StepStatus.setText("Step Status: ")
-    self.dlg.progressBar_step.setValue(100)
-    QCoreApplication.processEvents()
-
-
-# Create a field for filtering rows on area
-def create_sub_grid_filter(self):
-    time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-    self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Calculating overlapping sizes ... processing")
-    # self.dlg.textEdit_sm_link_log.append('              ⮡     *** BE PATIENT!!! This step takes the most time! ***    ')
-
-    self.dlg.label_StepStatus.setText("Calculating overlapping sizes ... ")
-    self.dlg.progressBar_step.setValue(0)
-    QCoreApplication.processEvents()
-
-    self.layer = QgsProject.instance().mapLayersByName("sub_grid (APEX-MODFLOW)")[0]
-    provider = self.layer.dataProvider()
-    if provider.fields().indexFromName("ol_area") == -1:
-        field = QgsField("ol_area", QVariant.Int)
-        provider.addAttributes([field])
-        self.layer.updateFields()
-        # 
-        tot_feats = self.layer.featureCount()
-        count = 0
-
-        feats = self.layer.getFeatures()
-        self.layer.startEditing()
-        for feat in feats:
-            area = feat.geometry().area()
-            #score = scores[i]
-            feat['ol_area'] = round(area)
-            self.layer.updateFeature(feat)
-            count += 1
-            provalue = round(count/tot_feats*100)
-            self.dlg.progressBar_step.setValue(provalue)
-            QCoreApplication.processEvents()
-        self.layer.commitChanges()
-        self.dlg.progressBar_step.setValue(100)
-        QCoreApplication.processEvents()
-        time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-        self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Calculating overlapping sizes... processing")
-        self.dlg.textEdit_sm_link_log.append('              ⮡     *** HOORAY!!! Almost there! ***    ')      
-        self.dlg.label_StepStatus.setText('Step Status: ')
-        QCoreApplication.processEvents()
-
-
-def delete_sub_grid_with_zero(self):
-    time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-    self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Deleting small objects ... processing")
-    self.dlg.label_StepStatus.setText("Deleting small objects ... ")
-    self.dlg.progressBar_step.setValue(0)
-    QCoreApplication.processEvents()
-
-    self.layer = QgsProject.instance().mapLayersByName("sub_grid (APEX-MODFLOW)")[0]
-    provider = self.layer.dataProvider()
+    sub_layer = QgsProject.instance().mapLayersByName("sub (APEX)")[0]
+    grid_layer = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0]
+    lattice = grid_lattice(grid_layer)
     if self.dlg.groupBox_threshold.isChecked():
         threshold = self.dlg.horizontalSlider_ol_area.value()
-        request = QgsFeatureRequest().setFilterExpression('"ol_area" < {}'.format(threshold))
     else:
-        request = QgsFeatureRequest().setFilterExpression('"ol_area" < 9')
-    request.setSubsetOfAttributes([])
-    request.setFlags(QgsFeatureRequest.NoGeometry)
-    tot_feats = self.layer.featureCount()
-    count = 0
-    self.layer.startEditing()
-    for f in self.layer.getFeatures(request):
-        self.layer.deleteFeature(f.id())
-        count += 1
-        provalue = round(count/tot_feats*100)
+        threshold = 9
+    transform = None
+    if sub_layer.crs() != grid_layer.crs():
+        transform = QgsCoordinateTransform(
+            sub_layer.crs(), grid_layer.crs(), QgsProject.instance())
+
+    request = QgsFeatureRequest()
+    request.setSubsetOfAttributes(["Subbasin", "sub_area"], sub_layer.fields())
+    features = []
+    for feat in sub_layer.getFeatures(request):
+        geom = feat.geometry()
+        if geom.isNull():
+            continue
+        if transform is not None:
+            geom.transform(transform)
+        features.append((feat["Subbasin"], feat["sub_area"], bytes(geom.asWkb())))
+
+    # chunks of SUBs are overlaid in worker processes while the dialog
+    # keeps processing its events
+    def progress(provalue):
         self.dlg.progressBar_step.setValue(provalue)
         QCoreApplication.processEvents()
-    self.layer.commitChanges()
-    self.dlg.progressBar_step.setValue(100)
-    QCoreApplication.processEvents()
+    cache_file = os.path.join(get_cache_dir(self), "link_sa_grid.npz")
+    table, noverlaid = link_cache.overlay(
+        lattice, features, threshold, cache_file, progress=progress)
+
     time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-    self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Deleting small objects ... passed")
-    self.dlg.label_StepStatus.setText('Step Status: ')
+    self.dlg.textEdit_sm_link_log.append(
+        time+' -> ' + "{} of {} SUBs overlaid, the others are unchanged".format(
+            noverlaid, len(features)))
+    self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Intersecting SUBs by GRIDs ... passed")
+    self.dlg.label_StepStatus.setText("Step Status: ")
+    self.dlg.progressBar_step.setValue(100)
     QCoreApplication.processEvents()
+    return table
 
 
 
@@ -310,171 +288,156 @@ def delete_sub_grid_with_zero(self):
 
 
 
-def export_rgrid_len(self):
+def river_grid_lengths(self):
+    """River length of every APEX river in every river cell it passes
+    through, as a (grid_id, subbasin, rgrid_len) table (see
+    grid_overlay.river_lengths).
+
+    The rivers are walked through the row/col lattice of the selected
+    mf_riv layer instead of being intersected with it, and lengths that
+    round to zero are left out. Only the rivers whose geometry changed
+    since the last run are walked again (see link_cache).
+    """
+    input1 = QgsProject.instance().mapLayersByName("riv (APEX)")[0]
+    if self.dlg.radioButton_mf_riv1.isChecked():
+        input2 = QgsProject.instance().mapLayersByName("mf_riv1 (MODFLOW)")[0]
+    elif self.dlg.radioButton_mf_riv3.isChecked():
+        input2 = QgsProject.instance().mapLayersByName("mf_riv3 (MODFLOW)")[0]
+    else:
+        input2 = QgsProject.instance().mapLayersByName("mf_riv2 (MODFLOW)")[0]
+    lattice = grid_lattice(input2)
+    transform = None
+    if input1.crs() != input2.crs():
+        transform = QgsCoordinateTransform(input1.crs(), input2.crs(), QgsProject.instance())
+
+    request = QgsFeatureRequest()
+    request.setSubsetOfAttributes(["Subbasin"], input1.fields())
+    features = []
+    for feat in input1.getFeatures(request):
+        geom = feat.geometry()
+        if geom.isNull() or feat["Subbasin"] == NULL:
+            continue
+        if transform is not None:
+            geom.transform(transform)
+        features.append((feat["Subbasin"], bytes(geom.asWkb())))
+    cache_file = os.path.join(get_cache_dir(self), "link_river_grid.npz")
+    table, _ = link_cache.river_lengths(lattice, features, 0.5, cache_file)
+    return table
+
+
+def _write_table(output_file, header_rows, rows):
+    """Write a tab separated GIS Table file, leaving it untouched when its
+    content is already the same (its time stamp then tells when the linking
+    last changed). Returns whether the file was written."""
+    buf = io.StringIO(newline='')
+    writer = csv.writer(buf, delimiter='\t')
+    writer.writerows(header_rows)
+    writer.writerows(rows)
+    text = buf.getvalue()
+    if os.path.isfile(output_file):
+        with open(output_file, "r", newline='') as f:
+            if f.read() == text:
+                return False
+    with open(output_file, "w", newline='') as f:
+        f.write(text)
+    return True
+
+
+def export_rgrid_len(self, table=None):
     APEXMOD_path_dict = self.dirs_and_paths()  
-    ### sort by sub_id and then by grid and save down ### 
-    #read in the sub shapefile
-    layer = QgsProject.instance().mapLayersByName("river_grid (APEX-MODFLOW)")[0]
+    ### sort by grid and save down ### 
+    if table is None:
+        table = river_grid_lengths(self)
+    table = grid_overlay.sort_table(table, ['grid_id'])
 
-    # Get the index numbers of the fields
-    grid_id_index = layer.dataProvider().fields().indexFromName("grid_id")
-    subbasin_index = layer.dataProvider().fields().indexFromName("Subbasin")
-    ol_length_index = layer.dataProvider().fields().indexFromName("ol_length")
-    
-    # transfer the shapefile layer to a python list
-    l = []
-    for i in layer.getFeatures():
-        l.append(i.attributes())
-    
-    # then sort by columns
-    import operator
-    l_sorted = sorted(l, key=operator.itemgetter(grid_id_index))
-    
-    info_number = len(l_sorted) # number of lines
+    info_number = len(table['grid_id']) # number of lines
     #-----------------------------------------------------------------------#
     # exporting the file 
     name = "link_river_grid"
     output_dir = APEXMOD_path_dict['Table']   
     output_file = os.path.normpath(os.path.join(output_dir, name))
 
-    with open(output_file, "w", newline='') as f:
-        writer = csv.writer(f, delimiter = '\t')
-        first_row = [str(info_number)] # prints the sub number to the file
-        second_row = ["grid_id subbasin rgrid_len"]
-        writer.writerow(first_row)
-        writer.writerow(second_row)
-        for item in l_sorted:
-            # Write item to outcsv. the order represents the output order
-            writer.writerow([item[grid_id_index], item[subbasin_index], item[ol_length_index]])
+    first_row = [str(info_number)] # prints the sub number to the file
+    second_row = ["grid_id subbasin rgrid_len"]
+    _write_table(
+        output_file, [first_row, second_row],
+        zip(table['grid_id'].tolist(), table['subbasin'].tolist(), table['rgrid_len'].tolist()))
+
+
+def _sub_grid_rows(table, cell_size):
+    # grid_id grid_area sub_id overlap_area sub_area
+    return zip(
+        table['grid_id'].tolist(), [str(int(cell_size))] * len(table['grid_id']),
+        table['subbasin'].tolist(), table['ol_area'].tolist(), table['sub_area'].tolist())
 
 
-def export_sub_grid(self):
+def export_sub_grid(self, table=None):
     APEXMOD_path_dict = self.dirs_and_paths()
-    #read in the sub shapefile
-    layer = QgsProject.instance().mapLayersByName("sub_grid (APEX-MODFLOW)")[0]
-    # Get the index numbers of the fields
-    sub_id_index = layer.dataProvider().fields().indexFromName("Subbasin")
-    sub_area_index = layer.dataProvider().fields().indexFromName("sub_area")
-    grid_id_index = layer.dataProvider().fields().indexFromName("grid_id")
-    overlap_area_index = layer.dataProvider().fields().indexFromName("ol_area")
-
-    # transfer the shapefile layer to a python list
-    l = []
-    for i in layer.getFeatures():
-        l.append(i.attributes())
-    # then sort by columns
-    import operator
-    l_sorted = sorted(l, key=operator.itemgetter(grid_id_index, sub_id_index))
-    #l.sort(key=itemgetter(6))
-    #add a counter as index for the sub id
-    for filename in glob.glob(str(APEXMOD_path_dict['MODFLOW'])+"/*.dis"):
-        with open(filename, "r") as f:
-            data = []
-            for line in f.readlines():
-                if not line.startswith("#"):
-                    data.append(line.replace('\n', '').split())
-        nrow = int(data[0][1])
-        ncol = int(data[0][2])
-        delr = float(data[2][1]) # is the cell width along rows (x spacing)
-        delc = float(data[3][1]) # is the cell width along columns (y spacing).
+    # overlap table of SUBs and GRIDs, sorted by grid and then by sub
+    if table is None:
+        table = sub_grid(self)
+    table = grid_overlay.sort_table(table, ['grid_id', 'subbasin'])
+
+    dis = require_dis(str(APEXMOD_path_dict['MODFLOW']))
+    if dis is None:
+        return
+    nrow = dis.nrow
+    ncol = dis.ncol
+    delr = float(dis.delr[0]) # is the cell width along rows (x spacing)
+    delc = float(dis.delc[0]) # is the cell width along columns (y spacing).
     cell_size = delr * delc
     number_of_grids = nrow * ncol
-    for i in l_sorted:     
-        i.append(str(int(cell_size))) # area of the grid
 
-    info_number = len(l_sorted) # number of lines with information
+    info_number = len(table['grid_id']) # number of lines with information
     #-----------------------------------------------------------------------#
     # exporting the file 
     name = "link_sa_grid"
     output_dir = APEXMOD_path_dict['Table'] 
     output_file = os.path.normpath(os.path.join(output_dir, name))
 
-    with open(output_file, "w", newline='') as f:
-        writer = csv.writer(f, delimiter = '\t')
-        first_row = [str(info_number)] # prints the sub number to the file
-        second_row = [str(number_of_grids)] # prints the total number of grid cells
-        third_row = ["grid_id grid_area sub_id overlap_area sub_area"]
-        writer.writerow(first_row)
-        writer.writerow(second_row)
-        writer.writerow(third_row)
-
-        for item in l_sorted:
-        #Write item to outcsv. the order represents the output order
-            writer.writerow([
-                item[grid_id_index], item[overlap_area_index + 1],
-                item[sub_id_index], item[overlap_area_index], item[sub_area_index]])
-
-
-def export_grid_sub(self):
+    first_row = [str(info_number)] # prints the sub number to the file
+    second_row = [str(number_of_grids)] # prints the total number of grid cells
+    third_row = ["grid_id grid_area sub_id overlap_area sub_area"]
+    _write_table(
+        output_file, [first_row, second_row, third_row], _sub_grid_rows(table, cell_size))
+
+
+def export_grid_sub(self, table=None):
     APEXMOD_path_dict = self.dirs_and_paths()
-    #read in the sub shapefile
-    layer = QgsProject.instance().mapLayersByName("sub_grid (APEX-MODFLOW)")[0]
-
-    # Get max number of sub id
-    sub_max = [f.attribute("Subbasin") for f in layer.getFeatures()]
-
-    # Get the index numbers of the fields
-    sub_id_index = layer.dataProvider().fields().indexFromName("Subbasin")
-    sub_area_index = layer.dataProvider().fields().indexFromName("sub_area")
-    grid_id_index = layer.dataProvider().fields().indexFromName("grid_id")
-    overlap_area_index = layer.dataProvider().fields().indexFromName("ol_area")
-
-    # transfer the shapefile layer to a python list
-    l = []
-    for i in layer.getFeatures():
-        l.append(i.attributes())
-    # then sort by columns
-    import operator
-    l_sorted = sorted(l, key=operator.itemgetter(sub_id_index, grid_id_index))
-
-    #l.sort(key=itemgetter(6))
-    #add a counter as index for the sub id
-    for filename in glob.glob(str(APEXMOD_path_dict['MODFLOW'])+"/*.dis"):
-        with open(filename, "r") as f:
-            data = []
-            for line in f.readlines():
-                if not line.startswith("#"):
-                    data.append(line.replace('\n', '').split())
-        nrow = int(data[0][1])
-        ncol = int(data[0][2])
-        delr = float(data[2][1]) # is the cell width along rows (x spacing)
-        delc = float(data[3][1]) # is the cell width along columns (y spacing).
+    # overlap table of SUBs and GRIDs, sorted by sub and then by grid
+    if table is None:
+        table = sub_grid(self)
+    table = grid_overlay.sort_table(table, ['subbasin', 'grid_id'])
+
+    dis = require_dis(str(APEXMOD_path_dict['MODFLOW']))
+    if dis is None:
+        return
+    nrow = dis.nrow
+    ncol = dis.ncol
+    delr = float(dis.delr[0]) # is the cell width along rows (x spacing)
+    delc = float(dis.delc[0]) # is the cell width along columns (y spacing).
 
     cell_size = delr * delc
     number_of_grids = nrow * ncol
 
-    for i in l_sorted:
-        i.append(str(int(cell_size))) # area of the grid
-        
-
-
     # It seems we need just total number of DHRUs not the one used in study area
     # sub_number = len(sub_id_unique) # number of subs
-    sub_number = max(sub_max) # number of subs
-    info_number = len(l_sorted) # number of lines with information
+    sub_number = max(table['subbasin'].tolist()) # number of subs
+    info_number = len(table['grid_id']) # number of lines with information
     #-----------------------------------------------------------------------#
     # exporting the file 
     name = "link_grid_sa"
     output_dir = APEXMOD_path_dict['Table'] 
     output_file = os.path.normpath(os.path.join(output_dir, name))
 
-    with open(output_file, "w", newline='') as f:
-        writer = csv.writer(f, delimiter = '\t')
-        first_row = [str(info_number)] # prints the dnumber of lines with information
-        second_row = [str(sub_number)] # prints the total number of sub
-        third_row = [str(nrow)] # prints the row number to the file
-        fourth_row = [str(ncol)] # prints the column number to the file     
-        fifth_row = ["grid_id grid_area sub_id overlap_area sub_area"]
-        writer.writerow(first_row)
-        writer.writerow(second_row)
-        writer.writerow(third_row)
-        writer.writerow(fourth_row)
-        writer.writerow(fifth_row)
-
-        for item in l_sorted:
-        #Write item to outcsv. the order represents the output order
-            writer.writerow([item[grid_id_index], item[overlap_area_index + 1],
-                item[sub_id_index], item[overlap_area_index], item[sub_area_index]])
+    first_row = [str(info_number)] # prints the dnumber of lines with information
+    second_row = [str(sub_number)] # prints the total number of sub
+    third_row = [str(nrow)] # prints the row number to the file
+    fourth_row = [str(ncol)] # prints the column number to the file
+    fifth_row = ["grid_id grid_area sub_id overlap_area sub_area"]
+    _write_table(
+        output_file, [first_row, second_row, third_row, fourth_row, fifth_row],
+        _sub_grid_rows(table, cell_size))
 
 
 # NOTE: Not used for APEX-MODFLOW
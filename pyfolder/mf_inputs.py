@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+"""
+Parsers for the MODFLOW/RT3D input files used by the plugin
+(.dis, .riv, .wel, .drn and .btn).
+
+Every file is parsed at most once per session: results are memoized by path
+and kept as long as the file's modification time and size do not change.
+The module does not depend on QGIS.
+"""
+
+import glob
+import os
+import re
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import List
+
+import numpy as np
+
+_parsed = {}
+
+# columns following layer, row, col in the stress period lists of each package
+PACKAGE_FIELDS = {
+    'riv': ("stage", "cond", "rbot"),
+    'wel': ("flux",),
+    'drn': ("elev", "cond"),
+}
+
+
+@dataclass
+class Dis:
+    """Discretization (.dis) of a MODFLOW model.
+
+    Only the dimensions and delr/delc are read with the file; top, botm and
+    the stress periods are parsed on first access, so callers that only need
+    the grid do not depend on the format of the layer arrays.
+    """
+    nlay: int
+    nrow: int
+    ncol: int
+    nper: int
+    itmuni: int
+    lenuni: int
+    laycbd: np.ndarray
+    delr: np.ndarray  # one value per column
+    delc: np.ndarray  # one value per row
+    path: str = ""
+    # data lines of the file and position of the top record, None if unknown
+    _lines: list = field(default=None, repr=False, compare=False)
+    _pos: int = field(default=None, repr=False, compare=False)
+
+    @property
+    def ncells(self):
+        return self.nrow * self.ncol
+
+    @cached_property
+    def _layers(self):
+        if self._pos is None:
+            raise ValueError(
+                "the delr/delc records of {} could not be read".format(self.path))
+        lines, pos = self._lines, self._pos
+        folder = os.path.dirname(self.path)
+        n = self.nrow * self.ncol
+        top, pos = _read_array(lines, pos, n, folder)
+        nbotm = self.nlay + int((self.laycbd[:-1] != 0).sum())
+        botm = []
+        for _ in range(nbotm):
+            arr, pos = _read_array(lines, pos, n, folder)
+            botm.append(arr)
+        perlen, nstp, tsmult, steady = [], [], [], []
+        for line in lines[pos:pos+self.nper]:
+            perlen.append(float(line[0]))
+            nstp.append(int(line[1]))
+            tsmult.append(float(line[2]))
+            steady.append(line[3].upper() == "SS")
+        return (
+            top.reshape(self.nrow, self.ncol),
+            np.asarray(botm).reshape(nbotm, self.nrow, self.ncol),
+            np.asarray(perlen), np.asarray(nstp, dtype=int),
+            np.asarray(tsmult), steady)
+
+    @property
+    def top(self):
+        """(nrow, ncol) top elevation"""
+        return self._layers[0]
+
+    @property
+    def botm(self):
+        """(nlay + quasi-3D confining beds, nrow, ncol) bottom elevations"""
+        return self._layers[1]
+
+    @property
+    def perlen(self):
+        return self._layers[2]
+
+    @property
+    def nstp(self):
+        return self._layers[3]
+
+    @property
+    def tsmult(self):
+        return self._layers[4]
+
+    @property
+    def steady(self):
+        return self._layers[5]
+
+
+@dataclass
+class ListPackage:
+    """Stress period lists of a .riv, .wel or .drn package.
+
+    periods holds one structured array (lay, row, col, PACKAGE_FIELDS[ptype])
+    per stress period; a period that reuses the previous list points at the
+    same array.
+    """
+    ptype: str
+    mxact: int
+    periods: List[np.ndarray] = field(default_factory=list)
+
+
+@dataclass
+class Btn:
+    """Basic transport (.btn) package of RT3D, only what the plugin uses."""
+    ncomp: int
+    mcomp: int
+    species: List[str] = field(default_factory=list)
+
+
+def _memoized(path, key, parser):
+    st = os.stat(path)
+    stamp = (st.st_mtime, st.st_size)
+    cached = _parsed.get((path, key))
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    obj = parser(path)
+    _parsed[(path, key)] = (stamp, obj)
+    return obj
+
+
+def _data_lines(path):
+    """Non-comment lines of a MODFLOW input file, inline comments removed."""
+    with open(path, "r") as f:
+        lines = [x.split("#")[0].split() for x in f if not x.startswith("#")]
+    return [x for x in lines if x]
+
+
+def _expand(tokens, width=None):
+    """Numbers of a free-format record, with 'n*value' repeats expanded.
+
+    With the field width of a fixed format, tokens longer than one field
+    (values written without a separating blank) are cut into fields from the
+    right, since Fortran right-justifies numbers.
+    """
+    values = []
+    for tok in tokens:
+        if width and len(tok) > width and "*" not in tok:
+            cut = [tok[max(i - width, 0):i] for i in range(len(tok), 0, -width)]
+            values.extend(_expand(cut[::-1]))
+        elif "*" in tok:
+            n, v = tok.split("*")
+            values.extend([float(v)] * int(n))
+        else:
+            values.append(float(tok.replace("d", "e").replace("D", "E")))
+    return values
+
+
+def _control_record(header):
+    """Fields before the format of an array control record, and the field
+    width of the format, None for (FREE), binary or a missing format."""
+    text = " ".join(header)
+    fmtin = re.search(r"\(.*?\)", text)
+    if fmtin is None:
+        return header, None
+    width = re.match(
+        r"\(\s*(?:\d+P\s*,?\s*)?\d*\s*[FEGDI][SN]?(\d+)", fmtin.group().upper())
+    return text[:fmtin.start()].split(), int(width.group(1)) if width else None
+
+
+def _external_file(folder, unit):
+    """File of a unit number in the name (.nam) file of the model folder."""
+    for nam in glob.glob(os.path.join(folder, "*.nam")):
+        for line in _data_lines(nam):
+            if len(line) > 2 and line[1] == str(unit):
+                return os.path.join(folder, line[2].strip("'\""))
+    raise ValueError("unit {} is not in a name file".format(unit))
+
+
+def _read_binary(fname, n):
+    """n values of a MODFLOW binary array file (kstp, kper, pertim, totim,
+    text, ncol, nrow, ilay header), single or double precision."""
+    size = os.path.getsize(fname)
+    for real, hdr in ((np.float32, 44), (np.float64, 52)):
+        if size == hdr + n * np.dtype(real).itemsize:
+            return np.fromfile(fname, dtype=real, offset=hdr).astype(float)
+    raise ValueError("{} is not a binary array of {} values".format(fname, n))
+
+
+def _read_array(lines, pos, n, folder):
+    """Read one array record (CONSTANT, INTERNAL, EXTERNAL, OPEN/CLOSE or the
+    fixed LOCAT control record) of n values starting at lines[pos].
+
+    Returns the array and the position of the next record.
+    """
+    header, width = _control_record(lines[pos])
+    key = header[0].upper()
+    pos += 1
+    if key == "CONSTANT":
+        return np.full(n, float(header[1])), pos
+    if key in ("OPEN/CLOSE", "EXTERNAL"):
+        if key == "EXTERNAL":
+            fname = _external_file(folder, header[1])
+        else:
+            fname = os.path.join(folder, header[1].strip("'\""))
+        cnstnt = float(header[2]) if len(header) > 2 else 1.0
+        if "(BINARY)" in " ".join(lines[pos - 1]).upper():
+            return _read_binary(fname, n) * cnstnt, pos
+        values = _expand(sum(_data_lines(fname), []), width)[:n]
+        if len(values) < n:
+            raise ValueError("{} has fewer than {} values".format(fname, n))
+        return np.asarray(values) * cnstnt, pos
+    if key == "INTERNAL":
+        cnstnt = float(header[1]) if len(header) > 1 else 1.0
+    else:
+        # fixed format: LOCAT CNSTNT ...; LOCAT 0 is a constant
+        if int(header[0]) == 0:
+            return np.full(n, float(header[1])), pos
+        cnstnt = float(header[1])
+    values = []
+    while len(values) < n:
+        values.extend(_expand(lines[pos], width))
+        pos += 1
+    if cnstnt == 0:
+        cnstnt = 1.0
+    return np.asarray(values[:n]) * cnstnt, pos
+
+
+def _read_widths(lines, pos, n, folder):
+    """Read the delr or delc record at lines[pos].
+
+    An INTERNAL or fixed-format record that cannot be read falls back to the
+    second field of its control record as a uniform width, as the plugin
+    always did; the position of the next record is None then.
+    """
+    try:
+        return _read_array(lines, pos, n, folder)
+    except (ValueError, OSError, IndexError):
+        header, _ = _control_record(lines[pos])
+        if header[0].upper() in ("EXTERNAL", "OPEN/CLOSE"):
+            raise
+        try:
+            return np.full(n, float(header[1])), None
+        except (ValueError, IndexError):
+            raise ValueError("cannot read the grid spacing of the .dis file")
+
+
+def _parse_dis(path):
+    lines = _data_lines(path)
+    folder = os.path.dirname(path)
+    nlay, nrow, ncol, nper, itmuni, lenuni = [int(v) for v in lines[0][:6]]
+    laycbd = []
+    pos = 1
+    while len(laycbd) < nlay:
+        laycbd.extend(int(float(v)) for v in lines[pos])
+        pos += 1
+    laycbd = np.asarray(laycbd[:nlay])
+    delr, nxt = _read_widths(lines, pos, ncol, folder)
+    # an unreadable delr is taken to be a single line, like before
+    delc, nxt = _read_widths(lines, pos + 1 if nxt is None else nxt, nrow, folder)
+    return Dis(
+        nlay, nrow, ncol, nper, itmuni, lenuni, laycbd, delr, delc,
+        path, lines, nxt)
+
+
+def read_dis(path):
+    """Parsed .dis file (see Dis)."""
+    return _memoized(path, "dis", _parse_dis)
+
+
+def find_dis(folder):
+    """Parsed .dis file of a MODFLOW folder, or None if there is none."""
+    filenames = glob.glob(str(folder) + "/*.dis")
+    if not filenames:
+        return None
+    return read_dis(filenames[-1])
+
+
+def require_dis(folder):
+    """find_dis, telling the user when the folder has no .dis file or its
+    grid cannot be read; returns None then. QGIS is only imported then."""
+    try:
+        dis = find_dis(folder)
+        text = "We couldn't find your *.dis file."
+    except (ValueError, IndexError, OSError):
+        dis = None
+        text = "We couldn't read your *.dis file."
+    if dis is None:
+        from qgis.PyQt import QtGui
+        from PyQt5.QtWidgets import QMessageBox
+        msgBox = QMessageBox()
+        msgBox.setWindowIcon(QtGui.QIcon(':/APEXMOD/pics/am_icon.png'))
+        msgBox.setWindowTitle("File Not Found!")
+        msgBox.setText(text)
+        msgBox.exec_()
+    return dis
+
+
+def _to_cells(rows, ptype):
+    names = PACKAGE_FIELDS[ptype]
+    dtype = [("lay", int), ("row", int), ("col", int)] + [(n, float) for n in names]
+    nfields = len(dtype)
+    values = np.array([x[:nfields] for x in rows], dtype=float).reshape(-1, nfields)
+    cells = np.zeros(len(values), dtype=dtype)
+    for i, (name, _) in enumerate(dtype):
+        cells[name] = values[:, i]
+    return cells
+
+
+def _package_parser(ptype):
+    def parse(path):
+        lines = _data_lines(path)
+        mxact = int(lines[0][0])
+        pkg = ListPackage(ptype, mxact)
+        pos = 1
+        cells = _to_cells([], ptype)
+        while pos < len(lines):
+            itmp = int(lines[pos][0])
+            pos += 1
+            if itmp >= 0:
+                cells = _to_cells(lines[pos:pos+itmp], ptype)
+                pos += itmp
+            pkg.periods.append(cells)
+        return pkg
+    return parse
+
+
+def read_package(path, ptype):
+    """Parsed .riv, .wel or .drn file (see ListPackage)."""
+    return _memoized(path, ptype, _package_parser(ptype))
+
+
+def read_package_cells(filename, ptype, ncells=None):
+    """Entries of the first stress period of a list-based package.
+
+    Parameters
+    ----------
+    filename : str
+        .riv, .wel or .drn file
+    ptype : str
+        'riv', 'wel' or 'drn'
+    ncells : int, optional
+        number of entries to read, defaults to the length of the first
+        stress period list
+
+    Returns
+    -------
+    numpy.ndarray
+        structured array with fields lay, row, col and PACKAGE_FIELDS[ptype]
+    """
+    pkg = read_package(filename, ptype)
+    cells = pkg.periods[0] if pkg.periods else _to_cells([], ptype)
+    if ncells is not None and ncells != len(cells):
+        # a user-given count overrides the one in the file
+        lines = _data_lines(filename)
+        cells = _to_cells(lines[2:ncells+2], ptype)
+    return cells
+
+
+def _parse_btn(path):
+    with open(path, "r") as f:
+        lines = f.readlines()
+    data = [i.split() for i in lines]
+    ncomp = mcomp = 0
+    lspecies = None
+    species = []
+    for num, line in enumerate(lines):
+        if line.startswith("'NCOMP,"):
+            ncomp = int(data[num+1][0])
+            mcomp = int(data[num+1][1]) if len(data[num+1]) > 1 else ncomp
+        if line.startswith("'SPECIES"):
+            lspecies = num + 1
+    if ncomp and lspecies is not None:
+        species = [data[i][0].replace("'", "") for i in range(lspecies, lspecies + ncomp)]
+    return Btn(ncomp, mcomp, species)
+
+
+def read_btn(path):
+    """Parsed .btn file (see Btn)."""
+    return _memoized(path, "btn", _parse_btn)
+
+
+def find_btn(folder):
+    """Parsed .btn file of a MODFLOW folder, or None if there is none."""
+    filenames = glob.glob(str(folder) + "/*.btn")
+    if not filenames:
+        return None
+    return read_btn(filenames[-1])
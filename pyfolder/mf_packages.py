@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Matching of the cells of the MODFLOW list-based packages (.riv, .wel, .drn)
+against the features of a grid layer.
+
+The package entries are read once into a numpy structured array
+(mf_inputs.read_package_cells) and matched to the grid with a sorted
+linear-index lookup instead of comparing every feature with every entry.
+"""
+
+import numpy as np
+from qgis.core import QgsFeatureRequest
+
+from .mf_inputs import read_package_cells
+
+
+def _cell_keys(rows, cols, ncol):
+    return np.asarray(rows, dtype=np.int64) * (ncol + 1) + np.asarray(cols, dtype=np.int64)
+
+
+def match_cells(layer, cells):
+    """Join package entries to the features of a grid layer on (row, col).
+
+    Parameters
+    ----------
+    layer : QgsVectorLayer
+        grid layer with 'row' and 'col' fields
+    cells : numpy.ndarray
+        structured array from read_package_cells
+
+    Returns
+    -------
+    fids : list of int
+        ids of the features that carry a package entry
+    idx : numpy.ndarray
+        index into cells of the entry matched to each of fids. When a cell
+        is listed more than once the last entry is used.
+    """
+    request = QgsFeatureRequest()
+    request.setFlags(QgsFeatureRequest.NoGeometry)
+    request.setSubsetOfAttributes(["row", "col"], layer.fields())
+    fids, frows, fcols = [], [], []
+    for f in layer.getFeatures(request):
+        rowNo, colNo = f.attribute("row"), f.attribute("col")
+        if rowNo is None or colNo is None:
+            continue
+        fids.append(f.id())
+        frows.append(rowNo)
+        fcols.append(colNo)
+    if not fids or not len(cells):
+        return [], np.array([], dtype=int)
+
+    frows = np.asarray(frows, dtype=np.int64)
+    fcols = np.asarray(fcols, dtype=np.int64)
+    ncol = int(max(fcols.max(), cells["col"].max()))
+    fkeys = _cell_keys(frows, fcols, ncol)
+    ckeys = _cell_keys(cells["row"], cells["col"], ncol)
+
+    # unique keys of the package, each pointing at its last entry
+    ukeys, first = np.unique(ckeys[::-1], return_index=True)
+    last = len(ckeys) - 1 - first
+    pos = np.searchsorted(ukeys, fkeys).clip(max=len(ukeys) - 1)
+    hit = ukeys[pos] == fkeys
+    return np.asarray(fids)[hit].tolist(), last[pos[hit]]
@@ -18,26 +18,23 @@ from PyQt5.QtWidgets import (
     QAction, QDialog, QFormLayout,
     QMessageBox, QFileDialog
 )
+from .mf_inputs import require_dis
+from .mf_packages import read_package_cells, match_cells
+from .structured_grid import write_grid, cell_numbers
+from .layer_writer import write_columns
 # from APEXMOD.APEXMOD import dirs_and_paths --> this is not working why?
 
 def check_grid_size(self):  # Create fishnet based on MODFLOW dis file
     # Find .dis file and read number of rows, cols, x spacing, and y spacing (not allowed to change)
-    QSWATMOD_path_dict = self.dirs_and_paths()
-    for filename in glob.glob(str(QSWATMOD_path_dict['SMfolder'])+"/*.dis"):
-        with open(filename, "r") as f:
-            data = []
-            for line in f.readlines():
-                if not line.startswith("#"):
-                    data.append(line.replace('\n', '').split())
-        nrow = int(data[0][1])
-        ncol = int(data[0][2])
-        if data[2][0] == "INTERNAL":        
-            delr = float(data[3][1])  # cell width along rows (y spacing)
-            delc = float(data[4][1])  # cell width along columns (x spacing)
-        else:
-            delr = float(data[2][1])  # cell width along rows (y spacing)
-            delc = float(data[3][1])  # cell width along columns (x spacing)        
-        grid_size = delr * delc
+    APEXMOD_path_dict = self.dirs_and_paths()
+    dis = require_dis(str(APEXMOD_path_dict['MODFLOW']))
+    if dis is None:
+        return None
+    nrow = dis.nrow
+    ncol = dis.ncol
+    delr = float(dis.delr[0])  # cell width along rows (y spacing)
+    delc = float(dis.delc[0])  # cell width along columns (x spacing)
+    grid_size = delr * delc
     return grid_size
 
 
@@ -56,86 +53,32 @@ def MF_grid(self):  # Create fishnet based on MODFLOW dis file
     y_origin = self.dlg.lineEdit_y_coordinate.text()
 
     # Find .dis file and read number of rows, cols, x spacing, and y spacing (not allowed to change)
-    for filename in glob.glob(str(APEXMOD_path_dict['MODFLOW'])+"/*.dis"):
-        with open(filename, "r") as f:
-            data = []
-            for line in f.readlines():
-                if not line.startswith("#"):
-                    data.append(line.replace('\n', '').split())
-        nrow = int(data[0][1])
-        ncol = int(data[0][2])
-        delr = float(data[2][1])  # cell width along rows (y spacing)
-        delc = float(data[3][1])  # cell width along columns (x spacing)
-
-        # Add_Subtract number of column, row
-        n_row = self.dlg.spinBox_row.value()
-        n_col = self.dlg.spinBox_col.value()
-
-        # Calculate MODFLOW extent
-        if self.dlg.groupBox_add_grid.isChecked():
-            x_right = (float(x_origin) + (ncol * delc)) + (delc * n_col)
-            y_lower = (float(y_origin) - (nrow * delr)) - (delr * n_row)
-        else:
-            x_right = (float(x_origin) + (ncol * delc))
-            y_lower = (float(y_origin) - (nrow * delr))
-        MF_extent = "{a},{b},{c},{d}".format(a=x_origin, b=x_right, c=y_lower, d=y_origin)
-
-    # mf option 2
-    name_ext = "mf_grid_.shp"
+    dis = require_dis(str(APEXMOD_path_dict['MODFLOW']))
+    if dis is None:
+        return
+    nrow = dis.nrow
+    ncol = dis.ncol
+    delr = float(dis.delr[0])  # cell width along rows (y spacing)
+    delc = float(dis.delc[0])  # cell width along columns (x spacing)
+
+    # Add_Subtract number of column, row
+    if self.dlg.groupBox_add_grid.isChecked():
+        nrow += self.dlg.spinBox_row.value()
+        ncol += self.dlg.spinBox_col.value()
+
+    # Build the grid cells directly from the dis info with grid_id, row, col
+    name_ext_v = 'mf_grid.gpkg'
     output_dir = APEXMOD_path_dict['org_shps']
-    output_file_ = os.path.normpath(os.path.join(output_dir, name_ext))
-
-    # running the acutal routine:
-    params = {
-        'TYPE': 2,
-        'EXTENT': MF_extent,
-        'HSPACING': delc,
-        'VSPACING': delr,
-        'CRS': crs,
-        'OUTPUT': output_file_,
-        'OVERWRITE': True
-    }
-    processing.run("native:creategrid", params)
+    output_file_v = os.path.normpath(os.path.join(output_dir, name_ext_v))
+    write_grid(
+        output_file_v, crs, float(x_origin), float(y_origin),
+        nrow, ncol, delr, delc, self.dlg.progressBar_step)
 
     time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
     self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Creating GRIDs ... passed")
     self.dlg.label_StepStatus.setText("Step Status: ")
-    self.dlg.progressBar_step.setValue(100)
     QCoreApplication.processEvents()
 
-    time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-    self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Fixing starting index ... processing")
-    self.dlg.label_StepStatus.setText("Step Status: ")
-    self.dlg.progressBar_step.setValue(0)
-    QCoreApplication.processEvents()
-
-    # rasterize
-    name_ext_r = 'mf_grid_.tif'
-    output_file_r = os.path.normpath(os.path.join(output_dir, name_ext_r))
-    params_r = {
-        'INPUT': output_file_,
-        'UNITS': 1,
-        'WIDTH': delc,
-        'HEIGHT': delr,
-        'EXTENT': MF_extent,
-        'NODATA': -9999,
-        'DATA_TYPE': 5,
-        'OUTPUT': output_file_r
-    }
-    processing.run("gdal:rasterize", params_r)
-
-    # vecterize
-    name_ext_v = 'mf_grid.shp'
-    output_file_v = os.path.normpath(os.path.join(output_dir, name_ext_v))
-
-    #
-    params_v = {
-        'INPUT_RASTER': output_file_r,
-        'RASTER_BAND': 1,
-        'FIELD': 'VALUE',
-        'OUTPUT': output_file_v
-    }
-    processing.run("native:pixelstopolygons", params_v)
     # Define the outputfile to be loaded into the canvas
     mf_grid_shapefile = os.path.join(output_dir, name_ext_v)
     layer = QgsVectorLayer(mf_grid_shapefile, '{0} ({1})'.format("mf_grid","MODFLOW"), 'ogr')
@@ -146,12 +89,6 @@ def MF_grid(self):  # Create fishnet based on MODFLOW dis file
     QgsProject.instance().addMapLayer(layer, False)
     mf_group.insertChildNode(0, QgsLayerTreeLayer(layer))
 
-    time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-    self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Fixing starting index ... processing")
-    self.dlg.label_StepStatus.setText("Step Status: ")
-    self.dlg.progressBar_step.setValue(100)
-    QCoreApplication.processEvents()
-
 
 
 ### I don't know how to retrieve values. 'NoneType' object is not iterable
@@ -172,221 +109,48 @@ def MF_grid(self):  # Create fishnet based on MODFLOW dis file
 #       return nrow, ncol, delr, delc
 
 
-def create_grid_id(self):
-    time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-    self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Creating 'grid_id' ... processing")
-    self.dlg.label_StepStatus.setText("Creating 'grid_id' ... ")
-    self.dlg.progressBar_step.setValue(0)
-    QCoreApplication.processEvents()
-    
-    self.layer = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0]
-    provider = self.layer.dataProvider()
-    if provider.fields().indexFromName("grid_id") == -1:
-        field = QgsField("grid_id", QVariant.Int)
-        provider.addAttributes([field])
-        self.layer.updateFields()
-        grid_id = provider.fields().indexFromName("grid_id")
-        feats = self.layer.getFeatures()
-        self.layer.startEditing()
-        tot_feats = self.layer.featureCount()
-        count = 0
-        for i, f in enumerate(feats):
-            self.layer.changeAttributeValue(f.id(), grid_id, i+1)
-            count += 1
-            provalue = round(count/tot_feats*100)
-            self.dlg.progressBar_step.setValue(provalue)
-            QCoreApplication.processEvents()
-        self.layer.commitChanges()
-        QCoreApplication.processEvents()
-    else:
-        time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-        self.dlg.textEdit_sm_link_log.append(time+' -> ' + "'grid_id' already exists ...")
-    time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-    self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Creating 'grid_id' ... passed")
-    self.dlg.label_StepStatus.setText('Step Status: ')
-    QCoreApplication.processEvents()
-
-
-def create_row(self):
-    time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-    self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Creating 'row number' ... processing")
-    self.dlg.label_StepStatus.setText("Creating 'row number' ... ")
-    self.dlg.progressBar_step.setValue(0)
-    QCoreApplication.processEvents()
-
-    APEXMOD_path_dict = self.dirs_and_paths()
-    self.layer = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0]
-    provider = self.layer.dataProvider()
-    if self.layer.dataProvider().fields().indexFromName("row") == -1:
-        field = QgsField("row", QVariant.Int)
-        provider.addAttributes([field])
-        self.layer.updateFields()
-
-        # Get the index numbers of the fields
-        grid_id = self.layer.dataProvider().fields().indexFromName("grid_id")
-        row = provider.fields().indexFromName("row")
-
-        # Find .dis file and read number of rows, cols, x spacing, and y spacing (not allowed to change)
-        for filename in glob.glob(str(APEXMOD_path_dict['MODFLOW'])+"/*.dis"):
-            with open(filename, "r") as f:
-                data = []
-                for line in f.readlines():
-                    if not line.startswith("#"):
-                        data.append(line.replace('\n', '').split())
-            nrows = int(data[0][1])
-            ncols = int(data[0][2])
-
-        # Get row and column lists
-        iy = []  # row
-        # ix = [] # col
-        for i in range(1, nrows + 1):
-            for j in range(1, ncols + 1):
-                # ix.append(j)
-                iy.append(i)
-        # Get features (Find out a way to change attribute values using another field)
-        tot_feats = self.layer.featureCount()
-        count = 0
-
-        feats = self.layer.getFeatures()
-        self.layer.startEditing()
-        # add row number
-        for f, r in zip(feats, iy):
-            self.layer.changeAttributeValue(f.id(), row, r)
-            count += 1
-            provalue = round(count/tot_feats*100)
-            # self.layer.changeAttributeValue(f[grid_id] - 1, row, r)
-            # self.layer.changeAttributeValue(f[grid_id] - 1, col, c)
-            self.dlg.progressBar_step.setValue(provalue)
-            QCoreApplication.processEvents()
-        self.layer.commitChanges()
-        QCoreApplication.processEvents()
-    else:
-        time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-        self.dlg.textEdit_sm_link_log.append(time+' -> ' + "'row number' already exists ...")
-    time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-    self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Creating 'row number' ... passed")
-    self.dlg.label_StepStatus.setText('Step Status: ')
-    QCoreApplication.processEvents()
-
+def create_grid_attributes(self):
+    """Fill grid_id, row, col and elev_mf of 'mf_grid (MODFLOW)' in one pass.
 
-def create_col(self):
+    grid_id, row and col follow the row-major feature order of the grid and
+    elev_mf is the top of the model in the .dis file. The missing fields are
+    added and written together through the data provider; fields that
+    already exist are left as they are.
+    """
     time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-    self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Creating 'column number' ... processing")
-    self.dlg.label_StepStatus.setText("Creating 'column number' ... ")
+    self.dlg.textEdit_sm_link_log.append(
+        time+' -> ' + "Creating 'grid_id', 'row', 'col' and 'elev_mf' ... processing")
+    self.dlg.label_StepStatus.setText("Creating 'grid_id', 'row', 'col' and 'elev_mf' ... ")
     self.dlg.progressBar_step.setValue(0)
     QCoreApplication.processEvents()
 
     APEXMOD_path_dict = self.dirs_and_paths()
     self.layer = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0]
     provider = self.layer.dataProvider()
-    # Create Column field
-    if self.layer.dataProvider().fields().indexFromName("col") == -1:
-        field = QgsField("col", QVariant.Int)
-        provider.addAttributes([field])
-        self.layer.updateFields()
 
-        # Get the index numbers of the fields
-        grid_id = self.layer.dataProvider().fields().indexFromName("grid_id")
-        col = provider.fields().indexFromName("col")
-
-        # Find .dis file and read number of rows, cols, x spacing, and y spacing (not allowed to change)
-        for filename in glob.glob(str(APEXMOD_path_dict['MODFLOW'])+"/*.dis"):
-            with open(filename, "r") as f:
-                data = []
-                for line in f.readlines():
-                    if not line.startswith("#"):
-                        data.append(line.replace('\n', '').split())
-            nrows = int(data[0][1])
-            ncols = int(data[0][2])
-
-        # Get row and column lists
-        ix = []  # col
-        for i in range(1, nrows + 1):
-            for j in range(1, ncols + 1):
-                ix.append(j)
-
-        # Get features (Find out a way to change attribute values using another field)
-        tot_feats = self.layer.featureCount()
-        count = 0
-        feats = self.layer.getFeatures()
-        self.layer.startEditing()
-        # add row number
-        for f, c in zip(feats, ix):
-            self.layer.changeAttributeValue(f.id(), col, c)
-            count += 1
-            provalue = round(count/tot_feats*100)
-            self.dlg.progressBar_step.setValue(provalue)
-            QCoreApplication.processEvents()
-            # self.layer.changeAttributeValue(f[grid_id] - 1, row, r)
-            # self.layer.changeAttributeValue(f[grid_id] - 1, col, c)
-        self.layer.commitChanges()
-        QCoreApplication.processEvents()
-    else:
+    # Find .dis file and read number of rows, cols and the top elevation
+    dis = require_dis(str(APEXMOD_path_dict['MODFLOW']))
+    if dis is None:
+        return
+    columns = cell_numbers(dis.nrow, dis.ncol)
+    try:
+        columns['elev_mf'] = dis.top.ravel()
+    except (ValueError, IndexError, OSError):
         time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-        self.dlg.textEdit_sm_link_log.append(time+' -> ' + "'column number' already exists ...")
-    time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-    self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Creating 'column number' ... passed")
-    self.dlg.label_StepStatus.setText('Step Status: ')
-    QCoreApplication.processEvents()
-
-
-def create_elev_mf(self):
-    time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-    self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Importing 'land surface elevation' ... processing")
-    self.dlg.label_StepStatus.setText("Importing 'land surface elevation' ... ")
-    self.dlg.progressBar_step.setValue(0)
-    QCoreApplication.processEvents()
-
-    APEXMOD_path_dict = self.dirs_and_paths()
-    self.layer = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0]
-    provider = self.layer.dataProvider()
+        self.dlg.textEdit_sm_link_log.append(
+            time+' -> ' + "The top elevation of the .dis file couldn't be read, 'elev_mf' is skipped ...")
+    fields = {name: QgsField(name, QVariant.Int) for name in ('grid_id', 'row', 'col')}
 
-    # Create Elevation field
-    if self.layer.dataProvider().fields().indexFromName("elev_mf") == -1:
-        field = QgsField("elev_mf", QVariant.Double, 'double', 20, 5)
-        provider.addAttributes([field])
-        self.layer.updateFields()
+    for name in list(columns):
+        if provider.fields().indexFromName(name) != -1:
+            del columns[name]
+            time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
+            self.dlg.textEdit_sm_link_log.append(time+' -> ' + "'{}' already exists ...".format(name))
+    write_columns(self.layer, columns, self.dlg.progressBar_step, fields=fields)
 
-        # Get the index numbers of the fields
-        grid_id = self.layer.dataProvider().fields().indexFromName("grid_id")
-        elev_mf = provider.fields().indexFromName("elev_mf")
-
-        # Find .dis file and read number of rows, cols, x spacing, and y spacing (not allowed to change)
-        for filename in glob.glob(str(APEXMOD_path_dict['MODFLOW'])+"/*.dis"):
-            with open(filename, "r") as f:
-                data = []
-                for line in f.readlines():
-                    if not line.startswith("#"):
-                        data.append(line.replace('\n', '').split())
-
-        # Get an elevation list from discretiztion file
-        ii = 5  # Starting line
-        elev_mfs = []
-        while data[ii][0] != "INTERNAL":
-            for jj in range(len(data[ii])):
-                elev_mfs.append(float(data[ii][jj]))
-            ii += 1
-
-        # Get features (Find out a way to change attribute values using another field)
-        tot_feats = self.layer.featureCount()
-        count = 0
-
-        feats = self.layer.getFeatures()
-        self.layer.startEditing()
-        # add row number
-        for f, elev in zip(feats, elev_mfs):
-            self.layer.changeAttributeValue(f.id(), elev_mf, elev)
-            count += 1
-            provalue = round(count/tot_feats*100)
-            self.dlg.progressBar_step.setValue(provalue)
-            QCoreApplication.processEvents()
-        self.layer.commitChanges()
-        QCoreApplication.processEvents()
-    else:
-        time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-        self.dlg.textEdit_sm_link_log.append(time+' -> ' + "'elev_mf' already exists ...")
     time = datetime.now().strftime('[%m/%d/%y %H:%M:%S]')
-    self.dlg.textEdit_sm_link_log.append(time+' -> ' + "Importing 'land surface elevation' ... passed")
+    self.dlg.textEdit_sm_link_log.append(
+        time+' -> ' + "Creating 'grid_id', 'row', 'col' and 'elev_mf' ... passed")
     self.dlg.label_StepStatus.setText('Step Status: ')
     QCoreApplication.processEvents()
 
@@ -397,35 +161,10 @@ def mf_riv1(self):
     input1 = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0]
     provider = input1.dataProvider()
 
-    # Find .dis file and read number of river cells
+    # Find .riv file and match its cells to the grid on row and col
     for filename in glob.glob(str(APEXMOD_path_dict['MODFLOW'])+"/*.riv"):
-        with open(filename, "r") as f:
-            data = []
-            for line in f.readlines():
-                if not line.startswith("#"):
-                    data.append(line.replace('\n', '').split())
-        nRiv = int(data[0][0])
-
-    riv_pac_row = []
-    riv_pac_col = []
-
-    # Skip two lines in Riv package and get row and col
-    for i in range(2, nRiv+2):
-        riv_pac_row.append(int(data[i][1]))
-        riv_pac_col.append(int(data[i][2]))
-
-    #
-    feats = input1.getFeatures()
-    riv_matched = []
-
-    for f in feats:
-        rowNo = f.attribute("row")
-        colNo = f.attribute("col")
-        # rowNo = f.attribute["row"]
-        # colNo = f.attribute["col"]
-        for i in range(len(riv_pac_row)):
-            if ((rowNo == riv_pac_row[i]) and (colNo == riv_pac_col[i])):
-                riv_matched.append(f.id())
+        riv_cells = read_package_cells(filename, 'riv')
+    riv_matched, _ = match_cells(input1, riv_cells)
     input1.selectByIds(riv_matched)
 
     name = "mf_riv1"
@@ -481,42 +220,19 @@ def create_riv_info(self):
     riv_cond = provider.fields().indexFromName("riv_cond")
     riv_bot = provider.fields().indexFromName("riv_bot")
 
-    # Find .riv file and read number of river cells
+    # Find .riv file and match its cells to the features on row and col
     for filename in glob.glob(str(APEXMOD_path_dict['MODFLOW'])+"/*.riv"):
-        with open(filename, "r") as f:
-            data = []
-            for line in f.readlines():
-                if not line.startswith("#"):
-                    data.append(line.replace('\n', '').split())
-        nRiv = int(data[0][0])
-
-    riv_pac_row = []
-    riv_pac_col = []
-    riv_pac_stage = []
-    riv_pac_cond = []
-    riv_pac_bot = []
-
-    # Skip two lines in Riv package and get row and col
-    for i in range(2, nRiv+2):
-        riv_pac_row.append(int(data[i][1]))
-        riv_pac_col.append(int(data[i][2]))
-        riv_pac_stage.append(float(data[i][3]))
-        riv_pac_cond.append(float(data[i][4]))
-        riv_pac_bot.append(float(data[i][5]))
-    #
-    feats = self.layer.getFeatures()
-    self.layer.startEditing()
+        riv_cells = read_package_cells(filename, 'riv')
+    fids, idx = match_cells(self.layer, riv_cells)
 
     # add riv_info based on row and column numbers
-    for f in feats:
-        rowNo = f.attribute("row")
-        colNo = f.attribute("col")
-        for i in range(len(riv_pac_row)):
-            if ((rowNo == riv_pac_row[i]) and (colNo == riv_pac_col[i])):
-                self.layer.changeAttributeValue(f.id(), riv_stage, riv_pac_stage[i])
-                self.layer.changeAttributeValue(f.id(), riv_cond, riv_pac_cond[i])              
-                self.layer.changeAttributeValue(f.id(), riv_bot, riv_pac_bot[i])
-    self.layer.commitChanges()
+    riv_info = riv_cells[idx]
+    changes = {
+        fid: {riv_stage: stage, riv_cond: cond, riv_bot: bot}
+        for fid, stage, cond, bot in zip(
+            fids, riv_info["stage"].tolist(), riv_info["cond"].tolist(), riv_info["rbot"].tolist())}
+    provider.changeAttributeValues(changes)
+    self.layer.triggerRepaint()
     QCoreApplication.processEvents()
 
 # Option 2
@@ -1140,14 +856,11 @@ def export_modflow_obs(self):
 
     info_number = len(grid_ids)
     # Find .dis file and read number of rows, cols, x spacing, and y spacing (not allowed to change)
-    for filename in glob.glob(str(APEXMOD_path_dict['MODFLOW'])+"/*.dis"):
-        with open(filename, "r") as f:
-            data = []
-            for line in f.readlines():
-                if not line.startswith("#"):
-                    data.append(line.replace('\n', '').split())
-        nrows = int(data[0][1])
-        ncols = int(data[0][2])
+    dis = require_dis(str(APEXMOD_path_dict['MODFLOW']))
+    if dis is None:
+        return
+    nrows = dis.nrow
+    ncols = dis.ncol
 
     # Generate row and col number for whole modflow grid
     iy = []
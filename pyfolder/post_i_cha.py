@@ -17,6 +17,7 @@ from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QSlider, QMessageBox
 
 from .apexmod_utils import DefineTime, ObjFns
+from .result_cache import get_cache_dir, read_rch_columns, read_rch_series
 
 
 def read_sub_no(self):
@@ -65,23 +66,12 @@ def read_cha_vars(self):
     self.dlg.comboBox_cha_vars.setCurrentIndex(3)
     return col_lst_
 
-def read_cha_sim_data(self):
+def read_cha_sim_data(self, sub_no, cha_var):
+    """Simulated series of one variable of one subarea from the .RCH file."""
     APEXMOD_path_dict = self.dirs_and_paths()
-    wd = APEXMOD_path_dict['apexmf_model']
-    cha_files = []
-    for filename in glob.glob(str(APEXMOD_path_dict['apexmf_model'])+"/*.RCH"):
-        cha_files.append(os.path.basename(filename))
-    col_lst = read_cha_vars(self)
-    df = pd.read_csv(
-                        os.path.join(wd, cha_files[0]),
-                        delim_whitespace=True,
-                        skiprows=9,
-                        usecols=[x for x in range(len(col_lst))],
-                        header=None)
-    df.columns = col_lst
-    df_ = df.loc[df['RCID'] == 'REACH']
-    df_.set_index('GIS', inplace=True)
-    return df_
+    cha_files = glob.glob(str(APEXMOD_path_dict['apexmf_model'])+"/*.RCH")
+    df = read_rch_series(cha_files[0], int(sub_no), [cha_var], get_cache_dir(self))
+    return df[cha_var]
 
 def read_cha_obd_files(self):
     APEXMOD_path_dict = self.dirs_and_paths()
@@ -102,8 +92,7 @@ def get_cha_sims_obds(self):
     # sims first
     sub_no = self.dlg.comboBox_cha_sub_no.currentText()
     cha_var = self.dlg.comboBox_cha_vars.currentText()
-    cha_df = read_cha_sim_data(self)
-    sims = cha_df.loc[int(sub_no), cha_var]
+    sims = read_cha_sim_data(self, sub_no, cha_var)
     # Based on APEX Time Step condition
     if self.dlg.radioButton_day.isChecked():
         sims.index = pd.date_range(startDate, periods=len(sims))
@@ -150,10 +139,8 @@ def cha_sim_obd_plot(self):
         ax.plot(
                 df.index, df.iloc[:, 1], c='m', lw=1.5, alpha=0.5,
                 label="Observed", zorder=3)
-    nse = ObjFns.nse(sims, obds)
-    rmse = ObjFns.rmse(sims, obds)
-    pbias = ObjFns.pbias(sims, obds)
-    rsq = ObjFns.rsq(sims, obds)
+    stats = ObjFns.evaluate(sims, obds, ('nse', 'rmse', 'pbias', 'rsq'))
+    nse, rmse, pbias, rsq = stats['nse'], stats['rmse'], stats['pbias'], stats['rsq']
     ax.text(
         .01, 0.95, u'Nash–Sutcliffe: '+ "%.4f" % nse,
         fontsize=8,
@@ -194,10 +181,8 @@ def cha_sim_obd_with_scatter(self):
         axes[0].plot(
                 df.index, df.iloc[:, 1], c='m', lw=1.5, alpha=0.5,
                 label="Observed", zorder=3)
-    nse = ObjFns.nse(sims, obds)
-    rmse = ObjFns.rmse(sims, obds)
-    pbias = ObjFns.pbias(sims, obds)
-    rsq = ObjFns.rsq(sims, obds)
+    stats = ObjFns.evaluate(sims, obds, ('nse', 'rmse', 'pbias', 'rsq'))
+    nse, rmse, pbias, rsq = stats['nse'], stats['rmse'], stats['pbias'], stats['rsq']
     axes[0].text(
         .01, 0.95, u'Nash–Sutcliffe: '+ "%.4f" % nse,
         fontsize=8,
@@ -237,8 +222,7 @@ def cha_plot(self):
     sub_no = self.dlg.comboBox_cha_sub_no.currentText()
     cha_var = self.dlg.comboBox_cha_vars.currentText()
 
-    cha_df = read_cha_sim_data(self)
-    df = cha_df.loc[int(sub_no), cha_var]
+    df = read_cha_sim_data(self, sub_no, cha_var)
     fig, ax = plt.subplots(figsize=(9, 4))
     if self.dlg.radioButton_day.isChecked():
         df.index = pd.date_range(startDate, periods=len(df))
@@ -297,8 +281,7 @@ def export_cha(self):
     current_year = self.dlg.horizontalSlider_cha_start_year.value()
     sub_no = self.dlg.comboBox_cha_sub_no.currentText()
     cha_var = self.dlg.comboBox_cha_vars.currentText()
-    cha_df = read_cha_sim_data(self)
-    df = cha_df.loc[int(sub_no), cha_var]
+    df = read_cha_sim_data(self, sub_no, cha_var)
     # Based on APEX Time Step condition
     if self.dlg.radioButton_day.isChecked():
         df.index = pd.date_range(startDate, periods=len(df))
@@ -335,10 +318,8 @@ def export_cha_sims_obds(self):
     APEXMOD_path_dict = self.dirs_and_paths()
     outfolder = APEXMOD_path_dict['exported_files']
     sims, obds, df = get_cha_sims_obds(self)
-    nse = ObjFns.nse(sims, obds)
-    rmse = ObjFns.rmse(sims, obds)
-    pbias = ObjFns.pbias(sims, obds)
-    rsq = ObjFns.rsq(sims, obds)
+    stats = ObjFns.evaluate(sims, obds, ('nse', 'rmse', 'pbias', 'rsq'))
+    nse, rmse, pbias, rsq = stats['nse'], stats['rmse'], stats['pbias'], stats['rsq']
     sub_no = self.dlg.comboBox_cha_sub_no.currentText()
     cha_var = self.dlg.comboBox_cha_vars.currentText()
     cha_time = self.dlg.comboBox_cha_time.currentText()
@@ -390,13 +371,9 @@ def export_sd_daily(self):
                             parse_dates=True,
                             na_values=[-999, ""],
                             delimiter = "\t")
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         sub_ob = self.dlg.comboBox_SD_obs_data.currentText()
 
@@ -415,18 +392,9 @@ def export_sd_daily(self):
             df3 = df2.dropna()
             if (len(df3[sub_ob]) > 1):
 
-                ## R-squared
-                r_squared = (
-                    ((sum((df3[sub_ob] - df3[sub_ob].mean())*(df3[cha_var]-df3[cha_var].mean())))**2)/
-                    ((sum((df3[sub_ob] - df3[sub_ob].mean())**2) * (sum((df3[cha_var]-df3[cha_var].mean())**2))))
-                )
-
-                ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                dNS = 1 - (sum((df3[cha_var] - df3[sub_ob])**2) /
-                    sum((df3[sub_ob] - (df3[sub_ob]).mean())**2))
-
-                ## PBIAS
-                PBIAS = 100*(sum(df3[sub_ob] - df3[cha_var]) / sum(df3[sub_ob]))
+                ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                stats = ObjFns.evaluate(df3[cha_var], df3[sub_ob], ('rsq', 'nse', 'pbias'))
+                r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
 
             # ------------ Export Data to file -------------- #
             msgBox = QMessageBox()
@@ -482,13 +450,9 @@ def export_sd_daily(self):
             msgBox.setText("Running the simulation for a warm-up period!")
             msgBox.exec_()
     else:
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         df = df.loc[df["sub"] == int(outletSubNum)]
         if self.dlg.radioButton_day.isChecked():
@@ -551,13 +515,9 @@ def export_sd_monthly(self):
                                 header = 0,
                                 parse_dates=True,
                                 delimiter = "\t")
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         sub_ob = self.dlg.comboBox_SD_obs_data.currentText()
         try:
@@ -569,17 +529,9 @@ def export_sd_monthly(self):
             df2 = pd.concat([dfm, strObdm[sub_ob]], axis = 1)
             df3 = df2.dropna()
             if (len(df3[sub_ob]) > 1):
-                ## R-squared
-                r_squared = (
-                    ((sum((df3[sub_ob] - df3[sub_ob].mean())*(df3[cha_var]-df3[cha_var].mean())))**2) /
-                    ((sum((df3[sub_ob] - df3[sub_ob].mean())**2)* (sum((df3[cha_var]-df3[cha_var].mean())**2))))
-                )
-                ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                dNS = 1 - (sum((df3[cha_var] - df3[sub_ob])**2) / 
-                    sum((df3[sub_ob] - (df3[sub_ob]).mean())**2))
-
-                ## PBIAS
-                PBIAS = 100*(sum(df3[sub_ob] - df3[cha_var]) / sum(df3[sub_ob]))
+                ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                stats = ObjFns.evaluate(df3[cha_var], df3[sub_ob], ('rsq', 'nse', 'pbias'))
+                r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
             # ------------ Export Data to file -------------- #
             with open(os.path.join(outfolder, "apexmf_reach(" + str(outletSubNum) + ")"+"_ob("+ str(sub_ob)+")_monthly.txt"), 'w') as f:
                 f.write("# apexmf_reach(" + str(outletSubNum) + ")"+"_ob("+ str(sub_ob)
@@ -605,13 +557,9 @@ def export_sd_monthly(self):
             msgBox.setText("Running the simulation for a warm-up period!")
             msgBox.exec_()
     else:
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         try:
             df = df.loc[df["sub"] == int(outletSubNum)]
@@ -671,13 +619,9 @@ def export_sd_mTa(self):
                                 parse_dates=True,
                                 delimiter = "\t")
 
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         
         sub_ob = self.dlg.comboBox_SD_obs_data.currentText()
 
@@ -692,23 +636,9 @@ def export_sd_mTa(self):
 
             if (len(df3[sub_ob]) > 1):
 
-                ## R-squared
-                r_squared = (
-                    (
-                        (sum((df3[sub_ob] - df3[sub_ob].mean())*(df3[cha_var]-df3[cha_var].mean())))**2
-                    ) 
-                    /
-                    (
-                        (sum((df3[sub_ob] - df3[sub_ob].mean())**2)* (sum((df3[cha_var]-df3[cha_var].mean())**2))
-                    ))
-                )
-
-                ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                dNS = 1 - (sum((df3[cha_var] - df3[sub_ob])**2) / 
-                    sum((df3[sub_ob] - (df3[sub_ob]).mean())**2))
-
-                ## PBIAS
-                PBIAS = 100*(sum(df3[sub_ob] - df3[cha_var]) / sum(df3[sub_ob]))
+                ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                stats = ObjFns.evaluate(df3[cha_var], df3[sub_ob], ('rsq', 'nse', 'pbias'))
+                r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
 
             # ------------ Export Data to file -------------- #
             with open(os.path.join(outfolder, "apexmf_reach(" + str(outletSubNum) + ")"+"_ob("+ str(sub_ob)+")_annual.txt"), 'w') as f:
@@ -735,13 +665,9 @@ def export_sd_mTa(self):
             msgBox.setText("Running the simulation for a warm-up period!")
             msgBox.exec_()
     else:
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         try:
             df = output_cha.loc[outletSubNum]
             df.index = pd.date_range(startDate, periods=len(df[cha_var]), freq = "M")
@@ -799,13 +725,9 @@ def export_sd_annual(self):
                                 parse_dates=True,
                                 delimiter = "\t")
 
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         sub_ob = self.dlg.comboBox_SD_obs_data.currentText()
 
@@ -819,23 +741,9 @@ def export_sd_annual(self):
             df3 = df2.dropna()
 
             if (len(df3[sub_ob]) > 1):
-                ## R-squared
-                r_squared = (
-                    (
-                        (sum((df3[sub_ob] - df3[sub_ob].mean())*(df3[cha_var]-df3[cha_var].mean())))**2
-                    ) 
-                    /
-                    (
-                        (sum((df3[sub_ob] - df3[sub_ob].mean())**2)* (sum((df3[cha_var]-df3[cha_var].mean())**2))
-                    ))
-                )
-
-                ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                dNS = 1 - (sum((df3[cha_var] - df3[sub_ob])**2) / 
-                    sum((df3[sub_ob] - (df3[sub_ob]).mean())**2))
-
-                ## PBIAS
-                PBIAS =  100*(sum(df3[sub_ob] - df3[cha_var]) / sum(df3[sub_ob]))
+                ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                stats = ObjFns.evaluate(df3[cha_var], df3[sub_ob], ('rsq', 'nse', 'pbias'))
+                r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
 
             # ------------ Export Data to file -------------- #
             with open(os.path.join(outfolder, "apexmf_reach(" + str(outletSubNum) + ")"+"_ob("+ str(sub_ob)+")_annual.txt"), 'w') as f:
@@ -862,13 +770,9 @@ def export_sd_annual(self):
             msgBox.setText("Running the simulation for a warm-up period!")
             msgBox.exec_()
     else:
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         try:
             df = df.loc[df["sub"] == int(outletSubNum)]
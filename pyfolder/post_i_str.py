@@ -14,6 +14,8 @@ from datetime import datetime
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtWidgets import QSlider, QMessageBox
+from .apexmod_utils import ObjFns
+from .result_cache import get_cache_dir, read_rch_columns, read_rch_series
 
 
 def read_sub_no(self):
@@ -64,25 +66,12 @@ def read_cha_vars(self):
     return col_lst_
 
 
-def read_cha_sim_data(self):
+def read_cha_sim_data(self, sub_no, cha_var):
+    """Simulated series of one variable of one subarea from the .RCH file."""
     APEXMOD_path_dict = self.dirs_and_paths()
-    wd = APEXMOD_path_dict['apexmf_model']
-    cha_files = []
-    for filename in glob.glob(str(APEXMOD_path_dict['apexmf_model'])+"/*.RCH"):
-        cha_files.append(os.path.basename(filename))
-    
-    col_lst = read_cha_vars(self)
-
-    df = pd.read_csv(
-                        os.path.join(wd, cha_files[0]),
-                        delim_whitespace=True,
-                        skiprows=9,
-                        usecols=[x for x in range(len(col_lst))],
-                        header=None)
-    df.columns = col_lst
-    df_ = df.loc[df['RCID']=='REACH']
-    df_.set_index('GIS', inplace=True)
-    return df_
+    cha_files = glob.glob(str(APEXMOD_path_dict['apexmf_model'])+"/*.RCH")
+    df = read_rch_series(cha_files[0], int(sub_no), [cha_var], get_cache_dir(self))
+    return df[cha_var]
 
 
 def read_cha_obd_files(self):
@@ -202,11 +191,7 @@ def reach_plot(self):
     sub_no = self.dlg.comboBox_sub_number.currentText()
     cha_var = self.dlg.comboBox_cha_vars.currentText()
 
-    cha_df = read_cha_sim_data(self)
-
-
-
-    df = cha_df.loc[int(sub_no), cha_var]
+    df = read_cha_sim_data(self, sub_no, cha_var)
 
     if self.dlg.radioButton_day.isChecked():
         df.index = pd.date_range(startDate, periods=len(df))
@@ -265,13 +250,9 @@ def sd_plot_daily(self):
                             delimiter="\t",
                             na_values=[-999, ""],
                             )
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         sub_ob = self.dlg.comboBox_SD_obs_data.currentText()
 
@@ -301,19 +282,9 @@ def sd_plot_daily(self):
                         label="Observed", zorder=3)
             ax.xaxis.set_major_formatter(mdates.DateFormatter('%b-%d\n%Y'))
             if (len(df3[sub_ob]) > 1):
-                ## R-squared
-                r_squared = (
-                    ((sum((df3[sub_ob] - df3[sub_ob].mean())*(df3[cha_var]-df3[cha_var].mean())))**2)/
-                    ((sum((df3[sub_ob] - df3[sub_ob].mean())**2)* (sum((df3[cha_var]-df3[cha_var].mean())**2))))
-                )
-                ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                dNS = 1 - (
-                    sum((df3[cha_var] - df3[sub_ob])**2) / 
-                    sum((df3[sub_ob] - (df3[sub_ob]).mean())**2)
-                    )
-
-                ## PBIAS
-                PBIAS =  100*(sum(df3[sub_ob] - df3[cha_var]) / sum(df3[sub_ob]))
+                ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                stats = ObjFns.evaluate(df3[cha_var], df3[sub_ob], ('rsq', 'nse', 'pbias'))
+                r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
                 ax.text(
                     .01, 0.95, u'Nash–Sutcliffe: '+ "%.4f" % dNS,
                     fontsize=8,
@@ -358,13 +329,9 @@ def sd_plot_daily(self):
                     )
                     # color = colors[i%4])
     else:
-        output_cha = pd.read_csv(
-                                os.path.join(wd, cha_file),
-                                delim_whitespace=True,
-                                skiprows=9,
-                                usecols=[0, 1, colNum],
-                                names=["idx", "sub", cha_var],
-                                index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         try:
             df = df.loc[df["sub"] == int(outletSubNum)]
@@ -431,13 +398,9 @@ def sd_plot_monthly(self):
                             delimiter = "\t",
                             na_values=[-999, ""],
                             )
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         sub_ob = self.dlg.comboBox_SD_obs_data.currentText()
         
@@ -462,22 +425,9 @@ def sd_plot_monthly(self):
             ax.xaxis.set_major_formatter(mdates.DateFormatter('%b-%d\n%Y'))
     
             if (len(df3[sub_ob]) > 1):
-                ## R-squared
-                r_squared = (
-                    (
-                        (sum((df3[sub_ob] - df3[sub_ob].mean())*(df3[cha_var]-df3[cha_var].mean())))**2
-                    ) 
-                    /
-                    (
-                        (sum((df3[sub_ob] - df3[sub_ob].mean())**2)* (sum((df3[cha_var]-df3[cha_var].mean())**2))
-                    ))
-                )
-                ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                dNS = 1 - (sum((df3[cha_var] - df3[sub_ob])**2) / 
-                    sum((df3[sub_ob] - (df3[sub_ob]).mean())**2))
-
-                ## PBIAS
-                PBIAS =  100*(sum(df3[sub_ob] - df3[cha_var]) / sum(df3[sub_ob]))
+                ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                stats = ObjFns.evaluate(df3[cha_var], df3[sub_ob], ('rsq', 'nse', 'pbias'))
+                r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
                 ax.text(.01, 0.95, u'Nash–Sutcliffe: '+ "%.4f" % dNS,
                     fontsize = 8,
                     horizontalalignment='left',
@@ -517,13 +467,9 @@ def sd_plot_monthly(self):
                     transform=ax.transAxes,)
                     # color = colors[i%4])
     else:
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         try:
             df = df.loc[df["sub"] == int(outletSubNum)]
@@ -579,13 +525,9 @@ def sd_plot_annual(self):
                                 na_values=[-999, ""],
                                 delimiter = "\t")
 
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         sub_ob = self.dlg.comboBox_SD_obs_data.currentText()
 
@@ -611,23 +553,9 @@ def sd_plot_annual(self):
     
             if (len(df3[sub_ob]) > 1):
 
-                ## R-squared
-                r_squared = (
-                    (
-                        (sum((df3[sub_ob] - df3[sub_ob].mean())*(df3[cha_var]-df3[cha_var].mean())))**2
-                    ) 
-                    /
-                    (
-                        (sum((df3[sub_ob] - df3[sub_ob].mean())**2)* (sum((df3[cha_var]-df3[cha_var].mean())**2))
-                    ))
-                )
-
-                ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                dNS = 1 - (sum((df3[cha_var] - df3[sub_ob])**2) / 
-                    sum((df3[sub_ob] - (df3[sub_ob]).mean())**2))
-
-                ## PBIAS
-                PBIAS =  100*(sum(df3[sub_ob] - df3[cha_var]) / sum(df3[sub_ob]))
+                ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                stats = ObjFns.evaluate(df3[cha_var], df3[sub_ob], ('rsq', 'nse', 'pbias'))
+                r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
 
                 ax.text(
                     .01, 0.95, u'Nash–Sutcliffe: '+ "%.4f" % dNS,
@@ -680,13 +608,9 @@ def sd_plot_annual(self):
                     transform=ax.transAxes,)
                     # color = colors[i%4])
     else:
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
 
         try:
@@ -743,13 +667,9 @@ def sd_plot_month_to_year(self):
                             parse_dates=True,
                             na_values=[-999, ""],
                             delimiter = "\t")
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         sub_ob = self.dlg.comboBox_SD_obs_data.currentText()
         # sub_ob = 'sub_58'
@@ -773,22 +693,9 @@ def sd_plot_month_to_year(self):
                         label="Observed", zorder=3)
             ax.xaxis.set_major_formatter(mdates.DateFormatter('%b-%d\n%Y'))
             if (len(df3[sub_ob]) > 1):
-                ## R-squared
-                r_squared = (
-                    (
-                        (sum((df3[sub_ob] - df3[sub_ob].mean())*(df3[cha_var]-df3[cha_var].mean())))**2
-                    ) 
-                    /
-                    (
-                        (sum((df3[sub_ob] - df3[sub_ob].mean())**2)* (sum((df3[cha_var]-df3[cha_var].mean())**2))
-                    ))
-                )
-                ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                dNS = 1 - (sum((df3[cha_var] - df3[sub_ob])**2) / 
-                    sum((df3[sub_ob] - (df3[sub_ob]).mean())**2))
-
-                ## PBIAS
-                PBIAS =  100*(sum(df3[sub_ob] - df3[cha_var]) / sum(df3[sub_ob]))
+                ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                stats = ObjFns.evaluate(df3[cha_var], df3[sub_ob], ('rsq', 'nse', 'pbias'))
+                r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
                 ax.text(
                     .01, 0.95, u'Nash–Sutcliffe: '+ "%.4f" % dNS,
                     fontsize = 8,
@@ -838,13 +745,9 @@ def sd_plot_month_to_year(self):
                     transform=ax.transAxes,)
                     # color = colors[i%4])
     else:
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
 
         try:
@@ -900,13 +803,9 @@ def export_sd_daily(self):
                             parse_dates=True,
                             na_values=[-999, ""],
                             delimiter = "\t")
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         sub_ob = self.dlg.comboBox_SD_obs_data.currentText()
 
@@ -925,18 +824,9 @@ def export_sd_daily(self):
             df3 = df2.dropna()
             if (len(df3[sub_ob]) > 1):
 
-                ## R-squared
-                r_squared = (
-                    ((sum((df3[sub_ob] - df3[sub_ob].mean())*(df3[cha_var]-df3[cha_var].mean())))**2)/
-                    ((sum((df3[sub_ob] - df3[sub_ob].mean())**2) * (sum((df3[cha_var]-df3[cha_var].mean())**2))))
-                )
-
-                ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                dNS = 1 - (sum((df3[cha_var] - df3[sub_ob])**2) /
-                    sum((df3[sub_ob] - (df3[sub_ob]).mean())**2))
-
-                ## PBIAS
-                PBIAS = 100*(sum(df3[sub_ob] - df3[cha_var]) / sum(df3[sub_ob]))
+                ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                stats = ObjFns.evaluate(df3[cha_var], df3[sub_ob], ('rsq', 'nse', 'pbias'))
+                r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
 
             # ------------ Export Data to file -------------- #
             msgBox = QMessageBox()
@@ -992,13 +882,9 @@ def export_sd_daily(self):
             msgBox.setText("Running the simulation for a warm-up period!")
             msgBox.exec_()
     else:
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         df = df.loc[df["sub"] == int(outletSubNum)]
         if self.dlg.radioButton_day.isChecked():
@@ -1061,13 +947,9 @@ def export_sd_monthly(self):
                                 header = 0,
                                 parse_dates=True,
                                 delimiter = "\t")
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         sub_ob = self.dlg.comboBox_SD_obs_data.currentText()
         try:
@@ -1079,17 +961,9 @@ def export_sd_monthly(self):
             df2 = pd.concat([dfm, strObdm[sub_ob]], axis = 1)
             df3 = df2.dropna()
             if (len(df3[sub_ob]) > 1):
-                ## R-squared
-                r_squared = (
-                    ((sum((df3[sub_ob] - df3[sub_ob].mean())*(df3[cha_var]-df3[cha_var].mean())))**2) /
-                    ((sum((df3[sub_ob] - df3[sub_ob].mean())**2)* (sum((df3[cha_var]-df3[cha_var].mean())**2))))
-                )
-                ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                dNS = 1 - (sum((df3[cha_var] - df3[sub_ob])**2) / 
-                    sum((df3[sub_ob] - (df3[sub_ob]).mean())**2))
-
-                ## PBIAS
-                PBIAS = 100*(sum(df3[sub_ob] - df3[cha_var]) / sum(df3[sub_ob]))
+                ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                stats = ObjFns.evaluate(df3[cha_var], df3[sub_ob], ('rsq', 'nse', 'pbias'))
+                r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
             # ------------ Export Data to file -------------- #
             with open(os.path.join(outfolder, "apexmf_reach(" + str(outletSubNum) + ")"+"_ob("+ str(sub_ob)+")_monthly.txt"), 'w') as f:
                 f.write("# apexmf_reach(" + str(outletSubNum) + ")"+"_ob("+ str(sub_ob)
@@ -1115,13 +989,9 @@ def export_sd_monthly(self):
             msgBox.setText("Running the simulation for a warm-up period!")
             msgBox.exec_()
     else:
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         try:
             df = df.loc[df["sub"] == int(outletSubNum)]
@@ -1181,13 +1051,9 @@ def export_sd_mTa(self):
                                 parse_dates=True,
                                 delimiter = "\t")
 
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         
         sub_ob = self.dlg.comboBox_SD_obs_data.currentText()
 
@@ -1202,23 +1068,9 @@ def export_sd_mTa(self):
 
             if (len(df3[sub_ob]) > 1):
 
-                ## R-squared
-                r_squared = (
-                    (
-                        (sum((df3[sub_ob] - df3[sub_ob].mean())*(df3[cha_var]-df3[cha_var].mean())))**2
-                    ) 
-                    /
-                    (
-                        (sum((df3[sub_ob] - df3[sub_ob].mean())**2)* (sum((df3[cha_var]-df3[cha_var].mean())**2))
-                    ))
-                )
-
-                ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                dNS = 1 - (sum((df3[cha_var] - df3[sub_ob])**2) / 
-                    sum((df3[sub_ob] - (df3[sub_ob]).mean())**2))
-
-                ## PBIAS
-                PBIAS = 100*(sum(df3[sub_ob] - df3[cha_var]) / sum(df3[sub_ob]))
+                ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                stats = ObjFns.evaluate(df3[cha_var], df3[sub_ob], ('rsq', 'nse', 'pbias'))
+                r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
 
             # ------------ Export Data to file -------------- #
             with open(os.path.join(outfolder, "apexmf_reach(" + str(outletSubNum) + ")"+"_ob("+ str(sub_ob)+")_annual.txt"), 'w') as f:
@@ -1245,13 +1097,9 @@ def export_sd_mTa(self):
             msgBox.setText("Running the simulation for a warm-up period!")
             msgBox.exec_()
     else:
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         try:
             df = output_cha.loc[outletSubNum]
             df.index = pd.date_range(startDate, periods=len(df[cha_var]), freq = "M")
@@ -1309,13 +1157,9 @@ def export_sd_annual(self):
                                 parse_dates=True,
                                 delimiter = "\t")
 
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         sub_ob = self.dlg.comboBox_SD_obs_data.currentText()
 
@@ -1329,23 +1173,9 @@ def export_sd_annual(self):
             df3 = df2.dropna()
 
             if (len(df3[sub_ob]) > 1):
-                ## R-squared
-                r_squared = (
-                    (
-                        (sum((df3[sub_ob] - df3[sub_ob].mean())*(df3[cha_var]-df3[cha_var].mean())))**2
-                    ) 
-                    /
-                    (
-                        (sum((df3[sub_ob] - df3[sub_ob].mean())**2)* (sum((df3[cha_var]-df3[cha_var].mean())**2))
-                    ))
-                )
-
-                ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                dNS = 1 - (sum((df3[cha_var] - df3[sub_ob])**2) / 
-                    sum((df3[sub_ob] - (df3[sub_ob]).mean())**2))
-
-                ## PBIAS
-                PBIAS =  100*(sum(df3[sub_ob] - df3[cha_var]) / sum(df3[sub_ob]))
+                ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                stats = ObjFns.evaluate(df3[cha_var], df3[sub_ob], ('rsq', 'nse', 'pbias'))
+                r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
 
             # ------------ Export Data to file -------------- #
             with open(os.path.join(outfolder, "apexmf_reach(" + str(outletSubNum) + ")"+"_ob("+ str(sub_ob)+")_annual.txt"), 'w') as f:
@@ -1372,13 +1202,9 @@ def export_sd_annual(self):
             msgBox.setText("Running the simulation for a warm-up period!")
             msgBox.exec_()
     else:
-        output_cha = pd.read_csv(
-                            os.path.join(wd, cha_file),
-                            delim_whitespace=True,
-                            skiprows=9,
-                            usecols=[0, 1, colNum],
-                            names=["idx", "sub", cha_var],
-                            index_col=0)
+        output_cha = read_rch_columns(
+                            os.path.join(wd, cha_file), colNum, cha_var, get_cache_dir(self),
+                            sub=outletSubNum)
         df = output_cha.loc["REACH"]
         try:
             df = df.loc[df["sub"] == int(outletSubNum)]
@@ -11,6 +11,9 @@ import os
 from matplotlib import style
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QMessageBox
+from .apexmod_utils import ObjFns
+from .result_cache import get_cache_dir, read_obs_head
+from .wt_export import export_all
 
 # try:
 #     import deps.pandas as pd
@@ -114,11 +117,8 @@ def wt_plot_daily(self):
                             parse_dates=True,
                             na_values=[-999, ""],
                             delimiter="\t")
-        output_wt = pd.read_csv(
-                            os.path.join(wd, "amf_MODFLOW_obs_head"),
-                            delim_whitespace=True,
-                            skiprows = 1,
-                            names = grid_id_lst,)
+        output_wt = read_obs_head(
+                            os.path.join(wd, "amf_MODFLOW_obs_head"), grid_id_lst, get_cache_dir(self))
         
         # get observed watertable
         wt_ob = self.dlg.comboBox_wt_obs_data.currentText()
@@ -155,22 +155,9 @@ def wt_plot_daily(self):
         ax.xaxis.set_major_formatter(mdates.DateFormatter('%b-%d\n%Y'))
 
         if (len(df3[wt_ob]) > 1):
-            ## R-squared
-            r_squared = (
-                (
-                    (sum((df3[wt_ob] - df3[wt_ob].mean())*(df3[grid_id]-df3[grid_id].mean())))**2
-                ) 
-                /
-                (
-                    (sum((df3[wt_ob] - df3[wt_ob].mean())**2)* (sum((df3[grid_id]-df3[grid_id].mean())**2))
-                ))
-            )
-            ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-            dNS = 1 - (
-                sum((df3[grid_id] - df3[wt_ob])**2) /
-                sum((df3[wt_ob] - (df3[wt_ob]).mean())**2))
-            ## PBIAS
-            PBIAS =  100*(sum(df3[wt_ob] - df3[grid_id]) / sum(df3[wt_ob]))
+            ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+            stats = ObjFns.evaluate(df3[grid_id], df3[wt_ob], ('rsq', 'nse', 'pbias'))
+            r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
             ####
             ax.text(
                 .01, 0.95, u'Nash–Sutcliffe: '+ "%.4f" % dNS,
@@ -210,11 +197,8 @@ def wt_plot_daily(self):
                 transform=ax.transAxes)
 
     else:
-        output_wt = pd.read_csv(
-                            os.path.join(wd, "amf_MODFLOW_obs_head"),
-                            delim_whitespace=True,
-                            skiprows = 1,
-                            names = grid_id_lst,)
+        output_wt = read_obs_head(
+                            os.path.join(wd, "amf_MODFLOW_obs_head"), grid_id_lst, get_cache_dir(self))
         # try:
         if self.dlg.checkBox_depthTowater.isChecked():
             # Calculate depth to water (Simulated watertable - landsurface)
@@ -278,10 +262,8 @@ def wt_plot_monthly(self):
                                 parse_dates=True,
                                 delimiter = "\t")
 
-        output_wt = pd.read_csv(os.path.join(wd, "amf_MODFLOW_obs_head"),
-                           delim_whitespace=True,
-                           skiprows = 1,
-                           names = grid_id_lst,)
+        output_wt = read_obs_head(
+                            os.path.join(wd, "amf_MODFLOW_obs_head"), grid_id_lst, get_cache_dir(self))
         
         # get observed watertable
         wt_ob = self.dlg.comboBox_wt_obs_data.currentText()
@@ -322,23 +304,9 @@ def wt_plot_monthly(self):
 
             if (len(df3[wt_ob]) > 1):
 
-                ## R-squared
-                r_squared = (
-                    (
-                        (sum((df3[wt_ob] - df3[wt_ob].mean())*(df3[grid_id]-df3[grid_id].mean())))**2
-                    ) 
-                    /
-                    (
-                        (sum((df3[wt_ob] - df3[wt_ob].mean())**2)* (sum((df3[grid_id]-df3[grid_id].mean())**2))
-                    ))
-                )
-
-                ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                dNS = 1 - (sum((df3[grid_id] - df3[wt_ob])**2) / 
-                    sum((df3[wt_ob] - (df3[wt_ob]).mean())**2))
-
-                ## PBIAS
-                PBIAS =  100*(sum(df3[wt_ob] - df3[grid_id]) / sum(df3[wt_ob]))
+                ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                stats = ObjFns.evaluate(df3[grid_id], df3[wt_ob], ('rsq', 'nse', 'pbias'))
+                r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
 
                 ####
                 ax.text(.01, 0.95, u'Nash–Sutcliffe: '+ "%.4f" % dNS,
@@ -386,10 +354,8 @@ def wt_plot_monthly(self):
                     transform=ax.transAxes,)
                     # color = colors[i%4])
     else:
-        output_wt = pd.read_csv(os.path.join(wd, "amf_MODFLOW_obs_head"),
-                           delim_whitespace=True,
-                           skiprows = 1,
-                           names = grid_id_lst,)
+        output_wt = read_obs_head(
+                            os.path.join(wd, "amf_MODFLOW_obs_head"), grid_id_lst, get_cache_dir(self))
 
         try:
             if self.dlg.checkBox_depthTowater.isChecked():
@@ -457,10 +423,8 @@ def wt_plot_annual(self):
                                 parse_dates=True,
                                 delimiter = "\t")
 
-        output_wt = pd.read_csv(os.path.join(wd, "amf_MODFLOW_obs_head"),
-                           delim_whitespace=True,
-                           skiprows = 1,
-                           names = grid_id_lst,)
+        output_wt = read_obs_head(
+                            os.path.join(wd, "amf_MODFLOW_obs_head"), grid_id_lst, get_cache_dir(self))
         
         # get observed watertable
         wt_ob = self.dlg.comboBox_wt_obs_data.currentText()
@@ -501,23 +465,9 @@ def wt_plot_annual(self):
 
             if (len(df3[wt_ob]) > 1):
 
-                ## R-squared
-                r_squared = (
-                    (
-                        (sum((df3[wt_ob] - df3[wt_ob].mean())*(df3[grid_id]-df3[grid_id].mean())))**2
-                    ) 
-                    /
-                    (
-                        (sum((df3[wt_ob] - df3[wt_ob].mean())**2)* (sum((df3[grid_id]-df3[grid_id].mean())**2))
-                    ))
-                )
-
-                ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                dNS = 1 - (sum((df3[grid_id] - df3[wt_ob])**2) / 
-                    sum((df3[wt_ob] - (df3[wt_ob]).mean())**2))
-
-                ## PBIAS
-                PBIAS =  100*(sum(df3[wt_ob] - df3[grid_id]) / sum(df3[wt_ob]))
+                ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                stats = ObjFns.evaluate(df3[grid_id], df3[wt_ob], ('rsq', 'nse', 'pbias'))
+                r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
 
                 ####
                 ax.text(.01, 0.95, u'Nash–Sutcliffe: '+ "%.4f" % dNS,
@@ -565,10 +515,8 @@ def wt_plot_annual(self):
                     transform=ax.transAxes,)
                     # color = colors[i%4])
     else:
-        output_wt = pd.read_csv(os.path.join(wd, "amf_MODFLOW_obs_head"),
-                           delim_whitespace=True,
-                           skiprows = 1,
-                           names = grid_id_lst,)
+        output_wt = read_obs_head(
+                            os.path.join(wd, "amf_MODFLOW_obs_head"), grid_id_lst, get_cache_dir(self))
 
         try:
             if self.dlg.checkBox_depthTowater.isChecked():
@@ -642,11 +590,8 @@ def export_wt_daily(self):
                                 parse_dates=True,
                                 delimiter = "\t")
 
-        output_wt = pd.read_csv(
-                                os.path.join(wd, "amf_MODFLOW_obs_head"),
-                                delim_whitespace=True,
-                                skiprows = 1,
-                                names = grid_id_lst,)
+        output_wt = read_obs_head(
+                            os.path.join(wd, "amf_MODFLOW_obs_head"), grid_id_lst, get_cache_dir(self))
 
         # get observed watertable
         wt_ob = self.dlg.comboBox_wt_obs_data.currentText()
@@ -662,23 +607,9 @@ def export_wt_daily(self):
 
                 if (len(df3[wt_ob]) > 1):
 
-                    ## R-squared
-                    r_squared = (
-                        (
-                            (sum((df3[wt_ob] - df3[wt_ob].mean())*(df3[grid_id]-df3[grid_id].mean())))**2
-                        ) 
-                        /
-                        (
-                            (sum((df3[wt_ob] - df3[wt_ob].mean())**2)* (sum((df3[grid_id]-df3[grid_id].mean())**2))
-                        ))
-                    )
-
-                    ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                    dNS = 1 - (sum((df3[grid_id] - df3[wt_ob])**2) / 
-                        sum((df3[wt_ob] - (df3[wt_ob]).mean())**2))
-
-                    ## PBIAS
-                    PBIAS =  100*(sum(df3[wt_ob] - df3[grid_id]) / sum(df3[wt_ob]))
+                    ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                    stats = ObjFns.evaluate(df3[grid_id], df3[wt_ob], ('rsq', 'nse', 'pbias'))
+                    r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
 
                     # ------------ Export Data to file -------------- #
                     with open(
@@ -710,23 +641,9 @@ def export_wt_daily(self):
 
                 if (len(df3[wt_ob]) > 1):
 
-                    ## R-squared
-                    r_squared = (
-                        (
-                            (sum((df3[wt_ob] - df3[wt_ob].mean())*(df3[grid_id]-df3[grid_id].mean())))**2
-                        ) 
-                        /
-                        (
-                            (sum((df3[wt_ob] - df3[wt_ob].mean())**2)* (sum((df3[grid_id]-df3[grid_id].mean())**2))
-                        ))
-                    )
-
-                    ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                    dNS = 1 - (sum((df3[grid_id] - df3[wt_ob])**2) / 
-                        sum((df3[wt_ob] - (df3[wt_ob]).mean())**2))
-
-                    ## PBIAS
-                    PBIAS =  100*(sum(df3[wt_ob] - df3[grid_id]) / sum(df3[wt_ob]))
+                    ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                    stats = ObjFns.evaluate(df3[grid_id], df3[wt_ob], ('rsq', 'nse', 'pbias'))
+                    r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
 
                     # ------------ Export Data to file -------------- #
                     with open(os.path.join(outfolder, "apexmf_grid_id(" + str(grid_id) + ")"+
@@ -755,11 +672,8 @@ def export_wt_daily(self):
             msgBox.exec_()
 
     else:
-        output_wt = pd.read_csv(
-                            os.path.join(wd, "amf_MODFLOW_obs_head"),
-                            delim_whitespace=True,
-                            skiprows = 1,
-                            names = grid_id_lst,)
+        output_wt = read_obs_head(
+                            os.path.join(wd, "amf_MODFLOW_obs_head"), grid_id_lst, get_cache_dir(self))
 
         try:
             if self.dlg.checkBox_depthTowater.isChecked():
@@ -848,10 +762,8 @@ def export_wt_monthly(self):
                                 parse_dates=True,
                                 delimiter = "\t")
 
-        output_wt = pd.read_csv(os.path.join(wd, "amf_MODFLOW_obs_head"),
-                           delim_whitespace=True,
-                           skiprows = 1,
-                           names = grid_id_lst,)
+        output_wt = read_obs_head(
+                            os.path.join(wd, "amf_MODFLOW_obs_head"), grid_id_lst, get_cache_dir(self))
         
         # get observed watertable
         wt_ob = self.dlg.comboBox_wt_obs_data.currentText()
@@ -869,23 +781,9 @@ def export_wt_monthly(self):
 
                 if (len(df3[wt_ob]) > 1):
 
-                    ## R-squared
-                    r_squared = (
-                        (
-                            (sum((df3[wt_ob] - df3[wt_ob].mean())*(df3[grid_id]-df3[grid_id].mean())))**2
-                        ) 
-                        /
-                        (
-                            (sum((df3[wt_ob] - df3[wt_ob].mean())**2)* (sum((df3[grid_id]-df3[grid_id].mean())**2))
-                        ))
-                    )
-
-                    ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                    dNS = 1 - (sum((df3[grid_id] - df3[wt_ob])**2) / 
-                        sum((df3[wt_ob] - (df3[wt_ob]).mean())**2))
-
-                    ## PBIAS
-                    PBIAS =  100*(sum(df3[wt_ob] - df3[grid_id]) / sum(df3[wt_ob]))
+                    ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                    stats = ObjFns.evaluate(df3[grid_id], df3[wt_ob], ('rsq', 'nse', 'pbias'))
+                    r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
                 # ------------ Export Data to file -------------- #
                 with open(os.path.join(outfolder, "apexmf_grid_id(" + str(grid_id) + ")"+
                     "_ob("+ str(wt_ob)+")_m_dtw.txt"), 'w') as f:
@@ -915,23 +813,9 @@ def export_wt_monthly(self):
 
                 if (len(df3[wt_ob]) > 1):
 
-                    ## R-squared
-                    r_squared = (
-                        (
-                            (sum((df3[wt_ob] - df3[wt_ob].mean())*(df3[grid_id]-df3[grid_id].mean())))**2
-                        ) 
-                        /
-                        (
-                            (sum((df3[wt_ob] - df3[wt_ob].mean())**2)* (sum((df3[grid_id]-df3[grid_id].mean())**2))
-                        ))
-                    )
-
-                    ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                    dNS = 1 - (sum((df3[grid_id] - df3[wt_ob])**2) / 
-                        sum((df3[wt_ob] - (df3[wt_ob]).mean())**2))
-
-                    ## PBIAS
-                    PBIAS =  100*(sum(df3[wt_ob] - df3[grid_id]) / sum(df3[wt_ob]))
+                    ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                    stats = ObjFns.evaluate(df3[grid_id], df3[wt_ob], ('rsq', 'nse', 'pbias'))
+                    r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
 
                 # ------------ Export Data to file -------------- #
                 with open(os.path.join(outfolder, "apexmf_grid_id(" + str(grid_id) + ")"+
@@ -960,11 +844,8 @@ def export_wt_monthly(self):
             msgBox.exec_()
 
     else:
-        output_wt = pd.read_csv(
-                            os.path.join(wd, "amf_MODFLOW_obs_head"),
-                            delim_whitespace=True,
-                            skiprows = 1,
-                            names = grid_id_lst,)
+        output_wt = read_obs_head(
+                            os.path.join(wd, "amf_MODFLOW_obs_head"), grid_id_lst, get_cache_dir(self))
 
         try:
             if self.dlg.checkBox_depthTowater.isChecked():
@@ -1052,10 +933,8 @@ def export_wt_annual(self):
                                 # delimiter = "\t"
                                 )
 
-        output_wt = pd.read_csv(os.path.join(wd, "amf_MODFLOW_obs_head"),
-                           delim_whitespace=True,
-                           skiprows = 1,
-                           names = grid_id_lst,)
+        output_wt = read_obs_head(
+                            os.path.join(wd, "amf_MODFLOW_obs_head"), grid_id_lst, get_cache_dir(self))
         
         # get observed watertable
         wt_ob = self.dlg.comboBox_wt_obs_data.currentText()
@@ -1073,23 +952,9 @@ def export_wt_annual(self):
 
                 if (len(df3[wt_ob]) > 1):
 
-                    ## R-squared
-                    r_squared = (
-                        (
-                            (sum((df3[wt_ob] - df3[wt_ob].mean())*(df3[grid_id]-df3[grid_id].mean())))**2
-                        ) 
-                        /
-                        (
-                            (sum((df3[wt_ob] - df3[wt_ob].mean())**2)* (sum((df3[grid_id]-df3[grid_id].mean())**2))
-                        ))
-                    )
-
-                    ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                    dNS = 1 - (sum((df3[grid_id] - df3[wt_ob])**2) / 
-                        sum((df3[wt_ob] - (df3[wt_ob]).mean())**2))
-
-                    ## PBIAS
-                    PBIAS =  100*(sum(df3[wt_ob] - df3[grid_id]) / sum(df3[wt_ob]))
+                    ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                    stats = ObjFns.evaluate(df3[grid_id], df3[wt_ob], ('rsq', 'nse', 'pbias'))
+                    r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
 
 
                 # ------------ Export Data to file -------------- #
@@ -1121,23 +986,9 @@ def export_wt_annual(self):
 
                 if (len(df3[wt_ob]) > 1):
 
-                    ## R-squared
-                    r_squared = (
-                        (
-                            (sum((df3[wt_ob] - df3[wt_ob].mean())*(df3[grid_id]-df3[grid_id].mean())))**2
-                        ) 
-                        /
-                        (
-                            (sum((df3[wt_ob] - df3[wt_ob].mean())**2)* (sum((df3[grid_id]-df3[grid_id].mean())**2))
-                        ))
-                    )
-
-                    ##Nash–Sutcliffe (E) model efficiency coefficient ---used up in the class
-                    dNS = 1 - (sum((df3[grid_id] - df3[wt_ob])**2) / 
-                        sum((df3[wt_ob] - (df3[wt_ob]).mean())**2))
-
-                    ## PBIAS
-                    PBIAS =  100*(sum(df3[wt_ob] - df3[grid_id]) / sum(df3[wt_ob]))
+                    ## R-squared, Nash–Sutcliffe (E) model efficiency coefficient and PBIAS
+                    stats = ObjFns.evaluate(df3[grid_id], df3[wt_ob], ('rsq', 'nse', 'pbias'))
+                    r_squared, dNS, PBIAS = stats['rsq'], stats['nse'], stats['pbias']
 
                 # ------------ Export Data to file -------------- #
                 with open(os.path.join(outfolder, "apexmf_grid_id(" + str(grid_id) + ")"+
@@ -1166,10 +1017,8 @@ def export_wt_annual(self):
             msgBox.exec_()
 
     else:
-        output_wt = pd.read_csv(os.path.join(wd, "amf_MODFLOW_obs_head"),
-                           delim_whitespace=True,
-                           skiprows = 1,
-                           names = grid_id_lst,)
+        output_wt = read_obs_head(
+                            os.path.join(wd, "amf_MODFLOW_obs_head"), grid_id_lst, get_cache_dir(self))
 
         try:
             if self.dlg.checkBox_depthTowater.isChecked():
@@ -1223,4 +1072,32 @@ def export_wt_annual(self):
             msgBox.setWindowIcon(QtGui.QIcon(':/APEXMOD/pics/am_icon.png'))
             msgBox.setWindowTitle("Not Ready!")
             msgBox.setText("Nothing to write down right now!")
-            msgBox.exec_()
\ No newline at end of file
+            msgBox.exec_()
+
+
+def export_wt_all(self):
+    from qgis.PyQt import QtCore, QtGui, QtSql
+    APEXMOD_path_dict = self.dirs_and_paths()
+    stdate, eddate = self.define_sim_period()
+    wd = APEXMOD_path_dict['MODFLOW']
+    outfolder = APEXMOD_path_dict['exported_files']
+    timestep = {"Daily": 'day', "Monthly": 'month', "Annual": 'year'}[
+        self.dlg.comboBox_hh_time.currentText()]
+
+    msgBox = QMessageBox()
+    msgBox.setWindowIcon(QtGui.QIcon(':/APEXMOD/pics/am_icon.png'))
+    try:
+        written, summary = export_all(
+            wd, outfolder, stdate, get_cache_dir(self), timestep,
+            depth_to_water=self.dlg.checkBox_depthTowater.isChecked())
+    except Exception as e:
+        msgBox.setWindowTitle("Not Ready!")
+        msgBox.setText("Nothing to write down right now!\n{}".format(e))
+        msgBox.exec_()
+        return
+    msgBox.setWindowTitle("Exported!")
+    msgBox.setText(
+        "{} observation cells ({} with observed data) and '{}' are exported "
+        "to your 'exported_files' folder!".format(
+            len(written) - 2, len(summary), os.path.basename(written[-2])))
+    msgBox.exec_()
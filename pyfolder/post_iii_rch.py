@@ -16,6 +16,36 @@ import os
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QMessageBox
 from qgis.PyQt.QtCore import QVariant, QCoreApplication
+from .amf_reader import open_block_file, period_index, period_values
+from .layer_writer import write_columns
+from .result_cache import get_cache_dir, load_blocks
+
+
+def get_mf_recharge_ts(self, grid_ids, timestep='day'):
+    """Recharge time series of several grid cells in one pass over the output.
+
+    Parameters
+    ----------
+    grid_ids : sequence of int
+        MODFLOW grid ids (1-based, row-major)
+    timestep : str
+        'day', 'month' or 'year'
+
+    Returns
+    -------
+    DataFrame
+        (ntimes x len(grid_ids)) recharge rates, indexed by date
+    """
+    APEXMOD_path_dict = self.dirs_and_paths()
+    stdate, eddate = self.define_sim_period()
+    filenames = {
+        'day': "amf_MF_recharge.out",
+        'month': "amf_MF_recharge_monthly.out",
+        'year': "amf_MF_recharge_yearly.out"}
+    amf = open_block_file(os.path.join(APEXMOD_path_dict['MODFLOW'], filenames[timestep]))
+    grid_ids = [int(i) for i in grid_ids]
+    ts = amf.get_series([i - 1 for i in grid_ids])
+    return pd.DataFrame(ts, index=period_index(amf, stdate, timestep), columns=grid_ids)
 
 
 def read_mf_recharge_dates(self):
@@ -37,12 +67,8 @@ def read_mf_recharge_dates(self):
     if self.dlg.checkBox_recharge.isChecked() and self.dlg.radioButton_mf_results_d.isChecked():
         filename = "amf_MF_recharge.out"
 
-        # Open "amf_MF_recharge.out" file
-        y = ("MODFLOW", "--Calculated", "daily") # Remove unnecssary lines
-        with open(os.path.join(wd, filename), "r") as f:
-            data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)]  # Remove blank lines
-        date = [x.strip().split() for x in data if x.strip().startswith("Day:")] # Collect only lines with dates
-        onlyDate = [x[1] for x in date] # Only date
+        # Index "amf_MF_recharge.out" file
+        onlyDate = period_values(os.path.join(wd, filename)) # Only date
         # data1 = [x.split() for x in data] # make each line a list
         sdate = datetime.datetime.strptime(startDate, "%m-%d-%Y")  # Change startDate format
         dateList = [(sdate + datetime.timedelta(days=int(i)-1)).strftime("%m-%d-%Y") for i in onlyDate]
@@ -79,12 +105,8 @@ def read_mf_recharge_dates(self):
     elif self.dlg.checkBox_recharge.isChecked() and self.dlg.radioButton_mf_results_m.isChecked():
         filename = "amf_MF_recharge_monthly.out"
 
-        # Open "amf_MF_recharge.out" file
-        y = ("Monthly") # Remove unnecssary lines
-        with open(os.path.join(wd, filename), "r") as f:
-            data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)] # Remove blank lines
-        date = [x.strip().split() for x in data if x.strip().startswith("month:")] # Collect only lines with dates
-        onlyDate = [x[1] for x in date] # Only date
+        # Index "amf_MF_recharge_monthly.out" file
+        onlyDate = period_values(os.path.join(wd, filename)) # Only date
         # data1 = [x.split() for x in data] # make each line a list
         dateList = pd.date_range(startDate, periods=len(onlyDate), freq='M').strftime("%b-%Y").tolist()
         self.dlg.comboBox_mf_results_sdate.clear()
@@ -118,12 +140,8 @@ def read_mf_recharge_dates(self):
 
     elif self.dlg.checkBox_recharge.isChecked() and self.dlg.radioButton_mf_results_y.isChecked():
         filename = "amf_MF_recharge_yearly.out"
-        # Open "amf_MF_recharge.out" file
-        y = ("Yearly") # Remove unnecssary lines
-        with open(os.path.join(wd, filename), "r") as f:
-            data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)] # Remove blank lines
-        date = [x.strip().split() for x in data if x.strip().startswith("year:")] # Collect only lines with dates
-        onlyDate = [x[1] for x in date] # Only date
+        # Index "amf_MF_recharge_yearly.out" file
+        onlyDate = period_values(os.path.join(wd, filename)) # Only date
         # data1 = [x.split() for x in data] # make each line a list
         dateList = pd.date_range(startDate, periods = len(onlyDate), freq = 'A').strftime("%Y").tolist()
         self.dlg.comboBox_mf_results_sdate.clear()
@@ -164,37 +182,23 @@ def export_mf_recharge(self):
     wd = APEXMOD_path_dict['MODFLOW']
     startDate = stdate.strftime("%m-%d-%Y")
 
-    # Open "amf_MF_recharge.out" file
-    y = ("MODFLOW", "--Calculated", "daily", "Monthly", "Yearly") # Remove unnecssary lines
-
     if self.dlg.radioButton_mf_results_d.isChecked():
         filename = "amf_MF_recharge.out"
         self.layer = QgsProject.instance().mapLayersByName("mf_rch_daily")[0]
-        with open(os.path.join(wd, filename), "r") as f:
-            data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)] # Remove blank lines
-        date = [x.strip().split() for x in data if x.strip().startswith("Day:")] # Collect only lines with dates
-        onlyDate = [x[1] for x in date] # Only date
-        data1 = [x.split() for x in data] # make each line a list
+        rch_blocks = load_blocks(os.path.join(wd, filename), get_cache_dir(self))
+        onlyDate = open_block_file(os.path.join(wd, filename)).period_values() # Only date
         sdate = datetime.datetime.strptime(startDate, "%m-%d-%Y") # Change startDate format
         dateList = [(sdate + datetime.timedelta(days=int(i)-1)).strftime("%m-%d-%Y") for i in onlyDate]
     elif self.dlg.radioButton_mf_results_m.isChecked():
         filename = "amf_MF_recharge_monthly.out"
         self.layer = QgsProject.instance().mapLayersByName("mf_recharge_mon")[0]
-        with open(os.path.join(wd, filename), "r") as f:
-            data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)] # Remove blank lines     
-        date = [x.strip().split() for x in data if x.strip().startswith("month:")] # Collect only lines with dates  
-        onlyDate = [x[1] for x in date] # Only date
-        data1 = [x.split() for x in data] # make each line a list
-        dateList = pd.date_range(startDate, periods = len(onlyDate), freq = 'M').strftime("%b-%Y").tolist()
+        rch_blocks = load_blocks(os.path.join(wd, filename), get_cache_dir(self))
+        dateList = pd.date_range(startDate, periods = len(rch_blocks), freq = 'M').strftime("%b-%Y").tolist()
     elif self.dlg.radioButton_mf_results_y.isChecked():
         filename = "amf_MF_recharge_yearly.out"
         self.layer = QgsProject.instance().mapLayersByName("mf_rch_yearly")[0]
-        with open(os.path.join(wd, filename), "r") as f:
-            data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)] # Remove blank lines
-        date = [x.strip().split() for x in data if x.strip().startswith("year:")] # Collect only lines with dates
-        onlyDate = [x[1] for x in date] # Only date
-        data1 = [x.split() for x in data] # make each line a list
-        dateList = pd.date_range(startDate, periods=len(onlyDate), freq ='A').strftime("%Y").tolist()
+        rch_blocks = load_blocks(os.path.join(wd, filename), get_cache_dir(self))
+        dateList = pd.date_range(startDate, periods=len(rch_blocks), freq ='A').strftime("%Y").tolist()
     else:
         msgBox = QMessageBox()
         msgBox.setWindowIcon(QtGui.QIcon(':/APEXMOD/pics/am_icon.png'))
@@ -208,61 +212,15 @@ def export_mf_recharge(self):
     dateEidx = dateList.index(selectedEdate)
     dateList_f = dateList[dateSidx:dateEidx+1]
     input1 = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0] # Put this here to know number of features
+    nfeats = input1.featureCount()
 
     per = 0
+    mf_rchs_cols = {}
     self.dlg.progressBar_mf_results.setValue(0)    
     for selectedDate in dateList_f:
-        # Reverse step
+        # Reverse step: rows of rch_blocks follow the periods in the file
         dateIdx = dateList.index(selectedDate)
-        #only
-        onlyDate_lookup = onlyDate[dateIdx]
-        if self.dlg.radioButton_mf_results_d.isChecked():       
-            for num, line in enumerate(data1, 1):
-                if line[0] == "Day:" in line and line[1] == onlyDate_lookup in line:
-                    ii = num # Starting line
-        elif self.dlg.radioButton_mf_results_m.isChecked():
-            # Find year 
-            dt = datetime.datetime.strptime(selectedDate, "%b-%Y")
-            year = dt.year
-            for num, line in enumerate(data1, 1):
-                if ((line[0] == "month:" in line) and (line[1] == onlyDate_lookup in line) and (line[3] == str(year) in line)):
-                    ii = num # Starting line
-        elif self.dlg.radioButton_mf_results_y.isChecked():     
-            for num, line in enumerate(data1, 1):
-                if line[0] == "year:" in line and line[1] == onlyDate_lookup in line:
-                    ii = num # Starting line
-
-        mf_rchs = []
-        count = 0
-        while count < input1.featureCount():
-            for jj in range(len(data1[ii])):
-                mf_rchs.append(float(data1[ii][jj]))
-                count += 1
-            ii += 1
-
-        provider = self.layer.dataProvider()
-        if self.layer.dataProvider().fields().indexFromName(selectedDate) == -1:
-            field = QgsField(selectedDate, QVariant.Double, 'double', 20, 5)
-            provider.addAttributes([field])
-            self.layer.updateFields()
-
-        mf_rchs_idx = provider.fields().indexFromName(selectedDate)
-
-        tot_feats = self.layer.featureCount()
-        count = 0
-        # Get features (Find out a way to change attribute values using another field)
-        feats = self.layer.getFeatures()
-        self.layer.startEditing()
-
-        # add row number
-        for f, mf_rch in zip(feats, mf_rchs):
-            self.layer.changeAttributeValue(f.id(), mf_rchs_idx, mf_rch)
-            count += 1
-            provalue = round(count/tot_feats*100)
-            self.dlg.progressBar_rch_head.setValue(provalue)
-            QCoreApplication.processEvents()
-        self.layer.commitChanges()
-        QCoreApplication.processEvents()
+        mf_rchs_cols[selectedDate] = rch_blocks[dateIdx, :nfeats]
 
         # Update progress bar         
         per += 1
@@ -270,6 +228,7 @@ def export_mf_recharge(self):
         self.dlg.progressBar_mf_results.setValue(progress)
         QCoreApplication.processEvents()
         self.dlg.raise_()
+    write_columns(self.layer, mf_rchs_cols, self.dlg.progressBar_rch_head)
 
     msgBox = QMessageBox()
     msgBox.setWindowIcon(QtGui.QIcon(':/APEXMOD/pics/am_icon.png'))
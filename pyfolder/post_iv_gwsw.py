@@ -5,7 +5,7 @@ from builtins import range
 from qgis.PyQt.QtCore import QVariant
 from qgis.core import (
                         QgsProject, QgsLayerTreeLayer, QgsVectorFileWriter, QgsVectorLayer,
-                        QgsField)
+                        QgsField, QgsFeatureRequest)
 from qgis.PyQt import QtCore, QtGui, QtSql
 from qgis.PyQt.QtCore import QCoreApplication
 import datetime
@@ -17,9 +17,13 @@ import matplotlib.dates as mdates
 import numpy as np
 import pandas as pd
 import os
+import glob
 import processing
 from PyQt5.QtWidgets import QMessageBox
 from APEXMOD.modules import shapefile_sm
+from .amf_reader import gwsw_series, period_values
+from .mf_inputs import require_dis
+from .result_cache import get_cache_dir, load_blocks, lookup_fids
 
 
 # try:
@@ -38,15 +42,11 @@ def read_mf_gwsw_dates(self):
         stdate, eddate = self.define_sim_period()
         wd = APEXMOD_path_dict['MODFLOW']
         startDate = stdate.strftime("%m-%d-%Y")
-        y = ("for", "Positive:", "Negative:", "Daily", "Monthly", "Annual", "Layer,") # Remove unnecssary lines
         if self.dlg.radioButton_gwsw_day.isChecked():
             filename = "amf_MF_gwsw.out"
             # Open "amf_MF_gwsw.out" file
 
-            with open(os.path.join(wd, filename), "r") as f:
-                data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)] # Remove blank lines
-            date = [x.strip().split() for x in data if x.strip().startswith("Day:")] # Collect only lines with dates
-            onlyDate = [x[1] for x in date] # Only date
+            onlyDate = period_values(os.path.join(wd, filename)) # Only date
             # data1 = [x.split() for x in data] # make each line a list
             sdate = datetime.datetime.strptime(startDate, "%m-%d-%Y") # Change startDate format
             dateList = [(sdate + datetime.timedelta(days = int(i)-1)).strftime("%m-%d-%Y") for i in onlyDate]
@@ -59,11 +59,7 @@ def read_mf_gwsw_dates(self):
             self.dlg.comboBox_gwsw_edate.setCurrentIndex(len(dateList)-1)
         elif self.dlg.radioButton_gwsw_month.isChecked():
             filename = "amf_MF_gwsw_monthly.out"
-            with open(os.path.join(wd, filename), "r") as f:
-                data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)]  
-            date = [x.strip().split() for x in data if x.strip().startswith("month:")]
-            data1 = [x.split() for x in data]
-            onlyDate = [x[1] for x in date] 
+            onlyDate = period_values(os.path.join(wd, filename))
             #dateList = [(sdate + datetime.timedelta(months = int(i)-1)).strftime("%m-%Y") for i in onlyDate]
             dateList = pd.date_range(startDate, periods=len(onlyDate), freq='M').strftime("%b-%Y").tolist()
             self.dlg.comboBox_gwsw_dates.clear()
@@ -75,11 +71,7 @@ def read_mf_gwsw_dates(self):
             self.dlg.comboBox_gwsw_edate.setCurrentIndex(len(dateList)-1)
         elif self.dlg.radioButton_gwsw_year.isChecked():
             filename = "amf_MF_gwsw_yearly.out"
-            with open(os.path.join(wd, filename), "r") as f:
-                data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)]  
-            date = [x.strip().split() for x in data if x.strip().startswith("year:")]
-            data1 = [x.split() for x in data]
-            onlyDate = [x[1] for x in date] 
+            onlyDate = period_values(os.path.join(wd, filename))
             #dateList = [(sdate + datetime.timedelta(months = int(i)-1)).strftime("%m-%Y") for i in onlyDate]
             dateList = pd.date_range(startDate, periods = len(onlyDate), freq='A').strftime("%Y").tolist()
             self.dlg.comboBox_gwsw_dates.clear()
@@ -93,6 +85,33 @@ def read_mf_gwsw_dates(self):
         self.dlg.comboBox_gwsw_dates.clear()
 
 
+def get_gwsw_ts(self, grid_ids, timestep='day'):
+    """Groundwater/surface water exchange time series of several grid cells
+    in one pass over the output (see amf_reader.gwsw_series).
+
+    Parameters
+    ----------
+    grid_ids : sequence of int
+        MODFLOW grid ids (1-based, row-major)
+    timestep : str
+        'day', 'month' or 'year'
+
+    Returns
+    -------
+    DataFrame
+        (ntimes x len(grid_ids)) exchange rates, indexed by date. Cells that
+        are not river cells are NaN. None if the model has no readable .dis
+        file.
+    """
+    APEXMOD_path_dict = self.dirs_and_paths()
+    stdate, eddate = self.define_sim_period()
+    wd = APEXMOD_path_dict['MODFLOW']
+    dis = require_dis(str(wd))
+    if dis is None:
+        return None
+    return gwsw_series(wd, grid_ids, stdate, dis.ncol, timestep)
+
+
 def readExtentSub(self):
     self.layer = QgsProject.instance().mapLayersByName("sub (APEX)")[0]
     # get extent
@@ -139,19 +158,13 @@ def create_sm_riv(self):
             sm_results_group = root.insertGroup(0, "apexmf_results")
 
         input1 = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0]
-        input2 = QgsProject.instance().mapLayersByName("river_grid (APEX-MODFLOW)")[0]
-        feats_mf_grid = input1.getFeatures()
-        feats = input2.getFeatures()
-        grid_id = set([f.attribute('grid_id') for f in feats])
-        #hm = set(grid_id)
-
-        riv_mat = []
-        for f in feats_mf_grid:
-            grid_no = f.attribute("grid_id")
-            for i in grid_id:
-                if grid_no == i:
-                    riv_mat.append(f.id())
+        # river cells of the link_river_grid table (grid_id subbasin rgrid_len)
+        link_river_grid = os.path.join(APEXMOD_path_dict['Table'], "link_river_grid")
+        grid_id = set(np.loadtxt(
+            link_river_grid, skiprows=2, usecols=0, dtype=int, ndmin=1).tolist())
 
+        # grid_id -> fid index of mf_grid, kept in the cache between sessions
+        riv_mat = lookup_fids(input1, grid_id, get_cache_dir(self))
         input1.selectByIds(riv_mat)
         name_ext = "apexmf_riv.shp"
         output_dir = APEXMOD_path_dict['apexmf_shps']
@@ -642,10 +655,8 @@ def plot_gwsw_ani (self):
         sdate = datetime.datetime.strptime(startDate, "%m-%d-%Y") # Change startDate format
         dateList = [(sdate + datetime.timedelta(days=int(i)-1)).strftime("%m-%d-%Y") for i in onlyDate]
 
-        data = np.loadtxt(
-                            os.path.join(wd, filename),
-                            skiprows=5,
-                            comments=["Day:", "Layer", "Daily"])
+        # layer, row, col, rate per river cell
+        data = np.reshape(load_blocks(os.path.join(wd, filename), get_cache_dir(self)), (-1, 4))
         df = np.reshape(data[:, 3], (int(len(data)/nSM_riv), nSM_riv))
         df2 = pd.DataFrame(df)
         df2.index = dateList
@@ -655,10 +666,7 @@ def plot_gwsw_ani (self):
         df3 = df2[scdate:ecdate]
     elif self.dlg.radioButton_gwsw_month.isChecked():
         filename = "amf_MF_gwsw_monthly.out"
-        data = np.loadtxt(
-                        os.path.join(wd, filename),
-                        skiprows=2,
-                        comments=["month:", "Layer"])
+        data = load_blocks(os.path.join(wd, filename), get_cache_dir(self)).ravel()
 
         df = np.reshape(data, (int(len(data)/nSM_riv), nSM_riv))
         # FIXME: for hard code 
@@ -1096,11 +1104,8 @@ def export_gwswToShp(self):
         data1 = [x.split() for x in data]  # make each line a list
         sdate = datetime.datetime.strptime(startDate, "%m-%d-%Y") # Change startDate format
         dateList = [(sdate + datetime.timedelta(days=int(i)-1)).strftime("%m-%d-%Y") for i in onlyDate]
-        # numpy loadtxt is the best way?
-        data = np.loadtxt(
-                            os.path.join(wd, filename),
-                            skiprows=5,
-                            comments=["Day:", "Layer", "Daily"])
+        # layer, row, col, rate per river cell
+        data = np.reshape(load_blocks(os.path.join(wd, filename), get_cache_dir(self)), (-1, 4))
         # row and col numbers are required to match gwsw results with shapefile
         # I hate to use f.id(). Is there another way to update field?
         rows = data[:nSM_riv, 1]  # get rows from results
@@ -1115,15 +1120,10 @@ def export_gwswToShp(self):
         filename = "amf_MF_gwsw_monthly.out"
         self.layer = QgsProject.instance().mapLayersByName("gwsw_monthly")[0]
         nSM_riv = self.layer.featureCount()
-        data = np.loadtxt(
-                        os.path.join(wd, filename),
-                        skiprows=2,
-                        comments=["month:", "Layer", "Negative", "Positive"])
+        data = load_blocks(os.path.join(wd, filename), get_cache_dir(self)).ravel()
         # NOTE: this is a temp hard code
-        ddata = np.loadtxt(
-                            os.path.join(wd, "amf_MF_gwsw.out"),
-                            skiprows=5,
-                            comments=["Day:", "Layer", "Daily"])
+        ddata = np.reshape(
+                    load_blocks(os.path.join(wd, "amf_MF_gwsw.out"), get_cache_dir(self)), (-1, 4))
 
 
         # row and col numbers are required to match gwsw results with shapefile
@@ -21,6 +21,8 @@ import glob
 from PIL import Image
 import matplotlib.pyplot as plt
 from .apexmod_utils import ObjFns
+from .mf_inputs import find_btn
+from .result_cache import get_cache_dir, read_salt_channels
 
 
 
@@ -91,19 +93,7 @@ def get_compNames(self):
     APEXMOD_path_dict = self.dirs_and_paths()
     wd = APEXMOD_path_dict['MODFLOW']
     # find number of species
-    for filename in glob.glob(wd + "/*.btn"):
-        with open(os.path.join(wd, filename), "r") as f:
-            lines = f.readlines()
-    for num, line in enumerate(lines, 1):
-        if line.startswith("'NCOMP,"):
-            lNumComp = num
-        if line.startswith("'SPECIES"):
-            lNumSpecies = num
-    data = [i.replace('\n', '').split() for i in lines]
-    nComp = data[lNumComp][0]
-    compNams = []
-    for i in range(lNumSpecies, lNumSpecies+ int(nComp)):
-        compNams.append(data[i][0].replace("'", ""))
+    compNams = find_btn(wd).species
     fullnams = []
     for i in compNams:
         for j in comps.keys():
@@ -221,11 +211,7 @@ def read_salt_ions_channel(self):
 
     infile = 'salt.output.channels'
 
-    salt_ions_df = pd.read_csv(
-                os.path.join(wd_mf, infile),
-                delim_whitespace=True,
-                skiprows=4,
-                index_col=0)
+    salt_ions_df = read_salt_channels(os.path.join(wd_mf, infile), get_cache_dir(self))
     # drop unnecessary cols
     salt_ions_df.drop(['year', 'day', 'area(ha)'], axis=1, inplace=True)            
     # rename cols
@@ -481,10 +467,8 @@ def salt_sim_obd_plot(self, salt_ions_df):
         ax.plot(
                 df.index, df.iloc[:, 1], c='m',  marker='x', lw=1.5, alpha=0.5,
                 label="Observed", zorder=3)
-    nse = ObjFns.nse(sims, obds)
-    rmse = ObjFns.rmse(sims, obds)
-    pbias = ObjFns.pbias(sims, obds)
-    rsq = ObjFns.rsq(sims, obds)
+    stats = ObjFns.evaluate(sims, obds, ('nse', 'rmse', 'pbias', 'rsq'))
+    nse, rmse, pbias, rsq = stats['nse'], stats['rmse'], stats['pbias'], stats['rsq']
     ax.text(
         .01, 0.95, u'Nash–Sutcliffe: '+ "%.4f" % nse,
         fontsize=8,
@@ -519,10 +503,8 @@ def export_salt_sims_obds(self, salt_ions_df):
     APEXMOD_path_dict = self.dirs_and_paths()
     outfolder = APEXMOD_path_dict['exported_files']
     sims, obds, df = get_salt_sims_obds(self, salt_ions_df)
-    nse = ObjFns.nse(sims, obds)
-    rmse = ObjFns.rmse(sims, obds)
-    pbias = ObjFns.pbias(sims, obds)
-    rsq = ObjFns.rsq(sims, obds)
+    stats = ObjFns.evaluate(sims, obds, ('nse', 'rmse', 'pbias', 'rsq'))
+    nse, rmse, pbias, rsq = stats['nse'], stats['rmse'], stats['pbias'], stats['rsq']
     sub_no = self.dlg.comboBox_salt_sub.currentText()
     salt_var = self.dlg.comboBox_salt_vars.currentText()
     salt_time = self.dlg.comboBox_salt_time.currentText()
@@ -15,6 +15,10 @@ import os
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QMessageBox
 import glob
+from .result_cache import get_cache_dir, read_dws
+
+# .DWS columns used by the water balance plots and exports
+WB_COLUMNS = ['RFV', 'ET', 'Q', 'SSF', 'PRK', 'DPRK', 'RSSF', 'SW']
 
 # try:
 #     import deps.pandas as pd
@@ -43,11 +47,7 @@ def read_std_dates(self):
     dws_file = self.dlg.comboBox_dws_files.currentText()
 
     startDate = stdate.strftime("%m-%d-%Y")
-    df = pd.read_csv(
-                os.path.join(wd, dws_file),
-                delim_whitespace=True,
-                skiprows=8,
-                )
+    df = read_dws(os.path.join(wd, dws_file), get_cache_dir(self), columns=WB_COLUMNS[:1])
     df.index = pd.date_range(startDate, periods=len(df)) 
     if self.dlg.radioButton_std_day.isChecked():
         self.dlg.doubleSpinBox_std_w_exag.setEnabled(False)
@@ -84,11 +84,7 @@ def plot_wb_day(self):
     startDate = stdate.strftime("%m-%d-%Y")
 
     dws_file = self.dlg.comboBox_dws_files.currentText()
-    df = pd.read_csv(
-                os.path.join(wd, dws_file),
-                delim_whitespace=True,
-                skiprows=8,
-                )    
+    df = read_dws(os.path.join(wd, dws_file), get_cache_dir(self), columns=WB_COLUMNS)
 
     df.index = pd.date_range(startDate, periods=len(df))
     df = df[['RFV', 'ET', 'Q', 'SSF', 'PRK', 'DPRK', 'RSSF', 'SW']]
@@ -209,11 +205,7 @@ def plot_wb_dToM_A(self):
 
     startDate = stdate.strftime("%m-%d-%Y")
     dws_file = self.dlg.comboBox_dws_files.currentText()
-    df = pd.read_csv(
-                os.path.join(wd, dws_file),
-                delim_whitespace=True,
-                skiprows=8,
-                )    
+    df = read_dws(os.path.join(wd, dws_file), get_cache_dir(self), columns=WB_COLUMNS)
     df.index = pd.date_range(startDate, periods=len(df))
     df = df[['RFV', 'ET', 'Q', 'SSF', 'PRK', 'DPRK', 'RSSF', 'SW']]
     df['DP'] = (df['RFV'] - df['ET'] - df['Q'] - df['SSF'] + df['PRK'] + df['DPRK'])*0.5
@@ -893,11 +885,7 @@ def export_wb_d(self):
 
     startDate = stdate.strftime("%m-%d-%Y")
     dws_file = self.dlg.comboBox_dws_files.currentText()
-    df = pd.read_csv(
-                os.path.join(wd, dws_file),
-                delim_whitespace=True,
-                skiprows=8,
-                )    
+    df = read_dws(os.path.join(wd, dws_file), get_cache_dir(self), columns=WB_COLUMNS)
     df.index = pd.date_range(startDate, periods=len(df))
     df = df[['RFV', 'ET', 'Q', 'SSF', 'PRK', 'DPRK', 'RSSF', 'SW']]
     df['DP'] = (df['RFV'] - df['ET'] - df['Q'] - df['SSF'] + df['PRK'] + df['DPRK'])*0.5
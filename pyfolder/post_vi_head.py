@@ -13,23 +13,49 @@ import glob
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QMessageBox
 from qgis.PyQt.QtCore import QVariant, QCoreApplication
+from .amf_reader import open_block_file, period_index, period_values
+from .layer_writer import write_columns
+from .mf_inputs import require_dis
 
 
 def read_mf_nOflayers(self):
     APEXMOD_path_dict = self.dirs_and_paths()
     # Find .dis file and read the number of layers
-    for filename in glob.glob(str(APEXMOD_path_dict['MODFLOW'])+"/*.dis"):
-        with open(filename, "r") as f:
-            data = []
-            for line in f.readlines():
-                if not line.startswith("#"):
-                    data.append(line.replace('\n', '').split())
-        nlayer = int(data[0][0])
+    dis = require_dis(str(APEXMOD_path_dict['MODFLOW']))
+    if dis is None:
+        return
+    nlayer = dis.nlay
     lyList = [str(i+1) for i in range(nlayer)]
     self.dlg.comboBox_lyList.clear()
     self.dlg.comboBox_lyList.addItems(lyList)
 
 
+def get_mf_head_ts(self, grid_ids, layer=1, timestep='month'):
+    """Head time series of several grid cells in one pass over the output.
+
+    Parameters
+    ----------
+    grid_ids : sequence of int
+        MODFLOW grid ids (1-based, row-major)
+    layer : int
+        layer number
+    timestep : str
+        'month' or 'year'
+
+    Returns
+    -------
+    DataFrame
+        (ntimes x len(grid_ids)) heads, indexed by date
+    """
+    APEXMOD_path_dict = self.dirs_and_paths()
+    stdate, eddate = self.define_sim_period()
+    filenames = {'month': "amf_MF_head_monthly.out", 'year': "amf_MF_head_yearly.out"}
+    amf = open_block_file(os.path.join(APEXMOD_path_dict['MODFLOW'], filenames[timestep]))
+    grid_ids = [int(i) for i in grid_ids]
+    ts = amf.get_series([i - 1 for i in grid_ids], layer)
+    return pd.DataFrame(ts, index=period_index(amf, stdate, timestep), columns=grid_ids)
+
+
 def read_mf_head_dates(self):
     APEXMOD_path_dict = self.dirs_and_paths()
     stdate, eddate = self.define_sim_period()
@@ -83,12 +109,8 @@ def read_mf_head_dates(self):
     '''
     if self.dlg.checkBox_head.isChecked() and self.dlg.radioButton_mf_results_m.isChecked():
         filename = "amf_MF_head_monthly.out"
-        # Open "apexmf_out_MF_head" file
-        y = ("Monthly") # Remove unnecssary lines
-        with open(os.path.join(wd, filename), "r") as f:
-            data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)] # Remove blank lines
-        date = [x.strip().split() for x in data if x.strip().startswith("month:")]  # Collect only lines with dates
-        onlyDate = [x[1] for x in date] # Only date
+        # Index "amf_MF_head_monthly.out" file
+        onlyDate = period_values(os.path.join(wd, filename)) # Only date
         # data1 = [x.split() for x in data] # make each line a list
         dateList = pd.date_range(startDate, periods=len(onlyDate), freq='M').strftime("%b-%Y").tolist()
         self.dlg.comboBox_mf_results_sdate.clear()
@@ -119,12 +141,8 @@ def read_mf_head_dates(self):
             msgBox.exec_()
     elif self.dlg.checkBox_head.isChecked() and self.dlg.radioButton_mf_results_y.isChecked():
         filename = "amf_MF_head_yearly.out"
-        # Open "apexmf_out_MF_head" file
-        y = ("Yearly") # Remove unnecssary lines
-        with open(os.path.join(wd, filename), "r") as f:
-            data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)] # Remove blank lines
-        date = [x.strip().split() for x in data if x.strip().startswith("year:")] # Collect only lines with dates
-        onlyDate = [x[1] for x in date] # Only date
+        # Index "amf_MF_head_yearly.out" file
+        onlyDate = period_values(os.path.join(wd, filename)) # Only date
         # data1 = [x.split() for x in data] # make each line a list
         dateList = pd.date_range(startDate, periods=len(onlyDate), freq='A').strftime("%Y").tolist()
         self.dlg.comboBox_mf_results_sdate.clear()
@@ -162,8 +180,6 @@ def export_mf_head(self):
     stdate, eddate = self.define_sim_period()
     wd = APEXMOD_path_dict['MODFLOW']
     startDate = stdate.strftime("%m-%d-%Y")
-    # Open "apexmf_out_MF_head" file
-    y = ("Monthly", "Yearly") # Remove unnecssary lines
 
     # if self.dlg.radioButton_mf_results_d.isChecked():
     #     filename = "apexmf_out_MF_head"
@@ -178,20 +194,14 @@ def export_mf_head(self):
     if self.dlg.radioButton_mf_results_m.isChecked():
         filename = "amf_MF_head_monthly.out"
         self.layer = QgsProject.instance().mapLayersByName("mf_hd_monthly")[0]
-        with open(os.path.join(wd, filename), "r") as f:
-            data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)] # Remove blank lines     
-        date = [x.strip().split() for x in data if x.strip().startswith("month:")] # Collect only lines with dates  
-        onlyDate = [x[1] for x in date] # Only date
-        data1 = [x.split() for x in data] # make each line a list
+        amf = open_block_file(os.path.join(wd, filename))
+        onlyDate = amf.period_values() # Only date
         dateList = pd.date_range(startDate, periods = len(onlyDate), freq='M').strftime("%b-%Y").tolist()
     elif self.dlg.radioButton_mf_results_y.isChecked():
         filename = "amf_MF_head_yearly.out"
         self.layer = QgsProject.instance().mapLayersByName("mf_hd_yearly")[0]
-        with open(os.path.join(wd, filename), "r") as f:
-            data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)] # Remove blank lines
-        date = [x.strip().split() for x in data if x.strip().startswith("year:")] # Collect only lines with dates
-        onlyDate = [x[1] for x in date] # Only date
-        data1 = [x.split() for x in data] # make each line a list
+        amf = open_block_file(os.path.join(wd, filename))
+        onlyDate = amf.period_values() # Only date
         dateList = pd.date_range(startDate, periods = len(onlyDate), freq = 'A').strftime("%Y").tolist()
     else:
         msgBox = QMessageBox()
@@ -206,71 +216,17 @@ def export_mf_head(self):
     dateEidx = dateList.index(selectedEdate)
     dateList_f = dateList[dateSidx:dateEidx+1]
     input1 = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0] # Put this here to know number of features
+    nfeats = input1.featureCount()
+    layerN = int(self.dlg.comboBox_lyList.currentText())
 
     per = 0
+    mf_hds_cols = {}
     self.dlg.progressBar_mf_results.setValue(0)
     for selectedDate in dateList_f:
         QCoreApplication.processEvents()
-        # Reverse step
+        # Reverse step: periods are indexed in file order
         dateIdx = dateList.index(selectedDate)
-        #only
-        onlyDate_lookup = onlyDate[dateIdx]
-        # if self.dlg.radioButton_mf_results_d.isChecked():
-        #     for num, line in enumerate(data1, 1):
-        #         if line[0] == "Day:" in line and line[1] == onlyDate_lookup in line:
-        #             ii = num # Starting line
-        if self.dlg.radioButton_mf_results_m.isChecked():
-            # Find year 
-            dt = datetime.datetime.strptime(selectedDate, "%b-%Y")
-            year = dt.year
-            layerN = self.dlg.comboBox_lyList.currentText()
-            for num, line in enumerate(data1, 1):
-                if ((line[0] == "month:" in line) and (line[1] == onlyDate_lookup in line) and (line[3] == str(year) in line)):
-                    ii = num # Starting line
-            count = 0
-            # while ((data1[count+ii][0] != 'layer:') and (data1[count+ii][1] != layer)):  # why not working?
-            while not ((data1[count+ii][0] == 'layer:') and (data1[count+ii][1] == layerN)):
-                count += 1
-            stline = count+ii+1
-        elif self.dlg.radioButton_mf_results_y.isChecked():
-            layerN = self.dlg.comboBox_lyList.currentText()
-            for num, line in enumerate(data1, 1):
-                if line[0] == "year:" in line and line[1] == onlyDate_lookup in line:
-                    ii = num # Starting line
-            count = 0
-            while not ((data1[count+ii][0] == 'layer:') and (data1[count+ii][1] == layerN)):
-                count += 1
-            stline = count+ii+1
-
-        mf_hds = []
-        hdcount = 0
-        while hdcount < input1.featureCount():
-            for kk in range(len(data1[stline])):
-                mf_hds.append(float(data1[stline][kk]))
-                hdcount += 1
-            stline += 1
-
-        provider = self.layer.dataProvider()
-        if self.layer.dataProvider().fields().indexFromName(selectedDate) == -1:
-            field = QgsField(selectedDate, QVariant.Double, 'double', 20, 5)
-            provider.addAttributes([field])
-            self.layer.updateFields()
-        mf_hds_idx = provider.fields().indexFromName(selectedDate)
-        
-        tot_feats = self.layer.featureCount()
-        count = 0        
-        # Get features (Find out a way to change attribute values using another field)
-        feats = self.layer.getFeatures()
-        self.layer.startEditing()
-        # add row number
-        for f, mf_hd in zip(feats, mf_hds):
-            self.layer.changeAttributeValue(f.id(), mf_hds_idx, mf_hd)
-            count += 1
-            provalue = round(count/tot_feats*100)
-            self.dlg.progressBar_rch_head.setValue(provalue)
-            QCoreApplication.processEvents()
-        self.layer.commitChanges()
-        QCoreApplication.processEvents()
+        mf_hds_cols[selectedDate] = amf.get_block(dateIdx, layerN)[:nfeats]
 
         # Update progress bar 
         per += 1
@@ -278,6 +234,7 @@ def export_mf_head(self):
         self.dlg.progressBar_mf_results.setValue(progress)
         QCoreApplication.processEvents()
         self.dlg.raise_()
+    write_columns(self.layer, mf_hds_cols, self.dlg.progressBar_rch_head)
 
     msgBox = QMessageBox()
     msgBox.setWindowIcon(QtGui.QIcon(':/APEXMOD/pics/am_icon.png'))
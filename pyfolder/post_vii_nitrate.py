@@ -6,7 +6,7 @@ from qgis.core import (
                         QgsProject, QgsLayerTreeLayer, QgsVectorFileWriter, QgsVectorLayer, QgsRasterLayer,
                         QgsField, QgsRasterBandStats, QgsColorRampShader, QgsRasterShader,
                         QgsSingleBandPseudoColorRenderer, QgsMapSettings, QgsMapRendererCustomPainterJob,
-                        QgsRectangle)
+                        QgsRectangle, QgsFeatureRequest)
 from qgis.PyQt import QtCore, QtGui, QtSql
 import datetime
 import pandas as pd
@@ -21,6 +21,11 @@ import processing
 from qgis.gui import QgsMapCanvas
 import glob
 from PIL import Image
+from . import raster_frames
+from .amf_reader import period_values
+from .layer_writer import write_columns
+from .mf_inputs import find_btn, require_dis
+from .result_cache import get_cache_dir, load_blocks
 
 def comps_dic():
     comps_dic = {
@@ -58,19 +63,7 @@ def get_compNames(self):
         APEXMOD_path_dict = self.dirs_and_paths()
         wd = APEXMOD_path_dict['MODFLOW']
         # find number of species
-        for filename in glob.glob(wd + "/*.btn"):            
-            with open(os.path.join(wd, filename), "r") as f:
-                lines = f.readlines()
-        for num, line in enumerate(lines, 1):
-            if line.startswith("'NCOMP,"):
-                lNumComp = num
-            if line.startswith("'SPECIES"):
-                lNumSpecies = num
-        data = [i.replace('\n', '').split() for i in lines]
-        nComp = data[lNumComp][0]
-        compNams = []
-        for i in range(lNumSpecies, lNumSpecies+ int(nComp)):
-            compNams.append(data[i][0].replace("'", ""))
+        compNams = find_btn(wd).species
         fullnams = []
         for i in compNams:
             for j in comps.keys():
@@ -85,13 +78,10 @@ def get_compNames(self):
 def read_mf_nOflayers(self):
     APEXMOD_path_dict = self.dirs_and_paths()
     # Find .dis file and read the number of layers
-    for filename in glob.glob(str(APEXMOD_path_dict['MODFLOW'])+"/*.dis"):
-        with open(filename, "r") as f:
-            data = []
-            for line in f.readlines():
-                if not line.startswith("#"):
-                    data.append(line.replace('\n', '').split())
-        nlayer = int(data[0][0])
+    dis = require_dis(str(APEXMOD_path_dict['MODFLOW']))
+    if dis is None:
+        return
+    nlayer = dis.nlay
     lyList = [str(i+1) for i in range(nlayer)]
     self.dlg.comboBox_rt_layer.clear()
     self.dlg.comboBox_rt_layer.addItems(lyList)
@@ -103,11 +93,7 @@ def read_rt3d_dates(self):
     startDate = stdate.strftime("%m-%d-%Y")
     filename = "amf_RT3D_cNO3_monthly.out"
     # Open "swatmf_out_MF_head" file
-    y = ("Monthly") # Remove unnecssary lines
-    with open(os.path.join(wd, filename), "r") as f:
-        data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)] # Remove blank lines
-    date = [x.strip().split() for x in data if x.strip().startswith("month:")]  # Collect only lines with dates
-    onlyDate = [x[1] for x in date] # Only date
+    onlyDate = period_values(os.path.join(wd, filename)) # Only date
     # data1 = [x.split() for x in data] # make each line a list
     dateList = pd.date_range(startDate, periods=len(onlyDate), freq='M').strftime("%b-%Y").tolist()
     self.dlg.comboBox_rt_results_sdate.clear()
@@ -279,41 +265,14 @@ def export_perc_no3(self):
     elif self.dlg.radioButton_rt3d_y.isChecked():
         name = "rt3d_{}_perc_year".format(comp)
     input1 = QgsProject.instance().mapLayersByName(name)[0]
-    per = 0
-    self.dlg.progressBar_mf_results.setValue(0)
-    for selectedDate in df.index.tolist():
-        QCoreApplication.processEvents()
-        selectedDate = selectedDate.strftime("%m-%d-%Y")
-
-        provider = input1.dataProvider()
-        if provider.fields().indexFromName(selectedDate) == -1:
-            field = QgsField(selectedDate, QVariant.Double, 'double', 20, 5)
-            provider.addAttributes([field])
-            input1.updateFields()
-        mf_hds_idx = provider.fields().indexFromName(selectedDate)
-        
-        tot_feats = input1.featureCount()
-        count = 0        
-        # Get features (Find out a way to change attribute values using another field)
-        feats = input1.getFeatures()
-        input1.startEditing()
-        # add row number
-        perc_list =  df.loc[selectedDate].tolist()
-        for f, mf_hd in zip(feats, perc_list):
-            input1.changeAttributeValue(f.id(), mf_hds_idx, mf_hd)
-            count += 1
-            provalue = round(count/tot_feats*100)
-            self.dlg.progressBar_rt.setValue(provalue)
-            QCoreApplication.processEvents()
-        input1.commitChanges()
-        QCoreApplication.processEvents()
-
-        # Update progress bar 
-        per += 1
-        progress = round((per / len(df.index.tolist())) *100)
-        self.dlg.progressBar_rt_results.setValue(progress)
-        QCoreApplication.processEvents()
-        self.dlg.raise_()
+    # one column per date, in subarea feature order
+    perc_cols = {
+        selectedDate.strftime("%m-%d-%Y"): df.loc[selectedDate].values
+        for selectedDate in df.index}
+    self.dlg.progressBar_rt_results.setValue(0)
+    write_columns(input1, perc_cols, self.dlg.progressBar_rt)
+    self.dlg.progressBar_rt_results.setValue(100)
+    self.dlg.raise_()
 
     msgBox = QMessageBox()
     msgBox.setWindowIcon(QtGui.QIcon(':/APEXMOD/pics/am_icon.png'))
@@ -505,6 +464,7 @@ def export_rt_cno3(self):
     input1 = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0] # Put this here to know number of features
 
     per = 0
+    mf_hds_cols = {}
     self.dlg.progressBar_mf_results.setValue(0)
     for selectedDate in dateList_f:
         QCoreApplication.processEvents()
@@ -546,28 +506,7 @@ def export_rt_cno3(self):
                 mf_hds.append(float(data1[stline][kk]))
                 hdcount += 1
             stline += 1
-
-        provider = self.layer.dataProvider()
-        if self.layer.dataProvider().fields().indexFromName(selectedDate) == -1:
-            field = QgsField(selectedDate, QVariant.Double, 'double', 20, 5)
-            provider.addAttributes([field])
-            self.layer.updateFields()
-        mf_hds_idx = provider.fields().indexFromName(selectedDate)
-        
-        tot_feats = self.layer.featureCount()
-        count = 0        
-        # Get features (Find out a way to change attribute values using another field)
-        feats = self.layer.getFeatures()
-        self.layer.startEditing()
-        # add row number
-        for f, mf_hd in zip(feats, mf_hds):
-            self.layer.changeAttributeValue(f.id(), mf_hds_idx, mf_hd)
-            count += 1
-            provalue = round(count/tot_feats*100)
-            self.dlg.progressBar_rt.setValue(provalue)
-            QCoreApplication.processEvents()
-        self.layer.commitChanges()
-        QCoreApplication.processEvents()
+        mf_hds_cols[selectedDate] = mf_hds
 
         # Update progress bar 
         per += 1
@@ -575,6 +514,7 @@ def export_rt_cno3(self):
         self.dlg.progressBar_rt_results.setValue(progress)
         QCoreApplication.processEvents()
         self.dlg.raise_()
+    write_columns(self.layer, mf_hds_cols, self.dlg.progressBar_rt)
 
     msgBox = QMessageBox()
     msgBox.setWindowIcon(QtGui.QIcon(':/APEXMOD/pics/am_icon.png'))
@@ -594,16 +534,11 @@ def get_rt_cno3_avg_m_df(self):
     stdate, eddate = self.define_sim_period()
     wd = APEXMOD_path_dict['MODFLOW']
     startDate = stdate.strftime("%m-%d-%Y")
-    # Open "swatmf_out_MF_head" file
-    y = ("Monthly", "Yearly") # Remove unnecssary lines
     filename = "amf_RT3D_cNO3_monthly.out"
-    # self.layer = QgsProject.instance().mapLayersByName("rt3d_nitrate_avg_mon")[0]
-    with open(os.path.join(wd, filename), "r") as f:
-        data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)] # Remove blank lines     
-    date = [x.strip().split() for x in data if x.strip().startswith("month:")] # Collect only lines with dates  
-    onlyDate = [x[1] for x in date] # Only date
-    data1 = [x.split() for x in data] # make each line a list
-    dateList = pd.date_range(startDate, periods=len(onlyDate), freq='M').strftime("%b-%Y").tolist()
+    layerN = int(self.dlg.comboBox_rt_layer.currentText())
+    # (months x cells) array of the selected layer
+    rt_blocks = load_blocks(os.path.join(wd, filename), get_cache_dir(self), layerN)
+    dateList = pd.date_range(startDate, periods=len(rt_blocks), freq='M').strftime("%b-%Y").tolist()
 
     selectedSdate = self.dlg.comboBox_rt_results_sdate.currentText()
     selectedEdate = self.dlg.comboBox_rt_results_edate.currentText()
@@ -613,41 +548,13 @@ def get_rt_cno3_avg_m_df(self):
     dateList_f = dateList[dateSidx:dateEidx+1]
     input1 = QgsProject.instance().mapLayersByName("mf_grid (MODFLOW)")[0] # Put this here to know number of features
 
-    big_df = pd.DataFrame()
+    big_df = pd.DataFrame(
+        np.array(rt_blocks[dateSidx:dateEidx+1, :input1.featureCount()]),
+        index=[datetime.datetime.strptime(d, "%b-%Y").strftime("%Y-%m-%d") for d in dateList_f])
+    self.dlg.progressBar_rt.setValue(100)
+    QCoreApplication.processEvents()
+    self.dlg.raise_()
 
-    datecount = 0
-    for selectedDate in dateList_f:
-        # Reverse step
-        dateIdx = dateList.index(selectedDate)
-        #only
-        onlyDate_lookup = onlyDate[dateIdx]
-        dt = datetime.datetime.strptime(selectedDate, "%b-%Y")
-        year = dt.year
-        layerN = self.dlg.comboBox_rt_layer.currentText()
-        for num, line in enumerate(data1, 1):
-            if ((line[0] == "month:" in line) and (line[1] == onlyDate_lookup in line) and (line[3] == str(year) in line)):
-                ii = num # Starting line
-        count = 0
-        # while ((data1[count+ii][0] != 'layer:') and (data1[count+ii][1] != layer)):  # why not working?
-        while not ((data1[count+ii][0] == 'layer:') and (data1[count+ii][1] == layerN)):
-            count += 1
-        stline = count+ii+1
-        mf_hds = []
-        hdcount = 0
-        while hdcount < input1.featureCount():
-            for kk in range(len(data1[stline])):
-                mf_hds.append(float(data1[stline][kk]))
-                hdcount += 1
-            stline += 1
-        s = pd.Series(mf_hds, name=datetime.datetime.strptime(selectedDate, "%b-%Y").strftime("%Y-%m-%d"))
-        big_df = pd.concat([big_df, s], axis=1)
-        datecount +=1
-        provalue = round(datecount/len(dateList_f)*100)
-        self.dlg.progressBar_rt.setValue(provalue)
-        QCoreApplication.processEvents()
-        self.dlg.raise_()
-
-    big_df = big_df.T
     big_df.index = pd.to_datetime(big_df.index)
     self.mbig_df = big_df.groupby(big_df.index.month).mean()
 
@@ -718,41 +625,12 @@ def export_rt_cno3_avg_m(self):
     mbig_df = self.mbig_df
     selected_months = selected_rt_mon(self)
     self.layer = QgsProject.instance().mapLayersByName("rt3d_nitrate_avg_mon")[0]
-    per = 0
-    self.dlg.progressBar_mf_results.setValue(0)
-    for m in selected_months:
-        m_vals = mbig_df.loc[m, :]
-        QCoreApplication.processEvents()
-        mon_nam = calendar.month_abbr[m]
-
-        provider = self.layer.dataProvider()
-        if self.layer.dataProvider().fields().indexFromName(mon_nam) == -1:
-            field = QgsField(mon_nam, QVariant.Double, 'double', 20, 5)
-            provider.addAttributes([field])
-            self.layer.updateFields()
-        mf_hds_idx = provider.fields().indexFromName(mon_nam)
-        
-        tot_feats = self.layer.featureCount()
-        count = 0        
-        # Get features (Find out a way to change attribute values using another field)
-        feats = self.layer.getFeatures()
-        self.layer.startEditing()
-        # add row number
-        for f, mf_hd in zip(feats, m_vals):
-            self.layer.changeAttributeValue(f.id(), mf_hds_idx, mf_hd)
-            count += 1
-            provalue = round(count/tot_feats*100)
-            self.dlg.progressBar_rt.setValue(provalue)
-            QCoreApplication.processEvents()
-        self.layer.commitChanges()
-        QCoreApplication.processEvents()
-
-        # Update progress bar 
-        per += 1
-        progress = round((per / len(selected_months)) *100)
-        self.dlg.progressBar_rt_results.setValue(progress)
-        QCoreApplication.processEvents()
-        self.dlg.raise_()
+    # one column per selected month, in grid feature order
+    m_cols = {calendar.month_abbr[m]: mbig_df.loc[m, :].values for m in selected_months}
+    self.dlg.progressBar_rt_results.setValue(0)
+    write_columns(self.layer, m_cols, self.dlg.progressBar_rt)
+    self.dlg.progressBar_rt_results.setValue(100)
+    self.dlg.raise_()
 
     msgBox = QMessageBox()
     msgBox.setWindowIcon(QtGui.QIcon(':/APEXMOD/pics/am_icon.png'))
@@ -798,24 +676,18 @@ def cvt_vtr(self):
     layer = QgsProject.instance().mapLayersByName(str(selectedVector))[0]
 
     # Find .dis file and read number of rows, cols, x spacing, and y spacing (not allowed to change)
-    for filename in glob.glob(str(APEXMOD_path_dict['MODFLOW'])+"/*.dis"):
-        with open(filename, "r") as f:
-            data = []
-            for line in f.readlines():
-                if not line.startswith("#"):
-                    data.append(line.replace('\n', '').split())
-        nrow = int(data[0][1])
-        ncol = int(data[0][2])
-        delr = float(data[2][1]) # is the cell width along rows (y spacing)
-        delc = float(data[3][1]) # is the cell width along columns (x spacing).
+    dis = require_dis(str(APEXMOD_path_dict['MODFLOW']))
+    if dis is None:
+        return
+    nrow = dis.nrow
+    ncol = dis.ncol
+    delr = float(dis.delr[0]) # is the cell width along rows (y spacing)
+    delc = float(dis.delc[0]) # is the cell width along columns (x spacing).
 
     # get extent
     ext = layer.extent()
     xmin = ext.xMinimum()
-    xmax = ext.xMaximum()
-    ymin = ext.yMinimum()
     ymax = ext.yMaximum()
-    extent = "{a},{b},{c},{d}".format(a=xmin, b=xmax, c=ymin, d=ymax)
 
     fdnames = [
                 field.name() for field in layer.dataProvider().fields() if not (
@@ -832,6 +704,30 @@ def cvt_vtr(self):
                 )
                     ]
 
+    # Read row, col and all fields in one pass; the grid is regular so each
+    # field is scattered straight into a (row, col) array
+    nodata = float(self.dlg.lineEdit_nodata.text())
+    mincolor = self.dlg.mColorButton_min_rmap.color().name()
+    maxcolor = self.dlg.mColorButton_max_rmap.color().name()
+    names = layer.fields().names()
+    keys = ['row', 'col'] if ('row' in names and 'col' in names) else ['grid_id']
+    request = QgsFeatureRequest()
+    request.setFlags(QgsFeatureRequest.NoGeometry)
+    request.setSubsetOfAttributes(keys + fdnames, layer.fields())
+    ids, values = [], []
+    for f in layer.getFeatures(request):
+        ids.append([f[k] for k in keys])
+        values.append([f[fd] for fd in fdnames])
+    ids = np.asarray(ids, dtype=int)
+    values = pd.DataFrame(values).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    if keys == ['grid_id']:
+        rows, cols = (ids[:, 0] - 1) // ncol + 1, (ids[:, 0] - 1) % ncol + 1
+    else:
+        rows, cols = ids[:, 0], ids[:, 1]
+    arrays, _ = raster_frames.field_arrays(rows, cols, values.reshape(len(ids), len(fdnames)), nodata)
+    geotransform = (xmin, delc, 0, ymax, 0, -delr)
+    wkt = layer.crs().toWkt()
+
     # Create apexmf_results tree inside 
     root = QgsProject.instance().layerTreeRoot()
     if root.findGroup("apexmf_results"):
@@ -843,39 +739,21 @@ def cvt_vtr(self):
         rastergroup = root.findGroup(selectedVector)
     else:
         rastergroup = apexmf_results.insertGroup(0, selectedVector)
-    per = 0
+    output_dir = APEXMOD_path_dict['apexmf_shps']
+    # create folder for each layer output
+    rasterpath = os.path.join(output_dir, selectedVector)
+    if not os.path.exists(rasterpath):
+        os.makedirs(rasterpath)
+    palette = raster_frames.frame_palette(mincolor, maxcolor)
+    jobs = []
     self.dlg.progressBar_cvt_vtr.setValue(0)
-    for fdnam in fdnames:
-        QCoreApplication.processEvents()
-        nodata = float(self.dlg.lineEdit_nodata.text())
-        mincolor = self.dlg.mColorButton_min_rmap.color().name()
-        maxcolor = self.dlg.mColorButton_max_rmap.color().name()
-        name = fdnam
-        name_ext = "{}.tif".format(name)
-        output_dir = APEXMOD_path_dict['apexmf_shps']
-        # create folder for each layer output
-        rasterpath = os.path.join(output_dir, selectedVector)
-        if not os.path.exists(rasterpath):
-            os.makedirs(rasterpath)
-        output_raster = os.path.join(rasterpath, name_ext)
-        params = {
-            'INPUT': layer,
-            'FIELD': fdnam,
-            'UNITS': 1,
-            'WIDTH': delc,
-            'HEIGHT': delr,
-            'EXTENT': extent,
-            'NODATA': nodata,
-            'DATA_TYPE': 5, #Float32
-            'OUTPUT': output_raster
-        }
-        processing.run("gdal:rasterize", params)
+    for per, fdnam in enumerate(fdnames):
+        output_raster = os.path.join(rasterpath, "{}.tif".format(fdnam))
+        raster_frames.write_geotiff(output_raster, arrays[per], geotransform, wkt, nodata)
         rasterlayer = QgsRasterLayer(output_raster, '{0} ({1})'.format(fdnam, selectedVector))
         QgsProject.instance().addMapLayer(rasterlayer, False)
         rastergroup.insertChildNode(0, QgsLayerTreeLayer(rasterlayer))
-        stats = rasterlayer.dataProvider().bandStatistics(1, QgsRasterBandStats.All, ext, 0)
-        rmin = stats.minimumValue
-        rmax = stats.maximumValue
+        rmin, rmax = raster_frames.value_range(arrays[per], nodata)
         fnc = QgsColorRampShader()
         lst = [QgsColorRampShader.ColorRampItem(rmin, QColor(mincolor)), QgsColorRampShader.ColorRampItem(rmax, QColor(maxcolor))]
         fnc.setColorRampItemList(lst)
@@ -888,74 +766,24 @@ def cvt_vtr(self):
         renderer = QgsSingleBandPseudoColorRenderer(rasterlayer.dataProvider(), 1, shader)
         rasterlayer.setRenderer(renderer)
         rasterlayer.triggerRepaint()
-        # create image
-        img = QImage(QSize(800, 800), QImage.Format_ARGB32_Premultiplied)
-        # set background color
-        # bcolor = QColor(255, 255, 255, 255)
-        bcolor = QColor(255, 255, 255, 1)
-        img.fill(bcolor.rgba())
-        # create painter
-        p = QPainter()
-        p.begin(img)
-        p.setRenderHint(QPainter.Antialiasing)
-
-        # create map settings
-        ms = QgsMapSettings()
-        ms.setBackgroundColor(bcolor)
-
-        # set layers to render
-        flayer = QgsProject.instance().mapLayersByName(rasterlayer.name())
-        ms.setLayers([flayer[0]])
-
-        # set extent
-        rect = QgsRectangle(ms.fullExtent())
-        rect.scale(1.1)
-        ms.setExtent(rect)
-
-        # set ouptut size
-        ms.setOutputSize(img.size())
-
-        # setup qgis map renderer
-        render = QgsMapRendererCustomPainterJob(ms, p)
-        render.start()
-        render.waitForFinished()
-        
-        # get timestamp
-        p.drawImage(QPoint(), img)
-        pen = QPen(Qt.red)
-        pen.setWidth(2)
-        p.setPen(pen)
-
-        font = QFont()
-        font.setFamily('Times')
-        # font.setBold(True)
-        font.setPointSize(18)
-        p.setFont(font)
-        # p.setBackground(QColor('sea green')) doesn't work    
-        p.drawText(QRect(0, 0, 800, 800), Qt.AlignRight | Qt.AlignBottom, fdnam)
-        p.end()
-
-        # save the image
-        img.save(os.path.join(rasterpath, '{:03d}_{}.jpg'.format(per, fdnam)))
-        
-        # Update progress bar         
-        per += 1
-        progress = round((per / len(fdnames)) *100)
+        jobs.append((
+            arrays[per], nodata, rmin, rmax, palette, fdnam, (delc, delr),
+            os.path.join(rasterpath, '{:03d}_{}.jpg'.format(per, fdnam))))
+        progress = round(((per + 1) / len(fdnames)) * 50)
         self.dlg.progressBar_cvt_vtr.setValue(progress)
         QCoreApplication.processEvents()
-        self.dlg.raise_()
 
+    # Render the frames in worker threads and append them to the gif in order
     duration = self.dlg.doubleSpinBox_ani_r_time.value()
-
-    # filepaths
-    fp_in = os.path.join(rasterpath, '*.jpg')
     fp_out = os.path.join(rasterpath, '{}.gif'.format(selectedVector))
+    with raster_frames.GifStream(fp_out, duration*1000) as gif:
+        for per, frame in enumerate(raster_frames.render_frames(jobs)):
+            gif.append(frame)
+            progress = 50 + round(((per + 1) / len(jobs)) * 50)
+            self.dlg.progressBar_cvt_vtr.setValue(progress)
+            QCoreApplication.processEvents()
+    self.dlg.raise_()
 
-    # https://pillow.readthedocs.io/en/stable/handbook/image-file-formats.html#gif
-    fimg, *fimgs = [Image.open(f) for f in sorted(glob.glob(fp_in))]
-    fimg.save(fp=fp_out, format='GIF', append_images=fimgs,
-            save_all=True, duration=duration*1000, loop=0, transparency=0)
-    
     msgBox = QMessageBox()
     msgBox.setWindowIcon(QtGui.QIcon(':/APEXMOD/pics/am_icon.png'))
     msgBox.setWindowTitle("Coverted!")
@@ -21,6 +21,8 @@ from qgis.gui import QgsMapCanvas
 import glob
 from PIL import Image
 import pandas as pd
+from .amf_reader import period_values
+from .layer_writer import write_columns
 
 
 def read_salt_dates(self):
@@ -31,12 +33,7 @@ def read_salt_dates(self):
 
     wd = APEXMOD_path_dict['MODFLOW']
     filename = "amf_RT3D_cSalt_monthly.out"
-    y = ("Monthly") # Remove unnecssary lines
-    with open(os.path.join(wd, filename), "r") as f:
-        data = [x.strip() for x in f if x.strip() and not x.strip().startswith(y)] # Remove blank lines     
-    date = [x.strip().split() for x in data if x.strip().startswith("month:")] # Collect only lines with dates  
-    onlyDate = [x[1] for x in date] # Only date
-    data1 = [x.split() for x in data] # make each line a list
+    onlyDate = period_values(os.path.join(wd, filename)) # Only date
     dataList = pd.date_range(startDate, periods=len(onlyDate), freq='M').strftime("%b-%Y").tolist()
 
     self.dlg.comboBox_rt_results_sdate.clear()
@@ -147,6 +144,7 @@ def salt_export_result(self):
     comp = self.dlg.comboBox_solutes.currentText().replace('(', '').replace(')', '').strip().split()[1]
 
     per = 0
+    rt_cols = {}
     self.dlg.progressBar_mf_results.setValue(0)
 
     for selectedDate in dateList_f:
@@ -179,28 +177,7 @@ def salt_export_result(self):
                 rt_array.append(float(data1[stline][kk]))
                 valCount += 1
             stline += 1
-
-        provider = layer.dataProvider()
-        if layer.dataProvider().fields().indexFromName(selectedDate) == -1:
-            field = QgsField(selectedDate, QVariant.Double, 'double', 20, 5)
-            provider.addAttributes([field])
-            layer.updateFields()
-        mf_hds_idx = provider.fields().indexFromName(selectedDate)
-        
-        tot_feats = layer.featureCount()
-        count = 0        
-        # Get features (Find out a way to change attribute values using another field)
-        feats = layer.getFeatures()
-        layer.startEditing()
-        # add row number
-        for f, mf_hd in zip(feats, rt_array):
-            layer.changeAttributeValue(f.id(), mf_hds_idx, mf_hd)
-            count += 1
-            provalue = round(count/tot_feats*100)
-            self.dlg.progressBar_rt.setValue(provalue)
-            QCoreApplication.processEvents()
-        layer.commitChanges()
-        QCoreApplication.processEvents()
+        rt_cols[selectedDate] = rt_array
 
         # Update progress bar 
         per += 1
@@ -208,6 +185,7 @@ def salt_export_result(self):
         self.dlg.progressBar_rt_results.setValue(progress)
         QCoreApplication.processEvents()
         self.dlg.raise_()
+    write_columns(layer, rt_cols, self.dlg.progressBar_rt)
 
     msgBox = QMessageBox()
     msgBox.setWindowIcon(QtGui.QIcon(':/APEXMOD/pics/am_icon.png'))
@@ -336,41 +314,12 @@ def export_salt_avg_m(self):
     mbig_df = self.mbig_df
     selected_months = selected_rt_mon(self)
     self.layer = QgsProject.instance().mapLayersByName("{}".format(layerName))[0]
-    per = 0
-    self.dlg.progressBar_mf_results.setValue(0)
-    for m in selected_months:
-        m_vals = mbig_df.loc[m, :]
-        QCoreApplication.processEvents()
-        mon_nam = calendar.month_abbr[m]
-
-        provider = self.layer.dataProvider()
-        if self.layer.dataProvider().fields().indexFromName(mon_nam) == -1:
-            field = QgsField(mon_nam, QVariant.Double, 'double', 20, 5)
-            provider.addAttributes([field])
-            self.layer.updateFields()
-        mf_hds_idx = provider.fields().indexFromName(mon_nam)
-        
-        tot_feats = self.layer.featureCount()
-        count = 0        
-        # Get features (Find out a way to change attribute values using another field)
-        feats = self.layer.getFeatures()
-        self.layer.startEditing()
-        # add row number
-        for f, mf_hd in zip(feats, m_vals):
-            self.layer.changeAttributeValue(f.id(), mf_hds_idx, mf_hd)
-            count += 1
-            provalue = round(count/tot_feats*100)
-            self.dlg.progressBar_rt.setValue(provalue)
-            QCoreApplication.processEvents()
-        self.layer.commitChanges()
-        QCoreApplication.processEvents()
-
-        # Update progress bar 
-        per += 1
-        progress = round((per / len(selected_months)) *100)
-        self.dlg.progressBar_rt_results.setValue(progress)
-        QCoreApplication.processEvents()
-        self.dlg.raise_()
+    # one column per selected month, in grid feature order
+    m_cols = {calendar.month_abbr[m]: mbig_df.loc[m, :].values for m in selected_months}
+    self.dlg.progressBar_rt_results.setValue(0)
+    write_columns(self.layer, m_cols, self.dlg.progressBar_rt)
+    self.dlg.progressBar_rt_results.setValue(100)
+    self.dlg.raise_()
 
     msgBox = QMessageBox()
     msgBox.setWindowIcon(QtGui.QIcon(':/APEXMOD/pics/am_icon.png'))
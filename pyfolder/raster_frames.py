@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Raster and animation export of the fields of a MODFLOW grid layer.
+
+The grid is regular, so every field is scattered straight into a
+(row, col) numpy array and written to a GeoTIFF with GDAL instead of being
+rasterized polygon by polygon. Animation frames are drawn from the same
+arrays with a fixed palette (background, label, colour ramp) by a pool of
+worker threads and are appended to the GIF one at a time.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from osgeo import gdal
+from PIL import Image, ImageDraw, ImageFont, GifImagePlugin
+
+FRAME_SIZE = 800
+# palette indices: 0 background (transparent in the gif), 1 label, 2.. ramp
+BACKGROUND, LABEL, RAMP0 = 0, 1, 2
+NRAMP = 256 - RAMP0
+
+
+def field_arrays(rows, cols, values, nodata):
+    """Scatter per-cell values into (row, col) arrays.
+
+    Parameters
+    ----------
+    rows, cols : sequence of int
+        1-based row and column of every feature
+    values : numpy.ndarray
+        (nfeatures x nfields) values, NaN where missing
+    nodata : float
+        value of the cells without a feature or a value
+
+    Returns
+    -------
+    arrays : numpy.ndarray
+        (nfields x nrows x ncols) float32 array covering the rows and
+        columns spanned by the features
+    origin : tuple of int
+        1-based (row, col) of the upper-left cell of the arrays
+    """
+    rows = np.asarray(rows, dtype=int)
+    cols = np.asarray(cols, dtype=int)
+    r0, c0 = rows.min(), cols.min()
+    shape = (values.shape[1], rows.max() - r0 + 1, cols.max() - c0 + 1)
+    arrays = np.full(shape, nodata, dtype=np.float32)
+    values = np.where(np.isnan(values), nodata, values)
+    arrays[:, rows - r0, cols - c0] = values.T
+    return arrays, (r0, c0)
+
+
+def write_geotiff(path, array, geotransform, wkt, nodata):
+    """Write a 2D array to a single band float32 GeoTIFF."""
+    driver = gdal.GetDriverByName("GTiff")
+    ds = driver.Create(path, array.shape[1], array.shape[0], 1, gdal.GDT_Float32)
+    ds.SetGeoTransform(geotransform)
+    ds.SetProjection(wkt)
+    band = ds.GetRasterBand(1)
+    band.SetNoDataValue(nodata)
+    band.WriteArray(array)
+    band.FlushCache()
+    # closing the dataset writes the file
+    ds = None
+    return path
+
+
+def value_range(array, nodata):
+    """Minimum and maximum of the valid cells, (nan, nan) if there are none."""
+    valid = array[(array != nodata) & np.isfinite(array)]
+    if not valid.size:
+        return np.nan, np.nan
+    return float(valid.min()), float(valid.max())
+
+
+def _hex_rgb(color):
+    color = color.lstrip("#")
+    return [int(color[i:i+2], 16) for i in (0, 2, 4)]
+
+
+def frame_palette(mincolor, maxcolor):
+    """Palette of the frames: white, red and a linear mincolor-maxcolor ramp."""
+    t = np.linspace(0, 1, NRAMP)[:, None]
+    ramp = (1 - t) * _hex_rgb(mincolor) + t * np.array(_hex_rgb(maxcolor))
+    pal = np.vstack([[255, 255, 255], [255, 0, 0], np.round(ramp)]).astype(np.uint8)
+    return pal.ravel().tolist()
+
+
+def _label_font():
+    try:
+        return ImageFont.truetype("times.ttf", 24)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def render_frame(array, nodata, vmin, vmax, palette, label, cell_size, jpg_path=None,
+                 size=FRAME_SIZE):
+    """Draw one frame of the animation.
+
+    The map is scaled to fit the frame with a 10 % margin (like the
+    rect.scale(1.1) extent of the map canvas) and the label is written at
+    the bottom right.
+
+    Parameters
+    ----------
+    array : numpy.ndarray
+        (nrows x ncols) values
+    nodata : float
+        value of the empty cells
+    vmin, vmax : float
+        values mapped to the ends of the colour ramp
+    palette : list of int
+        from frame_palette
+    label : str
+        text of the frame
+    cell_size : tuple of float
+        (x, y) size of a cell in map units
+    jpg_path : str, optional
+        also save the frame as a JPEG image
+
+    Returns
+    -------
+    PIL.Image.Image
+        size x size palette image
+    """
+    idx = np.full(array.shape, BACKGROUND, dtype=np.uint8)
+    valid = (array != nodata) & np.isfinite(array)
+    span = vmax - vmin
+    scaled = (array[valid] - vmin) / span if span > 0 else np.zeros(valid.sum())
+    idx[valid] = RAMP0 + np.round(np.clip(scaled, 0, 1) * (NRAMP - 1)).astype(np.uint8)
+
+    width = array.shape[1] * cell_size[0]
+    height = array.shape[0] * cell_size[1]
+    scale = size / (1.1 * max(width, height))
+    nx = max(1, int(round(width * scale)))
+    ny = max(1, int(round(height * scale)))
+    # nearest neighbour resampling of the cells to the map pixels
+    iy = np.arange(ny) * array.shape[0] // ny
+    ix = np.arange(nx) * array.shape[1] // nx
+    canvas = np.full((size, size), BACKGROUND, dtype=np.uint8)
+    y0, x0 = (size - ny) // 2, (size - nx) // 2
+    canvas[y0:y0+ny, x0:x0+nx] = idx[iy[:, None], ix[None, :]]
+    frame = Image.frombytes("P", (size, size), canvas.tobytes())
+    frame.putpalette(palette)
+
+    draw = ImageDraw.Draw(frame)
+    font = _label_font()
+    left, top, right, bottom = draw.textbbox((0, 0), label, font=font)
+    draw.text((size - (right - left) - 4, size - (bottom - top) - 8), label, fill=LABEL, font=font)
+    if jpg_path is not None:
+        frame.convert("RGB").save(jpg_path, quality=95)
+    return frame
+
+
+class GifStream:
+    """Animated GIF written frame by frame.
+
+    All frames must be palette images sharing the palette of the first one,
+    so a single global colour table is written and no frame has to be kept
+    once it is appended.
+    """
+
+    def __init__(self, path, duration, loop=0):
+        self.path = path
+        self.duration = int(duration)
+        self.loop = loop
+        self._fp = None
+
+    def append(self, frame):
+        frame.load()
+        if self._fp is None:
+            self._fp = open(self.path, "wb")
+            header, _ = GifImagePlugin.getheader(
+                frame, info={"loop": self.loop, "duration": self.duration})
+            for chunk in header:
+                self._fp.write(chunk)
+        for chunk in GifImagePlugin.getdata(
+                frame, duration=self.duration, transparency=BACKGROUND, disposal=1):
+            self._fp.write(chunk)
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.write(b";")
+            self._fp.close()
+            self._fp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def render_frames(jobs, workers=None, chunk=None):
+    """Render frames in a thread pool, yielding them in job order.
+
+    numpy and the PIL JPEG encoder release the GIL, and unlike a
+    process pool the workers can run inside the QGIS interpreter. Jobs are
+    submitted in chunks so only a few frames are held at a time.
+
+    Parameters
+    ----------
+    jobs : list of tuple
+        arguments of render_frame
+    workers : int, optional
+        number of threads, defaults to the number of CPUs (at most 8)
+    chunk : int, optional
+        number of frames in flight, defaults to twice the workers
+    """
+    workers = workers or min(8, os.cpu_count() or 1)
+    chunk = chunk or 2 * workers
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i in range(0, len(jobs), chunk):
+            futures = [pool.submit(render_frame, *job) for job in jobs[i:i+chunk]]
+            for future in futures:
+                yield future.result()
@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""
+Binary cache for parsed APEX-MODFLOW output files.
+
+The first time an output is requested it is parsed from text and saved as
+numpy arrays in the 'APEX-MODFLOW/.amf_cache' folder. Cache file names carry
+the modification time and size of the source file, so a rerun of the model
+makes the old entries stale and they are rebuilt (and removed) on next use.
+"""
+
+import glob
+import io
+import mmap
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from .amf_reader import open_block_file
+
+CACHE_FOLDER = ".amf_cache"
+# header lines of the .RCH output before the data rows (the last one holds
+# the column names)
+RCH_HEADER_LINES = 9
+_REACH_ROW = re.compile(rb"^[ \t]*REACH[ \t]+(\d+)[^\r\n]*", re.M)
+
+
+def get_cache_dir(self):
+    APEXMOD_path_dict = self.dirs_and_paths()
+    return os.path.join(APEXMOD_path_dict['apexmf_model'], CACHE_FOLDER)
+
+
+def _entry(path, cache_root, tag, ext):
+    st = os.stat(path)
+    stem = "{}.{}".format(os.path.basename(path), tag)
+    name = "{}.{}_{}{}".format(stem, st.st_mtime_ns, st.st_size, ext)
+    return os.path.join(cache_root, name), os.path.join(cache_root, stem + ".*" + ext)
+
+
+# files next to a vector dataset that receive attribute edits: the table of a
+# shapefile and the write-ahead log / journal of a GeoPackage or SQLite file
+_DATASET_SIDECARS = (".dbf", ".DBF", "-wal", "-journal")
+
+
+def _dataset_entry(source, cache_root, tag, ext):
+    """Like _entry, keyed on every file of a vector dataset that can hold its
+    attributes, so that edits of the .dbf of a shapefile or of the -wal of a
+    GeoPackage make the entry stale as well."""
+    stem = os.path.splitext(source)[0]
+    files = [source] + [
+        p for p in (stem + s if s.startswith(".") else source + s for s in _DATASET_SIDECARS)
+        if p != source and os.path.isfile(p)]
+    stamps = []
+    for p in files:
+        st = os.stat(p)
+        stamps.append("{}_{}".format(st.st_mtime_ns, st.st_size))
+    stem = "{}.{}".format(os.path.basename(source), tag)
+    name = "{}.{}{}".format(stem, "_".join(stamps), ext)
+    return os.path.join(cache_root, name), os.path.join(cache_root, stem + ".*" + ext)
+
+
+def _store(fullpath, pattern, save):
+    """Write a new cache entry atomically and drop stale ones."""
+    os.makedirs(os.path.dirname(fullpath), exist_ok=True)
+    for old in glob.glob(pattern):
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+    tmp = fullpath + ".tmp"
+    with open(tmp, "wb") as f:
+        save(f)
+    os.replace(tmp, fullpath)
+
+
+def load_frame(path, reader, cache_root, tag="table"):
+    """Return reader(path) as a DataFrame, going through the cache.
+
+    Parameters
+    ----------
+    path : str
+        source text file
+    reader : callable
+        reader(path) -> DataFrame, only called when the cache is stale
+    cache_root : str
+        cache folder
+    tag : str
+        distinguishes several readers of the same file
+    """
+    fullpath, pattern = _entry(path, cache_root, tag, ".npz")
+    if os.path.isfile(fullpath):
+        with np.load(fullpath, allow_pickle=False) as npz:
+            return _frame_from_npz(npz)
+    df = reader(path)
+    arrays = {}
+    names = [str(c) for c in df.columns]
+    arrays['_columns'] = np.array(names)
+    arrays['_int_columns'] = np.array(
+        [all(isinstance(c, (int, np.integer)) for c in df.columns)])
+    for i, c in enumerate(df.columns):
+        arrays['c{}'.format(i)] = _to_array(df[c])
+    if not isinstance(df.index, pd.RangeIndex):
+        arrays['_index'] = _to_array(df.index)
+        arrays['_index_name'] = np.array([
+            "" if df.index.name is None else str(df.index.name)])
+    _store(fullpath, pattern, lambda f: np.savez(f, **arrays))
+    return df
+
+
+def _to_array(values):
+    arr = np.asarray(values)
+    if arr.dtype == object:
+        arr = arr.astype(str)
+    return arr
+
+
+def _frame_from_npz(npz):
+    names = npz['_columns'].tolist()
+    if bool(npz['_int_columns'][0]):
+        names = [int(c) for c in names]
+    data = {}
+    for i, c in enumerate(names):
+        arr = npz['c{}'.format(i)]
+        data[c] = arr.astype(object) if arr.dtype.kind == 'U' else arr
+    index = None
+    if '_index' in npz.files:
+        index = npz['_index']
+        if index.dtype.kind == 'U':
+            index = index.astype(object)
+        index = pd.Index(index, name=npz['_index_name'][0] or None)
+    return pd.DataFrame(data, index=index, columns=names)
+
+
+def load_blocks(path, cache_root, layer=1):
+    """Return every period block of one layer of a block-formatted output
+    (amf_MF_head_*.out, amf_MF_gwsw*.out, amf_RT3D_*.out, ...) as a
+    (nper x nvalues) array.
+
+    The array is memory-mapped from the cache, so pulling a few columns
+    (cells) out of it only touches the pages that hold them.
+    """
+    fullpath, pattern = _entry(path, cache_root, "L{}".format(layer), ".npy")
+    if os.path.isfile(fullpath):
+        return np.load(fullpath, mmap_mode='r')
+    amf = open_block_file(path)
+    with open(path, "rb") as f:
+        arr = np.vstack(
+            [amf.get_block(i, layer, f=f) for i in range(amf.nper)])
+    _store(fullpath, pattern, lambda f: np.save(f, arr))
+    return arr
+
+
+def load_grid_index(layer, cache_root, field="grid_id"):
+    """Return (ids, fids) arrays of a grid layer, sorted by id.
+
+    The index is cached next to the output caches and keyed on every file of
+    the layer's dataset (see _dataset_entry), so it survives across sessions
+    until the grid or its attributes are rewritten. A layer with uncommitted
+    edits is always read.
+    """
+    source = layer.source().split("|")[0]
+    if os.path.isfile(source) and not layer.isModified():
+        fullpath, pattern = _dataset_entry(source, cache_root, "fid_" + field, ".npz")
+        if os.path.isfile(fullpath):
+            with np.load(fullpath) as npz:
+                return npz['ids'], npz['fids']
+    else:
+        fullpath = None
+    # imported here so the file readers of this module work without QGIS
+    from qgis.core import QgsFeatureRequest
+    request = QgsFeatureRequest()
+    request.setFlags(QgsFeatureRequest.NoGeometry)
+    request.setSubsetOfAttributes([field], layer.fields())
+    pairs = [
+        (f.attribute(field), f.id()) for f in layer.getFeatures(request)
+        if f.attribute(field) is not None]
+    ids = np.array([p[0] for p in pairs], dtype=np.int64)
+    fids = np.array([p[1] for p in pairs], dtype=np.int64)
+    order = np.argsort(ids, kind='stable')
+    ids, fids = ids[order], fids[order]
+    if fullpath is not None:
+        _store(fullpath, pattern, lambda f: np.savez(f, ids=ids, fids=fids))
+    return ids, fids
+
+
+def lookup_fids(layer, grid_ids, cache_root, field="grid_id"):
+    """Feature ids of the features of a grid layer whose id is in grid_ids."""
+    ids, fids = load_grid_index(layer, cache_root, field)
+    return fids[np.isin(ids, np.asarray(list(grid_ids), dtype=np.int64))].tolist()
+
+
+# Readers of the individual output files
+def _read_rch(path):
+    columns = pd.read_csv(path, sep=r'\s+', skiprows=8, nrows=1, header=None)
+    # data lines carry one more column (YEAR) than the header
+    ncols = len(columns.columns) + 1
+    return pd.read_csv(
+        path, sep=r'\s+', skiprows=9, header=None, usecols=range(ncols))
+
+
+def read_rch(path, cache_root):
+    """APEX .RCH output, all columns, columns numbered from 0."""
+    return load_frame(path, _read_rch, cache_root, tag="rch")
+
+
+def rch_columns(path):
+    """Column names of the data rows of an .RCH file (the header row with
+    YEAR inserted after GIS)."""
+    with open(path, "r") as f:
+        for _ in range(RCH_HEADER_LINES - 1):
+            f.readline()
+        names = f.readline().split()
+    names.insert(2, 'YEAR')
+    return names
+
+
+def _build_rch_index(path):
+    with open(path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = 0
+        for _ in range(RCH_HEADER_LINES):
+            pos = mm.find(b"\n", pos) + 1
+        gis, starts, ends = [], [], []
+        for m in _REACH_ROW.finditer(mm, pos):
+            gis.append(int(m.group(1)))
+            starts.append(m.start())
+            ends.append(m.end())
+    gis = np.array(gis, dtype=np.int64)
+    order = np.argsort(gis, kind='stable')
+    ids, first = np.unique(gis[order], return_index=True)
+    return {
+        'ids': ids,
+        'bounds': np.append(first, len(gis)),
+        'starts': np.array(starts, dtype=np.int64)[order],
+        'ends': np.array(ends, dtype=np.int64)[order],
+    }
+
+
+def rch_index(path, cache_root):
+    """Row-offset index of the REACH rows of an .RCH file.
+
+    The file is scanned once; the byte span of every REACH row is stored
+    grouped by GIS id (in file order within a GIS id) and cached.
+
+    Returns
+    -------
+    dict of numpy.ndarray
+        'ids' sorted GIS ids, 'starts' and 'ends' byte spans of the rows,
+        'bounds' where the rows of ids[k] are starts[bounds[k]:bounds[k+1]]
+    """
+    fullpath, pattern = _entry(path, cache_root, "rchidx", ".npz")
+    if os.path.isfile(fullpath):
+        with np.load(fullpath) as npz:
+            return {k: npz[k] for k in npz.files}
+    index = _build_rch_index(path)
+    _store(fullpath, pattern, lambda f: np.savez(f, **index))
+    return index
+
+
+def read_rch_rows(path, sub, usecols, cache_root):
+    """REACH rows of one subarea of an .RCH file, selected columns only.
+
+    Only the rows of sub are read, through rch_index, so memory follows the
+    length of the requested series rather than the size of the file.
+
+    Parameters
+    ----------
+    path : str
+        .RCH file
+    sub : int
+        GIS id of the subarea
+    usecols : list of int
+        positions of the columns to read (see rch_columns)
+    cache_root : str
+        cache folder
+
+    Returns
+    -------
+    pandas.DataFrame
+        columns labelled by position, in the order of usecols
+    """
+    index = rch_index(path, cache_root)
+    ids = index['ids']
+    k = np.searchsorted(ids, int(sub))
+    if k == len(ids) or ids[k] != int(sub):
+        return pd.DataFrame(columns=list(usecols))
+    sel = slice(index['bounds'][k], index['bounds'][k+1])
+    with open(path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        buf = b"\n".join(
+            mm[s:e] for s, e in zip(index['starts'][sel].tolist(), index['ends'][sel].tolist()))
+    df = pd.read_csv(io.BytesIO(buf), sep=r'\s+', header=None, usecols=usecols)
+    return df[list(usecols)]
+
+
+def read_rch_series(path, sub, variables, cache_root):
+    """Variables of one subarea of an .RCH file, one column per variable."""
+    names = rch_columns(path)
+    df = read_rch_rows(path, sub, [names.index(v) for v in variables], cache_root)
+    df.columns = list(variables)
+    return df.reset_index(drop=True)
+
+
+def read_rch_columns(path, colNum, cha_var, cache_root, sub=None):
+    """Same frame as read_csv(usecols=[0, 1, colNum], names=["idx", "sub",
+    cha_var], index_col=0) on an .RCH file.
+
+    With sub, only the REACH rows of that subarea are read (see
+    read_rch_rows) instead of the whole file.
+    """
+    if sub is not None:
+        df = read_rch_rows(path, sub, [0, 1, colNum], cache_root)
+    else:
+        df = read_rch(path, cache_root)
+        df = df.iloc[:, [0, 1, colNum]]
+    df.columns = ["idx", "sub", cha_var]
+    return df.set_index("idx")
+
+
+def read_dws(path, cache_root, columns=None):
+    """APEX .DWS output with its header row.
+
+    columns restricts the frame to those columns; the file is then read in
+    chunks keeping only them, and the projection is cached on its own.
+    """
+    if columns is None:
+        return load_frame(
+            path, lambda p: pd.read_csv(p, sep=r'\s+', skiprows=8),
+            cache_root, tag="dws")
+    columns = list(columns)
+
+    def reader(p):
+        chunks = pd.read_csv(
+            p, sep=r'\s+', skiprows=8, usecols=columns, chunksize=100000)
+        return pd.concat(list(chunks), ignore_index=True)[columns]
+    return load_frame(path, reader, cache_root, tag="dws_" + "-".join(columns))
+
+
+def read_obs_head(path, names, cache_root):
+    """amf_MODFLOW_obs_head with the observation grid ids as column names.
+
+    Read like read_csv(names=names): short rows and a file with fewer
+    columns than names are padded with NaN, and surplus leading columns of
+    the first row become the index.
+    """
+    def reader(p):
+        with open(p, "r") as f:
+            f.readline()
+            ncols = max(len(names), len(f.readline().split()))
+        return pd.read_csv(
+            p, sep=r'\s+', skiprows=1, header=None, names=list(range(ncols)))
+
+    # the padding depends on the number of names
+    df = load_frame(path, reader, cache_root, tag="obs{}".format(len(names)))
+    extra = len(df.columns) - len(names)
+    if extra > 0:
+        df = df.set_index(list(df.columns[:extra]))
+        if extra == 1:
+            df.index.name = None
+    df.columns = names
+    return df
+
+
+def read_salt_channels(path, cache_root):
+    """salt.output.channels indexed by its first column."""
+    return load_frame(
+        path, lambda p: pd.read_csv(p, sep=r'\s+', skiprows=4, index_col=0),
+        cache_root, tag="channels")
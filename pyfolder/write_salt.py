@@ -18,19 +18,15 @@ from qgis.PyQt.QtCore import(
                             )
 import processing
 from .apexmod_utils import DefineTime
+from .mf_inputs import find_dis, require_dis
 
 
 def get_nrows_ncols(self):
     APEXMOD_path_dict = self.dirs_and_paths()
     # Find .dis file and read number of rows, cols, x spacing, and y spacing (not allowed to change)
-    for filename in glob.glob(str(APEXMOD_path_dict['MODFLOW'])+"/*.dis"):
-        with open(filename, "r") as f:
-            data = []
-            for line in f.readlines():
-                if not line.startswith("#"):
-                    data.append(line.replace('\n', '').split())
-        nrows_ = int(data[0][1])
-        ncols_ = int(data[0][2])
+    dis = find_dis(str(APEXMOD_path_dict['MODFLOW']))
+    nrows_ = dis.nrow
+    ncols_ = dis.ncol
     return nrows_, ncols_
     
 
@@ -541,6 +537,9 @@ def freq_writing(self):
 def write_rt3d_inputs(self):
     APEXMOD_path_dict = self.dirs_and_paths()
     outfd = APEXMOD_path_dict['MODFLOW']
+    # the arrays are written with the number of rows and cols of the grid
+    if require_dis(str(outfd)) is None:
+        return
     rt3d_name = self.lineEdit_rt3d_name.text()
     rt3d_name_ext = rt3d_name + ".btn"
     # write btn
@@ -565,14 +564,12 @@ def write_rt3d_inputs(self):
         elif self.radioButton_porosity_r.isChecked() and self.lineEdit_porosity_r.text():
             f.write("1 0.00 Porosity\n")
             pr_df = create_porosity_array(self)
-            pr_df.to_csv(
-                    f, sep=' ', index=False, header=None, float_format='%.5e',
-                    lineterminator='\n', encoding='utf-8')
+            np.savetxt(f, pr_df.to_numpy(dtype=float), fmt='%.5e', delimiter=' ')
         # ICBUND
         f.write("'ICBUND ARRAY -----------------------------------------------------------------'\n")
         create_icbund(self)
         icb_df = create_icbund_array(self)
-        icb_df.to_csv(f, sep='\t', index=False, header=None, lineterminator='\n', encoding='utf-8')
+        np.savetxt(f, icb_df.to_numpy(dtype=np.int64, na_value=0), fmt='%d', delimiter='\t')
         f.write("'INITIAL CONCENTRATIONS: EACH SPECIES -----------------------------------------'\n")
         # NO3
         if self.radioButton_no3_s.isChecked() and self.lineEdit_no3_s.text():
@@ -580,18 +577,14 @@ def write_rt3d_inputs(self):
         elif self.radioButton_no3_r.isChecked() and self.lineEdit_no3_r.text():
             f.write("1 0.00 CNO3\n")
             no3_df = create_no3_array(self)
-            no3_df.to_csv(
-                    f, sep=' ', index=False, header=None, float_format='%.5e',
-                    lineterminator='\n', encoding='utf-8')
+            np.savetxt(f, no3_df.to_numpy(dtype=float), fmt='%.5e', delimiter=' ')
         # P
         if self.radioButton_p_s.isChecked() and self.lineEdit_p_s.text():
             f.write("0 {} P\n".format(create_p_s(self)))
         elif self.radioButton_p_r.isChecked() and self.lineEdit_p_r.text():
             f.write("1 0.00 P\n")
             p_df = create_p_array(self)
-            p_df.to_csv(
-                    f, sep=' ', index=False, header=None, float_format='%.5e',
-                    lineterminator='\n', encoding='utf-8')
+            np.savetxt(f, p_df.to_numpy(dtype=float), fmt='%.5e', delimiter=' ')
         # options
         f.write("'VALUE INDICATING INACTIVE CELL CONCENTRATION ---------------------------------'\n")
         f.write(" -999.0000\n")
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Export of the simulated water table (or depth to water) of every
+observation cell at once.
+
+amf_MODFLOW_obs_head is loaded once into a float32 (ntimes x nwells)
+matrix, every modflow.obd column is aggregated with the same grouping as
+the simulation, and the statistics of all wells are computed in one
+ObjFns.evaluate call. Per-well files are then written row by row from the
+matrices, next to one wide table of all wells and a statistics summary.
+The module does not depend on QGIS.
+"""
+
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+from .apexmod_utils import ObjFns
+from .result_cache import read_obs_head
+
+VERSION = "version 1.5."
+# period of each export time step and the suffix used in file names
+PERIODS = {'day': None, 'month': 'M', 'year': 'Y'}
+SUFFIX = {'day': "d", 'month': "m", 'year': "a"}
+STAT_NAMES = ('nse', 'rsq', 'pbias', 'rmse', 'kge', 'lognse')
+
+
+def read_obs_cells(wd):
+    """Observation cells of modflow.obs: grid_id index and mf_elev column."""
+    return pd.read_csv(
+                        os.path.join(wd, "modflow.obs"),
+                        sep=r'\s+',
+                        skiprows=2,
+                        usecols=[3, 4],
+                        index_col=0,
+                        names=["grid_id", "mf_elev"],)
+
+
+def aggregate(dates, values, timestep):
+    """Mean of every column over each month or year, in one groupby.
+
+    Parameters
+    ----------
+    dates : pandas.DatetimeIndex
+        daily dates of the rows of values
+    values : numpy.ndarray
+        (ntimes x ncolumns)
+    timestep : str
+        'day' (returned as is), 'month' or 'year'
+
+    Returns
+    -------
+    dates : pandas.DatetimeIndex
+        last day of each period, as labelled by resample('M') / resample('A')
+    values : numpy.ndarray
+        (nperiods x ncolumns), same dtype as the input
+    """
+    period = PERIODS[timestep]
+    if period is None:
+        return dates, values
+    keys = dates.to_period(period)
+    grouped = pd.DataFrame(values, index=dates).groupby(keys).mean()
+    out_dates = grouped.index.to_timestamp(how='end').normalize()
+    return pd.DatetimeIndex(out_dates), grouped.to_numpy(dtype=values.dtype)
+
+
+def pair_wells(grid_ids, obd_names, obd_columns=None):
+    """Observed column of each well.
+
+    obd_columns maps grid ids to modflow.obd column names. Without it a
+    column named after the grid id is used, or, when modflow.obd has one
+    column per observation cell and none is named after a grid id, the
+    columns are taken in the order of modflow.obs.
+
+    Returns a dict grid_id (str) -> column name.
+    """
+    if obd_columns:
+        return {str(k): v for k, v in obd_columns.items() if v in obd_names}
+    pairs = {g: g for g in grid_ids if g in obd_names}
+    if not pairs and len(obd_names) == len(grid_ids):
+        pairs = dict(zip(grid_ids, obd_names))
+    return pairs
+
+
+def _header(f, fname):
+    time = datetime.datetime.now().strftime('- %m/%d/%y %H:%M:%S -')
+    f.write("# {} is created by APEXMOD plugin {}{}\n".format(fname, VERSION, time))
+
+
+def _write_stats(f, stats):
+    f.write('\n')
+    f.write("# Statistics\n")
+    if stats is None:
+        f.write("Nash–Sutcliffe: ---\n")
+        f.write("R-squared: ---\n")
+        f.write("PBIAS: ---\n")
+    else:
+        f.write("Nash–Sutcliffe: " + '{:.4f}'.format(stats['nse']) + "\n")
+        f.write("R-squared: " + '{:.4f}'.format(stats['rsq']) + "\n")
+        f.write("PBIAS: " + '{:.4f}'.format(stats['pbias']) + "\n")
+
+
+def export_all(wd, outfolder, stdate, cache_root, timestep='day',
+               depth_to_water=False, obd_columns=None, progress=None,
+               grid_ids=None, periods=None):
+    """Write the water table of every observation cell.
+
+    Parameters
+    ----------
+    wd : str
+        MODFLOW folder (modflow.obs, modflow.obd, amf_MODFLOW_obs_head)
+    outfolder : str
+        output folder
+    stdate : datetime.datetime
+        first day of the simulation
+    cache_root : str
+        result cache folder (see result_cache.get_cache_dir)
+    timestep : str
+        'day', 'month' or 'year'
+    depth_to_water : bool
+        export the simulated water table minus the land surface elevation
+    obd_columns : dict, optional
+        grid_id -> modflow.obd column (see pair_wells)
+    progress : callable, optional
+        called with the percentage of wells written
+    grid_ids : sequence, optional
+        observation cells to export, all of modflow.obs by default
+    periods : tuple, optional
+        (start, end) dates (or None for an open end) of the exported rows
+
+    Returns
+    -------
+    written : list of str
+        paths of the written files
+    summary : pandas.DataFrame
+        statistics of the wells that have observations
+    """
+    mf_obs = read_obs_cells(wd)
+    all_ids = mf_obs.index.astype(str).tolist()
+    heads = read_obs_head(
+        os.path.join(wd, "amf_MODFLOW_obs_head"), all_ids, cache_root)
+    if grid_ids is None:
+        grid_ids = all_ids
+    else:
+        grid_ids = [str(g) for g in grid_ids]
+        heads = heads[grid_ids]
+        mf_obs = mf_obs.loc[[int(g) for g in grid_ids]]
+    heads = heads.to_numpy(dtype=np.float32)
+    if depth_to_water:
+        # Simulated watertable - landsurface
+        heads = heads - mf_obs["mf_elev"].to_numpy(dtype=np.float32)
+    dates = pd.date_range(stdate, periods=len(heads))
+    dates, sims = aggregate(dates, heads, timestep)
+    if periods is not None:
+        start, end = periods
+        keep = np.ones(len(dates), dtype=bool)
+        if start is not None:
+            keep &= dates >= pd.Timestamp(start)
+        if end is not None:
+            keep &= dates <= pd.Timestamp(end)
+        dates, sims = dates[keep], sims[keep]
+    kind = "dtw" if depth_to_water else "wt"
+    suffix = "{}_{}".format(SUFFIX[timestep], kind)
+
+    # every observed column, on the dates of the simulation
+    pairs = {}
+    obd_path = os.path.join(wd, "modflow.obd")
+    if os.path.isfile(obd_path):
+        wtObd = pd.read_csv(obd_path, sep=r'\s+', index_col=0, header=0, parse_dates=True)
+        # paired over all cells, so a subset keeps the columns of modflow.obs order
+        pairs = pair_wells(all_ids, list(wtObd.columns), obd_columns)
+    paired = [j for j, g in enumerate(grid_ids) if g in pairs]
+    obds = np.full((len(dates), len(paired)), np.nan, dtype=np.float32)
+    stats = {}
+    if paired:
+        obd_names = [pairs[grid_ids[j]] for j in paired]
+        obd_vals = wtObd[obd_names].apply(pd.to_numeric, errors='coerce')
+        obd_dates, obd_vals = aggregate(
+            pd.DatetimeIndex(obd_vals.index), obd_vals.to_numpy(dtype=np.float32), timestep)
+        pos = dates.get_indexer(obd_dates)
+        obds[pos[pos >= 0]] = obd_vals[pos >= 0]
+        stats = ObjFns.evaluate(sims[:, paired], obds, STAT_NAMES)
+        valid = np.isfinite(sims[:, paired]) & np.isfinite(obds)
+        npairs = valid.sum(axis=0)
+
+    os.makedirs(outfolder, exist_ok=True)
+    date_str = np.asarray(dates.strftime('%Y-%m-%d'))
+    written, rows = [], []
+    obd_of = {j: k for k, j in enumerate(paired)}
+    for j, grid_id in enumerate(grid_ids):
+        sim = sims[:, j]
+        if j in obd_of:
+            k = obd_of[j]
+            wt_ob = pairs[grid_id]
+            ob = obds[:, k]
+            ok = np.isfinite(sim) & np.isfinite(ob)
+            fname = "apexmf_grid_id({})_ob({})_{}.txt".format(grid_id, wt_ob, suffix)
+            well_stats = None
+            if npairs[k] > 1:
+                well_stats = {name: stats[name][k] for name in STAT_NAMES}
+                rows.append(dict(grid_id=grid_id, obd=wt_ob, n=int(npairs[k]), **well_stats))
+            with open(os.path.join(outfolder, fname), 'w') as f:
+                _header(f, fname)
+                f.write("Date\t{}\t{}\n".format(grid_id, wt_ob))
+                f.writelines(
+                    "{}\t{:10.4f}\t{:10.4f}\n".format(d, s, o)
+                    for d, s, o in zip(date_str[ok], sim[ok], ob[ok]))
+                _write_stats(f, well_stats)
+        else:
+            fname = "apexmf_grid_id({})_{}.txt".format(grid_id, suffix)
+            with open(os.path.join(outfolder, fname), 'w') as f:
+                _header(f, fname)
+                f.write("Date\t{}\n".format(grid_id))
+                f.writelines(
+                    "{}\t{:10.4f}\n".format(d, s) for d, s in zip(date_str, sim))
+                _write_stats(f, None)
+        written.append(os.path.join(outfolder, fname))
+        if progress is not None:
+            progress(round((j + 1) / len(grid_ids) * 100))
+
+    # one wide table: sim_<grid_id> columns, then obd_<column> of the paired
+    # wells; obd columns are usually named after the grid id as well
+    wide = pd.DataFrame(
+        sims, index=dates, columns=["sim_{}".format(g) for g in grid_ids])
+    for j in paired:
+        wide["obd_{}".format(pairs[grid_ids[j]])] = obds[:, obd_of[j]]
+    fname = "apexmf_obs_cells_{}.txt".format(suffix)
+    with open(os.path.join(outfolder, fname), 'w') as f:
+        _header(f, fname)
+        wide.to_csv(
+            f, index_label="Date", sep='\t', float_format='%10.4f',
+            lineterminator='\n', encoding='utf-8', na_rep='-999')
+    written.append(os.path.join(outfolder, fname))
+
+    summary = pd.DataFrame(rows, columns=['grid_id', 'obd', 'n'] + list(STAT_NAMES))
+    fname = "apexmf_obs_cells_{}_stats.txt".format(suffix)
+    with open(os.path.join(outfolder, fname), 'w') as f:
+        _header(f, fname)
+        summary.to_csv(
+            f, index=False, sep='\t', float_format='%.4f', lineterminator='\n', encoding='utf-8')
+    written.append(os.path.join(outfolder, fname))
+    return written, summary
@@ -0,0 +1,170 @@
+# coding=utf-8
+"""Cell budget file time series test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from modules.flopy.utils.binaryfile import CellBudgetFile
+
+NLAY, NROW, NCOL = 1, 3, 4
+
+
+def write_wells(f, kper, nodes, rates):
+    """Write a compact (imeth 2) WELLS list record of one stress period."""
+    np.array(
+        [(1, kper, b"           WELLS", NCOL, NROW, -NLAY)],
+        dtype=[("kstp", "<i4"), ("kper", "<i4"), ("text", "S16"),
+               ("ncol", "<i4"), ("nrow", "<i4"), ("nlay", "<i4")]).tofile(f)
+    np.array(
+        [(2, 1.0, float(kper), float(kper))],
+        dtype=[("imeth", "<i4"), ("delt", "<f4"), ("pertim", "<f4"),
+               ("totim", "<f4")]).tofile(f)
+    np.array([len(nodes)], dtype=np.int32).tofile(f)
+    records = np.zeros(len(nodes), dtype=[("node", "<i4"), ("q", "<f4")])
+    records["node"] = nodes
+    records["q"] = rates
+    records.tofile(f)
+
+
+def write_storage(f, kper, values, compact):
+    """Write a full-array STORAGE record of one stress period, compact
+    (imeth 1 header2 with the time) or not (header1 only)."""
+    nlay = -NLAY if compact else NLAY
+    np.array(
+        [(1, kper, b"         STORAGE", NCOL, NROW, nlay)],
+        dtype=[("kstp", "<i4"), ("kper", "<i4"), ("text", "S16"),
+               ("ncol", "<i4"), ("nrow", "<i4"), ("nlay", "<i4")]).tofile(f)
+    if compact:
+        np.array(
+            [(1, 1.0, 1.0, float(kper))],
+            dtype=[("imeth", "<i4"), ("delt", "<f4"), ("pertim", "<f4"),
+                   ("totim", "<f4")]).tofile(f)
+    np.asarray(values, dtype="<f4").tofile(f)
+
+
+def stand_in_dis(nper):
+    """The parts of a ModflowDis used by CellBudgetFile: one-day periods
+    of one time step."""
+    return SimpleNamespace(
+        perlen=SimpleNamespace(array=np.ones(nper)),
+        nstp=SimpleNamespace(array=np.ones(nper, dtype=int)),
+        tsmult=SimpleNamespace(array=np.ones(nper)),
+        parent=SimpleNamespace(modelgrid=None))
+
+
+class StridedIndexTest(unittest.TestCase):
+    """Test the index of budget files that repeat their first time step."""
+
+    NPER = 5
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, compact):
+        path = os.path.join(self.tmpdir, "storage.cbb")
+        with open(path, "wb") as f:
+            for kper in range(1, self.NPER + 1):
+                write_storage(f, kper, np.arange(NROW * NCOL) + kper, compact)
+        return path
+
+    def check(self, cbb, times):
+        self.assertEqual(cbb.nrecords, self.NPER)
+        self.assertEqual(
+            cbb.get_kstpkper(), [(0, k) for k in range(self.NPER)])
+        self.assertEqual(cbb.get_times(), times)
+        ts = cbb.get_ts((0, 1, 2), "STORAGE")
+        np.testing.assert_allclose(ts[:, 1], 6.0 + np.arange(1, 6))
+        data = cbb.get_data(kstpkper=(0, 2), text="STORAGE")[0]
+        self.assertEqual(data[0, 1, 2], 9.0)
+
+    def test_compact(self):
+        """Compact records take their times from header2."""
+        cbb = CellBudgetFile(self.write(True))
+        self.check(cbb, [1.0, 2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(cbb.get_data(totim=3.0)[0][0, 1, 2], 9.0)
+        cbb.close()
+
+    def test_compact_dis(self):
+        """With dis, compact records still take their times from header2."""
+        cbb = CellBudgetFile(self.write(True), dis=stand_in_dis(self.NPER))
+        self.check(cbb, [1.0, 2.0, 3.0, 4.0, 5.0])
+        cbb.close()
+
+    def test_full_dis(self):
+        """Records without header2 get their times from dis."""
+        cbb = CellBudgetFile(self.write(False), dis=stand_in_dis(self.NPER))
+        self.check(cbb, [1.0, 2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(cbb.get_data(totim=3.0)[0][0, 1, 2], 9.0)
+        cbb.close()
+
+    def test_full(self):
+        """Without dis, records without header2 have no times."""
+        cbb = CellBudgetFile(self.write(False))
+        self.assertEqual(cbb.get_times(), [])
+        self.assertTrue((cbb.recordarray["totim"] == -1).all())
+        data = cbb.get_data(kstpkper=(0, 2), text="STORAGE")[0]
+        self.assertEqual(data[0, 1, 2], 9.0)
+        cbb.close()
+
+
+class CellBudgetFileTest(unittest.TestCase):
+    """Test time series of list (imeth 2) records."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "wells.cbb")
+        with open(self.path, "wb") as f:
+            # one-based node 5 is listed twice in period 1 and missing in
+            # period 2; node 12 is never listed
+            write_wells(f, 1, [5, 5, 9], [1.0, 2.0, 4.0])
+            write_wells(f, 2, [9], [8.0])
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.tmpdir)
+
+    def test_node_missing_from_list(self):
+        """Nodes missing from a list give NaN, listed ones add up."""
+        cbb = CellBudgetFile(self.path)
+        ts = cbb.get_node_ts([4, 8, 11], "WELLS")
+        missing = cbb.get_node_ts([11], "WELLS")
+        cbb.close()
+        np.testing.assert_allclose(ts[:, 0], [1.0, 2.0])
+        np.testing.assert_allclose(ts[:, 1], [3.0, np.nan])
+        np.testing.assert_allclose(ts[:, 2], [4.0, 8.0])
+        self.assertTrue(np.isnan(ts[:, 3]).all())
+        np.testing.assert_allclose(missing[:, 0], [1.0, 2.0])
+        self.assertTrue(np.isnan(missing[:, 1]).all())
+
+    def test_get_ts_node_never_listed(self):
+        """get_ts of a cell that is never in the list is all NaN."""
+        cbb = CellBudgetFile(self.path)
+        ts = cbb.get_ts((0, 2, 3), "WELLS")
+        cbb.close()
+        self.assertTrue(np.isnan(ts[:, 1]).all())
+
+
+if __name__ == "__main__":
+    suite = unittest.TestSuite([
+        unittest.makeSuite(CellBudgetFileTest),
+        unittest.makeSuite(StridedIndexTest)])
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,68 @@
+# coding=utf-8
+"""Water table export test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from pyfolder.wt_export import export_all
+
+
+class ExportAllTest(unittest.TestCase):
+    """Test the wide table of all observation cells."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.wd = os.path.join(self.tmpdir, "MODFLOW")
+        os.makedirs(self.wd)
+        with open(os.path.join(self.wd, "modflow.obs"), "w") as f:
+            f.write("# observation cells\n2\n")
+            f.write("1 1 1 101 50.0\n1 2 1 102 60.0\n")
+        with open(os.path.join(self.wd, "amf_MODFLOW_obs_head"), "w") as f:
+            f.write("heads\n")
+            for day in range(3):
+                f.write("{} {}\n".format(10.0 + day, 20.0 + day))
+        # observed columns named after the grid ids
+        with open(os.path.join(self.wd, "modflow.obd"), "w") as f:
+            f.write("Date 101 102\n")
+            for day in range(3):
+                f.write("2000-01-0{} 1.0 2.0\n".format(day + 1))
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.tmpdir)
+
+    def test_wide_table_keeps_simulated_columns(self):
+        """Observed columns do not overwrite the simulated ones."""
+        outfolder = os.path.join(self.tmpdir, "out")
+        written, summary = export_all(
+            self.wd, outfolder, datetime.datetime(2000, 1, 1),
+            os.path.join(self.tmpdir, "cache"))
+        path = os.path.join(outfolder, "apexmf_obs_cells_d_wt.txt")
+        self.assertIn(path, written)
+        wide = pd.read_csv(path, sep="\t", comment="#", index_col=0)
+        self.assertEqual(
+            list(wide.columns), ["sim_101", "sim_102", "obd_101", "obd_102"])
+        self.assertEqual(wide["sim_101"].tolist(), [10.0, 11.0, 12.0])
+        self.assertEqual(wide["sim_102"].tolist(), [20.0, 21.0, 22.0])
+        self.assertEqual(wide["obd_101"].tolist(), [1.0, 1.0, 1.0])
+        self.assertEqual(wide["obd_102"].tolist(), [2.0, 2.0, 2.0])
+        self.assertEqual(summary["grid_id"].tolist(), ["101", "102"])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(ExportAllTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)